@@ -6,6 +6,7 @@ from django.db.models import QuerySet
 
 from utils.graphene.types import CustomDjangoListObjectType, FileFieldType
 from utils.graphene.fields import DjangoPaginatedListObjectField
+from utils.graphene.optimizer import OptimizerHint
 
 from apps.blog.models import Blog, Tag, Category
 from apps.blog.filters import BlogFilter, TagFilter, CategoryFilter
@@ -67,6 +68,10 @@ class BlogType(DjangoObjectType):
     image = graphene.Field(FileFieldType)
     og_image = graphene.Field(FileFieldType)
 
+    optimizer_hints = dict(
+        quantity_in_cart=OptimizerHint(only=()),
+    )
+
     @staticmethod
     def get_custom_queryset(queryset, info):
         return get_blog_qs(info)
@@ -1,22 +1,65 @@
+from typing import NamedTuple
+
 from promise import Promise
+from django.db import models
 from django.utils.functional import cached_property
 
 from utils.graphene.dataloaders import DataLoaderWithContext, WithContextMixin
-from apps.book.models import Book
+from apps.book.models import Book, WishList
+from apps.order.models import CartItem, BookOrder, Order
+
+
+class BookViewerState(NamedTuple):
+    wishlist_id: int = None
+    cart_item: CartItem = None
+    ordered_quantity: int = 0
 
 
-class WishListLoader(DataLoaderWithContext):
+class BookViewerStateLoader(DataLoaderWithContext):
+    """
+    Loads the state of the books for the current user (wishlist, cart item and previously ordered quantity)
+    All using one query, total price of the cart items are primed to the cart_item.total_price loader.
+    """
     def batch_load_fn(self, keys):
-        book_qs = Book.objects.filter(id__in=keys).values_list('id', 'book_wish_list__id')
-        wishlist_ids = {
-            id: wish_list_id
-            for id, wish_list_id in book_qs
-        }
-        return Promise.resolve([wishlist_ids.get(key) for key in keys])
+        user = self.context.user
+        if user.is_anonymous:
+            return Promise.resolve([BookViewerState() for _ in keys])
+
+        def _subquery(qs, field):
+            return models.Subquery(qs.filter(book=models.OuterRef('pk')).values(field)[:1])
+
+        cart_item_qs = CartItem.objects.filter(created_by=user).order_by('id')
+        book_qs = Book.objects.filter(id__in=keys).annotate(
+            viewer_wishlist_id=_subquery(WishList.objects.filter(created_by=user).order_by('id'), 'id'),
+            viewer_cart_item_id=_subquery(cart_item_qs, 'id'),
+            viewer_cart_item_quantity=_subquery(cart_item_qs, 'quantity'),
+            viewer_ordered_quantity=_subquery(
+                BookOrder.objects.filter(order__created_by=user).exclude(order__status=Order.Status.CANCELLED)
+                .order_by().values('book').annotate(total_quantity=models.Sum('quantity')),
+                'total_quantity',
+            ),
+        ).values_list(
+            'id', 'price', 'viewer_wishlist_id', 'viewer_cart_item_id', 'viewer_cart_item_quantity',
+            'viewer_ordered_quantity',
+        )
+        states = {}
+        for book_id, price, wishlist_id, cart_item_id, cart_item_quantity, ordered_quantity in book_qs:
+            cart_item = None
+            if cart_item_id is not None:
+                cart_item = CartItem(
+                    id=cart_item_id, book_id=book_id, created_by_id=user.pk, quantity=cart_item_quantity,
+                )
+                self.context.dl.cart_item.total_price.prime(cart_item_id, price * cart_item_quantity)
+            states[book_id] = BookViewerState(
+                wishlist_id=wishlist_id,
+                cart_item=cart_item,
+                ordered_quantity=ordered_quantity or 0,
+            )
+        return Promise.resolve([states.get(key, BookViewerState()) for key in keys])
 
 
 class DataLoaders(WithContextMixin):
 
     @cached_property
-    def wishlist_id(self):
-        return WishListLoader(context=self.context)
+    def viewer_state(self):
+        return BookViewerStateLoader(context=self.context)
@@ -138,13 +138,23 @@ class Book(models.Model):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.__image_name = self.image.name
+        # Image is not loaded if it is deferred (only()/defer()), see refresh_from_db
+        if 'image' in self.__dict__:
+            self.__image_name = self.image.name
+        else:
+            self.__image_name = None
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        # Deferred image loaded on access is not a change
+        if fields is None or 'image' in fields:
+            self.__image_name = self.image.name
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if self.image and self.image.name != self.__image_name:
+        if 'image' in self.__dict__ and self.image and self.image.name != self.__image_name:
             filename = f'og_{self.image.name.split("/")[-1]}'
             social_sharable_image = get_social_sharable_image(self.image, filename)
             self.og_image.save(filename, social_sharable_image, save=False)
@@ -6,10 +6,12 @@ from django.db.models import QuerySet, Count
 from utils.graphene.types import CustomDjangoListObjectType, FileFieldType
 from utils.graphene.fields import DjangoPaginatedListObjectField
 from utils.graphene.enums import EnumDescription
+from utils.graphene.optimizer import OptimizerHint
 
 from apps.book.models import Book, Tag, Category, Author, WishList
 from apps.book.filters import BookFilter, TagFilter, CategoryFilter, AuthorFilter
 from apps.book.enums import BookGradeEnum, BookLanguageEnum
+from apps.order.models import CartItem
 from apps.order.schema import CartItemType
 
 
@@ -67,6 +69,7 @@ class AuthorListType(CustomDjangoListObjectType):
 class BookType(DjangoObjectType):
     wishlist_id = graphene.ID()
     cart_details = graphene.Field(CartItemType)
+    ordered_quantity = graphene.Int(description='Quantity of the book ordered by the current user')
 
     grade = graphene.Field(BookGradeEnum)
     grade_display = EnumDescription(source='get_grade_display')
@@ -96,19 +99,31 @@ class BookType(DjangoObjectType):
     image = graphene.Field(FileFieldType)
     og_image = graphene.Field(FileFieldType)
 
+    optimizer_hints = dict(
+        wishlist_id=OptimizerHint(only=()),
+        cart_details=OptimizerHint(only=()),
+        ordered_quantity=OptimizerHint(only=()),
+    )
+
     @staticmethod
     def get_custom_queryset(queryset, info):
         return book_qs(info)
 
     @staticmethod
     def resolve_wishlist_id(root, info, **kwargs) -> int:
-        return info.context.dl.book.wishlist_id.load(root.pk)
+        return info.context.dl.book.viewer_state.load(root.pk).then(lambda state: state.wishlist_id)
+
+    @staticmethod
+    def resolve_cart_details(root, info, **kwargs) -> CartItem:
+        def _get_cart_item(state):
+            if state.cart_item is not None:
+                state.cart_item.book = root
+            return state.cart_item
+        return info.context.dl.book.viewer_state.load(root.pk).then(_get_cart_item)
 
     @staticmethod
-    def resolve_cart_details(root, info, **kwargs) -> QuerySet:
-        if info.context.user.is_anonymous:
-            return None
-        return root.book_cart_item.all().filter(created_by=info.context.user).first()
+    def resolve_ordered_quantity(root, info, **kwargs) -> int:
+        return info.context.dl.book.viewer_state.load(root.pk).then(lambda state: state.ordered_quantity)
 
 
 class BookListType(CustomDjangoListObjectType):
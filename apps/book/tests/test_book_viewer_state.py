@@ -0,0 +1,84 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from utils.graphene.tests import GraphQLTestCase
+
+from apps.user.models import User
+from apps.order.models import Order
+
+from apps.user.factories import UserFactory
+from apps.publisher.factories import PublisherFactory
+from apps.book.factories import BookFactory, WishListFactory
+from apps.order.factories import CartItemFactory, OrderFactory, BookOrderFactory
+
+
+class TestBookViewerState(GraphQLTestCase):
+    BOOKS_QUERY = '''
+        query MyQuery($pageSize: Int) {
+          books(pageSize: $pageSize, ordering: "id") {
+            results {
+              id
+              wishlistId
+              orderedQuantity
+              cartDetails {
+                id
+                quantity
+                totalPrice
+                book {
+                  id
+                }
+              }
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN)
+        self.other_user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN)
+        publisher = PublisherFactory.create()
+        self.books = BookFactory.create_batch(6, publisher=publisher, is_published=True, price=100)
+        self.wish_list = WishListFactory.create(book=self.books[0], created_by=self.user)
+        self.cart_item = CartItemFactory.create(book=self.books[1], created_by=self.user, quantity=3)
+        order = OrderFactory.create(created_by=self.user, status=Order.Status.COMPLETED)
+        cancelled_order = OrderFactory.create(created_by=self.user, status=Order.Status.CANCELLED)
+        for _order, quantity in [(order, 4), (order, 5), (cancelled_order, 10)]:
+            BookOrderFactory.create(order=_order, book=self.books[2], publisher=publisher, quantity=quantity)
+        # Other user's state should not be used
+        WishListFactory.create(book=self.books[3], created_by=self.other_user)
+        CartItemFactory.create(book=self.books[3], created_by=self.other_user)
+
+    def _query(self, page_size):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(self.BOOKS_QUERY, variables=dict(pageSize=page_size))
+        return content['data']['books']['results'], len(queries)
+
+    def test_viewer_state(self):
+        self.force_login(self.user)
+        books, _ = self._query(6)
+        self.assertEqual(books[0]['wishlistId'], str(self.wish_list.pk))
+        self.assertEqual(books[1]['cartDetails'], dict(
+            id=str(self.cart_item.pk),
+            quantity=3,
+            totalPrice=300,
+            book=dict(id=str(self.books[1].pk)),
+        ))
+        self.assertEqual(books[2]['orderedQuantity'], 9)
+        for book in books[3:]:
+            self.assertEqual(book['wishlistId'], None)
+            self.assertEqual(book['cartDetails'], None)
+            self.assertEqual(book['orderedQuantity'], 0)
+
+    def test_query_count(self):
+        self.force_login(self.user)
+        _, query_count = self._query(2)
+        _, query_count_all = self._query(6)
+        self.assertEqual(query_count, query_count_all)
+
+    def test_anonymous(self):
+        books, _ = self._query(6)
+        self.assertEqual(len(books), 6)
+        for book in books:
+            self.assertEqual(book['wishlistId'], None)
+            self.assertEqual(book['cartDetails'], None)
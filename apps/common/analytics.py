@@ -0,0 +1,438 @@
+import json
+import datetime
+import logging
+import threading
+
+import redis
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, DateField
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from utils.single_flight import get_redis_client
+from apps.common.models import Province, District, Municipality
+from apps.book.models import Book
+from apps.order.models import Order, BookOrder, OrderWindow
+from apps.publisher.models import Publisher
+
+logger = logging.getLogger(__name__)
+
+# Change log of orders (used to update the facts incrementally), kept in redis to include the changes of all the processes
+ANALYTICS_CHANGE_VERSION_KEY = 'analytics-book-order-facts-version'
+# Allocates the change log keys, the version is only incremented after the change log key is written
+ANALYTICS_CHANGE_SEQUENCE_KEY = 'analytics-book-order-facts-sequence'
+ANALYTICS_CHANGE_LOG_TTL = 24 * 60 * 60
+# Facts also depend on non-order data (school's district, ...), so they are fully rebuilt periodically
+ANALYTICS_FACTS_MAX_AGE = 60 * 60
+# Requests wait this long for the first build of the process (below gunicorn --timeout=40 in scripts/run_prod.sh)
+ANALYTICS_FACTS_FIRST_BUILD_TIMEOUT = 30
+# Rows converted to the columns at once
+ANALYTICS_FACTS_CHUNK_SIZE = 50000
+
+# Missing foreign keys are stored as 0 and missing choices as -1
+BOOK_ORDER_FACT_COLUMNS = (
+    ('order_id', np.int64),
+    ('book_id', np.int64),
+    ('publisher_id', np.int64),
+    ('order_window_id', np.int64),
+    ('province_id', np.int64),
+    ('district_id', np.int64),
+    ('municipality_id', np.int64),
+    ('grade', np.int8),
+    ('language', np.int8),
+    ('status', np.int8),
+    ('quantity', np.int64),
+    ('price', np.int64),
+    ('created_date', np.int32),  # Date ordinal
+)
+
+# Choices are stored using their index
+BOOK_ORDER_FACT_CHOICES = {
+    'grade': Book.Grade,
+    'language': Book.LanguageType,
+    'status': Order.Status,
+}
+
+
+class AnalyticsNotReady(Exception):
+    def __init__(self):
+        super().__init__('Analytics are being prepared, please try again later')
+
+
+def get_analytics_change_log_key(version):
+    return f'{ANALYTICS_CHANGE_VERSION_KEY}-{version}'
+
+
+def mark_orders_changed(order_ids):
+    """
+    Add changed orders to the change log, facts of these orders are reloaded on next sync
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+    try:
+        client = get_redis_client()
+        sequence = client.incr(ANALYTICS_CHANGE_SEQUENCE_KEY)
+        client.set(get_analytics_change_log_key(sequence), json.dumps(order_ids), ex=ANALYTICS_CHANGE_LOG_TTL)
+        # Version is incremented after the change log is written, so that sync doesn't skip it
+        client.incr(ANALYTICS_CHANGE_VERSION_KEY)
+    except redis.RedisError:
+        # Facts are reloaded on next rebuild
+        logger.warning('Analytics change log is not available', exc_info=True)
+
+
+def _get_change_version():
+    """
+    Returns the change log version, None if redis is not available
+    """
+    try:
+        return int(get_redis_client().get(ANALYTICS_CHANGE_VERSION_KEY) or 0)
+    except redis.RedisError:
+        logger.warning('Analytics change log is not available', exc_info=True)
+
+
+def _get_changed_order_ids(from_version, to_version):
+    """
+    Returns the orders changed after from_version, None if any of the change logs is missing
+    """
+    try:
+        change_logs = get_redis_client().mget([
+            get_analytics_change_log_key(version)
+            for version in range(from_version + 1, to_version + 1)
+        ])
+    except redis.RedisError:
+        logger.warning('Analytics change log is not available', exc_info=True)
+        return None
+    if any(change_log is None for change_log in change_logs):
+        return None
+    return {
+        order_id
+        for change_log in change_logs
+        for order_id in json.loads(change_log)
+    }
+
+
+def _get_source_qs():
+    school_or_institution = 'order__created_by__school__{}', 'order__created_by__institution__{}'
+    return BookOrder.objects.order_by().annotate(
+        order_window_id=F('order__assigned_order_window'),
+        province_id=Coalesce(*[field.format('province') for field in school_or_institution]),
+        district_id=Coalesce(*[field.format('district') for field in school_or_institution]),
+        municipality_id=Coalesce(*[field.format('municipality') for field in school_or_institution]),
+        status=F('order__status'),
+        created_date=Cast('order__created_at', DateField()),
+    ).values_list(*[name for name, _ in BOOK_ORDER_FACT_COLUMNS])
+
+
+def _rows_to_columns(rows):
+    """
+    Returns the columns (numpy arrays) of the rows (values of BOOK_ORDER_FACT_COLUMNS)
+    """
+    values_by_column = list(zip(*rows)) or [()] * len(BOOK_ORDER_FACT_COLUMNS)
+    columns = {}
+    for (name, dtype), values in zip(BOOK_ORDER_FACT_COLUMNS, values_by_column):
+        choices = BOOK_ORDER_FACT_CHOICES.get(name)
+        if choices is not None:
+            index = {value: i for i, value in enumerate(choices.values)}
+            values = [index.get(value, -1) for value in values]
+        elif name == 'created_date':
+            values = [value.toordinal() for value in values]
+        else:
+            values = [value or 0 for value in values]
+        columns[name] = np.array(values, dtype=dtype)
+    return columns
+
+
+def _load_columns(qs):
+    chunks = []
+    rows = []
+    for row in qs.iterator(chunk_size=5000):
+        rows.append(row)
+        if len(rows) == ANALYTICS_FACTS_CHUNK_SIZE:
+            chunks.append(_rows_to_columns(rows))
+            rows = []
+    chunks.append(_rows_to_columns(rows))
+    return {
+        name: np.concatenate([chunk[name] for chunk in chunks])
+        for name, _ in BOOK_ORDER_FACT_COLUMNS
+    }
+
+
+class BookOrderFacts():
+    """
+    In-memory columnar store of book orders, one numpy array per column.
+    Rows are appended to the preallocated buffers and the rows of the changed orders are only marked inactive,
+    so the columns returned by sync are never modified and readers can keep using them.
+    Full rebuilds run in a background thread (ENABLE_ANALYTICS_FACTS_BACKGROUND_REBUILD), requests use
+    the last built columns meanwhile. Only the first build of the process is waited for.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rebuild_thread = None
+        self.reset()
+
+    def reset(self):
+        self._set_buffers(_rows_to_columns([]))
+        self.version = None
+        self.built_at = None
+
+    def _set_buffers(self, columns):
+        self.buffers = columns
+        self.size = len(columns['order_id'])
+        self.active = np.ones(self.size, dtype=bool)
+        self._set_columns()
+
+    def _set_columns(self):
+        self.columns = {
+            name: buffer[:self.size]
+            for name, buffer in self.buffers.items()
+        }
+        # Rows of the changed orders are inactive until the next rebuild
+        self.columns['active'] = self.active
+
+    def rebuild(self):
+        version = _get_change_version() or 0
+        columns = _load_columns(_get_source_qs())
+        # Changes after reading the version are applied again on next sync, which is fine
+        with self.lock:
+            self._set_buffers(columns)
+            self.version = version
+            self.built_at = timezone.now()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            # Retried on next sync
+            logger.error('Failed to rebuild the book order facts', exc_info=True)
+        finally:
+            # Thread's own database connection
+            connection.close()
+
+    def schedule_rebuild(self):
+        """
+        Start the rebuild in a background thread, unless one is already running
+        """
+        if not settings.ENABLE_ANALYTICS_FACTS_BACKGROUND_REBUILD:
+            self.rebuild()
+            return
+        with self.lock:
+            if self.rebuild_thread is not None and self.rebuild_thread.is_alive():
+                return
+            self.rebuild_thread = threading.Thread(
+                target=self._rebuild_in_background, name='analytics-facts-rebuild', daemon=True,
+            )
+            self.rebuild_thread.start()
+
+    def wait_for_rebuild(self, timeout=None):
+        rebuild_thread = self.rebuild_thread
+        if rebuild_thread is not None:
+            rebuild_thread.join(timeout)
+
+    def _append(self, columns):
+        count = len(columns['order_id'])
+        size = self.size + count
+        if size > len(self.buffers['order_id']):
+            # Grow geometrically, so that appends are amortized
+            capacity = max(size, 2 * len(self.buffers['order_id']))
+            buffers = {}
+            for name, buffer in self.buffers.items():
+                buffers[name] = np.empty(capacity, dtype=buffer.dtype)
+                buffers[name][:self.size] = buffer[:self.size]
+            self.buffers = buffers
+        # Written after the end of the columns used by the readers
+        for name, buffer in self.buffers.items():
+            buffer[self.size:size] = columns[name]
+        self.size = size
+
+    def _update(self, order_ids):
+        order_ids = np.fromiter(order_ids, dtype=np.int64)
+        active = self.active & ~np.isin(self.columns['order_id'], order_ids)
+        new_columns = _load_columns(_get_source_qs().filter(order__in=order_ids.tolist()))
+        self._append(new_columns)
+        self.active = np.concatenate([active, np.ones(len(new_columns['order_id']), dtype=bool)])
+        self._set_columns()
+
+    def sync(self):
+        """
+        Update incrementally using the change log, or schedule a rebuild. Returns the latest columns
+        """
+        with self.lock:
+            version = _get_change_version()
+            if version is None:
+                # Changes are not known, facts are only rebuilt after the max age
+                version = self.version or 0
+            needs_rebuild = (
+                self.version is None or
+                version < self.version or
+                self.built_at < timezone.now() - datetime.timedelta(seconds=ANALYTICS_FACTS_MAX_AGE)
+            )
+            if not needs_rebuild and version != self.version:
+                changed_order_ids = _get_changed_order_ids(self.version, version)
+                # Change log of a concurrent mark might not be written yet, retried on next sync.
+                # (Expired change logs are older than ANALYTICS_FACTS_MAX_AGE, which rebuilds)
+                if changed_order_ids is not None:
+                    self._update(changed_order_ids)
+                    self.version = version
+        if needs_rebuild:
+            self.schedule_rebuild()
+            if self.version is None:
+                # Empty columns are not used before the first build
+                self.wait_for_rebuild(ANALYTICS_FACTS_FIRST_BUILD_TIMEOUT)
+                if self.version is None:
+                    raise AnalyticsNotReady()
+        return self.columns
+
+
+def select_facts(columns, date_from=None, date_to=None, **filters):
+    """
+    Returns mask of the active rows matching all the filters (column=allowed values)
+    """
+    mask = columns['active'].copy()
+    if date_from:
+        mask &= columns['created_date'] >= date_from.toordinal()
+    if date_to:
+        mask &= columns['created_date'] <= date_to.toordinal()
+    for name, values in filters.items():
+        if values is None:
+            continue
+        choices = BOOK_ORDER_FACT_CHOICES.get(name)
+        if choices is not None:
+            values = [choices.values.index(value) for value in values]
+        else:
+            values = [int(value) for value in values]
+        mask &= np.isin(columns[name], values)
+    return mask
+
+
+def aggregate_facts(columns, mask, group_by=None):
+    """
+    Returns quantity, amount, orders_count and book_orders_count per value of group_by column
+    """
+    quantity = columns['quantity'][mask]
+    if not len(quantity):
+        return {}
+    amount = quantity * columns['price'][mask]
+    order_id = columns['order_id'][mask]
+    if group_by is None:
+        keys = [None]
+        group = np.zeros(len(quantity), dtype=np.int64)
+    else:
+        keys, group = np.unique(columns[group_by][mask], return_inverse=True)
+        keys = keys.tolist()
+    # Weighted bincount is float64, exact for the totals below 2**53
+    quantities = np.bincount(group, weights=quantity, minlength=len(keys)).round().astype(np.int64)
+    amounts = np.bincount(group, weights=amount, minlength=len(keys)).round().astype(np.int64)
+    book_orders_counts = np.bincount(group, minlength=len(keys))
+    # Distinct (group, order) pairs
+    group_orders = np.unique(np.stack((group, order_id)), axis=1)
+    orders_counts = np.bincount(group_orders[0], minlength=len(keys))
+    return {
+        key: dict(
+            quantity=int(quantities[i]),
+            amount=int(amounts[i]),
+            orders_count=int(orders_counts[i]),
+            book_orders_count=int(book_orders_counts[i]),
+        )
+        for i, key in enumerate(keys)
+    }
+
+
+book_order_facts = BookOrderFacts()
+
+
+def _get_names(model, name_field='name'):
+    def _get(codes):
+        return {
+            _id: (_id, name)
+            for _id, name in model.objects.filter(id__in=codes).values_list('id', name_field)
+        }
+    return _get
+
+
+def _get_choice_names(choices):
+    def _get(codes):
+        return {
+            code: (choices.values[code], choices.labels[code])
+            for code in codes
+            if code >= 0
+        }
+    return _get
+
+
+def _get_date_names(codes):
+    return {
+        code: (datetime.date.fromordinal(code), datetime.date.fromordinal(code).isoformat())
+        for code in codes
+    }
+
+
+# Dimension: (Fact column, Function returning (key, name) for given column values)
+ANALYTICS_DIMENSIONS = {
+    'publisher': ('publisher_id', _get_names(Publisher)),
+    'order_window': ('order_window_id', _get_names(OrderWindow, 'title')),
+    'province': ('province_id', _get_names(Province)),
+    'district': ('district_id', _get_names(District)),
+    'municipality': ('municipality_id', _get_names(Municipality)),
+    'grade': ('grade', _get_choice_names(Book.Grade)),
+    'language': ('language', _get_choice_names(Book.LanguageType)),
+    'status': ('status', _get_choice_names(Order.Status)),
+    'date': ('created_date', _get_date_names),
+}
+
+
+# Filter: Fact column
+ANALYTICS_FILTERS = {
+    'publishers': 'publisher_id',
+    'order_windows': 'order_window_id',
+    'provinces': 'province_id',
+    'districts': 'district_id',
+    'municipalities': 'municipality_id',
+    'grades': 'grade',
+    'languages': 'language',
+    'statuses': 'status',
+}
+
+
+class Analytics():
+    """
+    Book order analytics for the given filters using the book order facts
+    """
+    def __init__(self, facts, date_from=None, date_to=None, **filters):
+        self.facts = facts
+        self.date_from = date_from
+        self.date_to = date_to
+        self.filters = {
+            ANALYTICS_FILTERS[name]: values
+            for name, values in filters.items()
+        }
+
+    @cached_property
+    def columns(self):
+        return self.facts.sync()
+
+    @cached_property
+    def mask(self):
+        return select_facts(self.columns, date_from=self.date_from, date_to=self.date_to, **self.filters)
+
+    @cached_property
+    def totals(self):
+        return aggregate_facts(self.columns, self.mask).get(None) or dict(
+            quantity=0, amount=0, orders_count=0, book_orders_count=0,
+        )
+
+    def get_groups(self, dimension):
+        column, get_names = ANALYTICS_DIMENSIONS[dimension]
+        totals_by_code = aggregate_facts(self.columns, self.mask, group_by=column)
+        # Missing values (0 or -1) are grouped without key and name
+        names = get_names(list(totals_by_code.keys()))
+        return [
+            dict(
+                zip(('key', 'name'), names.get(code, (None, None))),
+                **totals,
+            )
+            for code, totals in sorted(totals_by_code.items())
+        ]
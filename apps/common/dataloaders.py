@@ -0,0 +1,17 @@
+from promise import Promise
+from django.utils.functional import cached_property
+
+from utils.graphene.dataloaders import DataLoaderWithContext, WithContextMixin
+from apps.common.reports import get_report_snapshots
+
+
+class ReportSnapshotLoader(DataLoaderWithContext):
+    def batch_load_fn(self, keys):
+        snapshots = get_report_snapshots(keys)
+        return Promise.resolve([snapshots[key] for key in keys])
+
+
+class DataLoaders(WithContextMixin):
+    @cached_property
+    def report_snapshot(self):
+        return ReportSnapshotLoader(context=self.context)
@@ -0,0 +1,212 @@
+import csv
+import tempfile
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils.functional import Promise
+from django.utils.translation import gettext_lazy as _
+from openpyxl import Workbook
+
+from apps.common.reports import (
+    get_users_per_district_qs,
+    get_payment_per_order_window_qs,
+    get_books_and_cost_per_school_qs,
+    get_books_ordered_and_incentives_per_district_qs,
+    get_deliveries_per_district_qs,
+    get_top_selling_books_qs,
+    get_top_schools_qs,
+    get_platform_book_catalog_breakdown,
+    get_platform_book_grades_per_order_window,
+)
+
+# Rows are fetched from database using server-side cursor in chunks of this size
+REPORT_EXPORT_CHUNK_SIZE = 2000
+
+
+def _get_book_catalog_breakdown_rows(field):
+    def _get():
+        return get_platform_book_catalog_breakdown()[field]
+    return _get
+
+
+def _get_books_per_publisher_per_category_rows():
+    for publisher in get_platform_book_catalog_breakdown()['books_per_publisher_per_category']:
+        for category in publisher['categories']:
+            yield dict(
+                publisher_id=publisher['publisher_id'],
+                publisher_name=publisher['publisher_name'],
+                **category,
+            )
+
+
+def _get_book_grades_per_order_window_rows():
+    for order_window in get_platform_book_grades_per_order_window():
+        for grade in order_window['grades']:
+            yield dict(
+                order_window_id=order_window['order_window_id'],
+                title=order_window['title'],
+                **grade,
+            )
+
+
+# Report: (queryset or rows (dicts), ((field, header), ...))
+# Aggregated datasets (one row per publisher/category, grade, ...) which aren't querysets are computed in memory
+REPORT_EXPORTS = {
+    'users_per_district': (
+        get_users_per_district_qs,
+        (
+            ('district_id', _('District ID')),
+            ('name', _('District')),
+            ('verified_users', _('Verified users')),
+            ('unverified_users', _('Unverified users')),
+        ),
+    ),
+    'payment_per_order_window': (
+        get_payment_per_order_window_qs,
+        (
+            ('order_window_id', _('Order window ID')),
+            ('title', _('Order window')),
+            ('payment', _('Payment')),
+        ),
+    ),
+    'books_and_cost_per_school': (
+        get_books_and_cost_per_school_qs,
+        (
+            ('school_id', _('School ID')),
+            ('school_name', _('School')),
+            ('number_of_books_ordered', _('Number of books ordered')),
+            ('total_cost', _('Total cost')),
+        ),
+    ),
+    'books_ordered_and_incentives_per_district': (
+        get_books_ordered_and_incentives_per_district_qs,
+        (
+            ('district_id', _('District ID')),
+            ('name', _('District')),
+            ('no_of_books_ordered', _('Number of books ordered')),
+            ('no_of_incentive_books', _('Number of incentive books')),
+        ),
+    ),
+    'deliveries_per_district': (
+        get_deliveries_per_district_qs,
+        (
+            ('district_id', _('District ID')),
+            ('name', _('District')),
+            ('school_delivered', _('School delivered')),
+        ),
+    ),
+    # Full ranking, the report only shows the top 5
+    'top_selling_books': (
+        get_top_selling_books_qs,
+        (
+            ('book_id', _('Book ID')),
+            ('title', _('Title')),
+            ('sold_count', _('Sold count')),
+        ),
+    ),
+    'top_schools': (
+        get_top_schools_qs,
+        (
+            ('school_id', _('School ID')),
+            ('school_name', _('School')),
+            ('book_ordered_count', _('Number of books ordered')),
+        ),
+    ),
+    'books_per_publisher': (
+        _get_book_catalog_breakdown_rows('books_per_publisher'),
+        (
+            ('publisher_id', _('Publisher ID')),
+            ('publisher_name', _('Publisher')),
+            ('number_of_books', _('Number of books')),
+        ),
+    ),
+    'books_per_category': (
+        _get_book_catalog_breakdown_rows('books_per_category'),
+        (
+            ('category_id', _('Category ID')),
+            ('category', _('Category')),
+            ('number_of_books', _('Number of books')),
+        ),
+    ),
+    'books_per_grade': (
+        _get_book_catalog_breakdown_rows('books_per_grade'),
+        (
+            ('grade', _('Grade')),
+            ('number_of_books', _('Number of books')),
+        ),
+    ),
+    'books_per_language': (
+        _get_book_catalog_breakdown_rows('books_per_language'),
+        (
+            ('language', _('Language')),
+            ('number_of_books', _('Number of books')),
+        ),
+    ),
+    'books_per_publisher_per_category': (
+        _get_books_per_publisher_per_category_rows,
+        (
+            ('publisher_id', _('Publisher ID')),
+            ('publisher_name', _('Publisher')),
+            ('category_id', _('Category ID')),
+            ('category', _('Category')),
+            ('number_of_books', _('Number of books')),
+        ),
+    ),
+    'book_grades_per_order_window': (
+        _get_book_grades_per_order_window_rows,
+        (
+            ('order_window_id', _('Order window ID')),
+            ('title', _('Order window')),
+            ('grade', _('Grade')),
+            ('number_of_books', _('Number of books')),
+        ),
+    ),
+}
+
+
+def iter_report_rows(report):
+    """
+    Yields header and then the rows of the report without loading all the rows in memory
+    """
+    get_rows, columns = REPORT_EXPORTS[report]
+    fields = [field for field, _ in columns]
+    yield [str(header) for _, header in columns]
+    rows = get_rows()
+    if isinstance(rows, QuerySet):
+        yield from rows.values_list(*fields).iterator(chunk_size=REPORT_EXPORT_CHUNK_SIZE)
+        return
+    for row in rows:
+        # Choice labels are lazy translations
+        yield [
+            str(row[field]) if isinstance(row[field], Promise) else row[field]
+            for field in fields
+        ]
+
+
+class Echo():
+    """
+    Pseudo-buffer for csv.writer, returns the written value instead of storing it
+    """
+    def write(self, value):
+        return value
+
+
+def iter_report_csv(report):
+    writer = csv.writer(Echo())
+    for row in iter_report_rows(report):
+        yield writer.writerow(row)
+
+
+def get_report_xlsx(report):
+    """
+    Returns temporary file with the report workbook
+    Write-only workbook writes the rows to a temporary file instead of keeping them in memory.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=report[:31])  # Max length of the sheet title
+    for row in iter_report_rows(report):
+        worksheet.append(row)
+    report_file = tempfile.TemporaryFile(dir=settings.TEMP_DIR)
+    workbook.save(report_file)
+    report_file.seek(0)
+    return report_file
@@ -0,0 +1,152 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from graphene_django.settings import graphene_settings
+from graphql.backend.core import GraphQLCoreBackend
+from graphql.validation import validate
+
+from utils.graphene.backend import CachedGraphQLBackend
+
+CATALOG_QUERY = '''
+    query Books($page: Int, $pageSize: Int, $search: String, $categories: [ID!], $publisher: ID) {
+      books(page: $page, pageSize: $pageSize, search: $search, categories: $categories, publisher: $publisher) {
+        page
+        pageSize
+        totalCount
+        results {
+          id
+          title
+          price
+          image {
+            name
+            url
+          }
+          grade
+          gradeDisplay
+          language
+          languageDisplay
+          wishlistId
+          cartDetails {
+            id
+            quantity
+            totalPrice
+          }
+          ...BookRelations
+        }
+      }
+      categories {
+        results {
+          id
+          name
+        }
+      }
+    }
+    fragment BookRelations on BookType {
+      publisher {
+        id
+        name
+      }
+      authors {
+        id
+        name
+      }
+      categories {
+        id
+        name
+        parentCategory {
+          id
+          name
+        }
+      }
+      tags {
+        id
+        name
+      }
+    }
+'''
+
+ORDERS_QUERY = '''
+    query Orders($page: Int, $pageSize: Int, $status: [OrderStatusEnum!], $users: [ID!]) {
+      orders(page: $page, pageSize: $pageSize, status: $status, users: $users) {
+        page
+        pageSize
+        totalCount
+        results {
+          id
+          orderCode
+          status
+          statusDisplay
+          totalPrice
+          totalQuantity
+          createdAt
+          createdBy {
+            id
+            fullName
+            canonicalName
+          }
+          activityLog {
+            id
+            comment
+            createdAt
+            createdBy {
+              id
+              fullName
+            }
+          }
+          bookOrders(pageSize: 5) {
+            totalCount
+            results {
+              id
+              title
+              price
+              quantity
+              isbn
+              publisher {
+                id
+                name
+              }
+            }
+          }
+        }
+      }
+    }
+'''
+
+DOCUMENT_BENCHMARKS = {
+    'catalog': CATALOG_QUERY,
+    'orders': ORDERS_QUERY,
+}
+
+
+class Command(BaseCommand):
+    help = 'Compares per-request CPU time of parsing and validating the documents with the document cache lookup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help='Requests per measurement')
+
+    def _cpu_time(self, func, repeat):
+        start = time.process_time()
+        for _ in range(repeat):
+            func()
+        return (time.process_time() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        schema = graphene_settings.SCHEMA
+        repeat = options['repeat']
+        core_backend = GraphQLCoreBackend()
+        cached_backend = CachedGraphQLBackend(len(DOCUMENT_BENCHMARKS))
+        for name, query in DOCUMENT_BENCHMARKS.items():
+            errors = validate(schema, core_backend.document_from_string(schema, query).document_ast)
+            if errors:
+                raise CommandError(f'{name}: {errors}')
+
+            def _parse_and_validate():
+                validate(schema, core_backend.document_from_string(schema, query).document_ast)
+
+            cached_backend.document_from_string(schema, query)
+            uncached = self._cpu_time(_parse_and_validate, repeat)
+            cached = self._cpu_time(lambda: cached_backend.document_from_string(schema, query), repeat)
+            self.stdout.write(
+                f'{name:<10} parse + validate {uncached:>8.3f} ms, cached {cached:>8.3f} ms, '
+                f'saved {uncached - cached:>8.3f} ms per request'
+            )
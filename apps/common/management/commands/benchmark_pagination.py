@@ -0,0 +1,95 @@
+import time
+import uuid
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Value, DurationField, DateTimeField, ExpressionWrapper
+
+from utils.graphene.pagination import CursorPageGraphqlPagination, ListCount
+from apps.user.models import User
+from apps.order.models import Order, OrderActivityLog
+from apps.notification.models import Notification
+from apps.payment.models import Payment
+
+# Same ordering as used by the list fields
+PAGINATION_BENCHMARKS = {
+    'orders': (Order, '-created_at'),
+    'notifications': (Notification, '-created_at'),
+    'order_activity_logs': (OrderActivityLog, ''),
+    'payments': (Payment, '-id'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compares OFFSET (page) and keyset (cursor) pagination for the first and a deep page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--list', choices=PAGINATION_BENCHMARKS.keys(), default='orders')
+        parser.add_argument('--page', type=int, default=500)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5, help='Best time of the repeats is used')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Create this many orders before the benchmark (rolled back afterwards, only for orders)',
+        )
+
+    def _seed_orders(self, count):
+        user = User.objects.create_user(
+            f'pagination-benchmark-{uuid.uuid4().hex}@example.com', user_type=User.UserType.SCHOOL_ADMIN,
+        )
+        orders = Order.objects.bulk_create(
+            [Order(created_by=user, total_price=0) for _ in range(count)],
+            batch_size=5000,
+        )
+        # Spread created_at, bulk_create uses the same timestamp for all the orders
+        Order.objects.filter(pk__in=[order.pk for order in orders]).update(
+            created_at=ExpressionWrapper(
+                F('created_at') - F('id') * Value(datetime.timedelta(seconds=1), output_field=DurationField()),
+                output_field=DateTimeField(),
+            )
+        )
+
+    def _time(self, func, repeat):
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+        return min(durations) * 1000
+
+    def _benchmark(self, list_name, page, page_size, repeat):
+        model, ordering = PAGINATION_BENCHMARKS[list_name]
+        qs = model.objects.all()
+        pagination = CursorPageGraphqlPagination(ordering=ordering, page_size_query_param='pageSize')
+
+        def _paginate(**kwargs):
+            return pagination.paginate_queryset(qs, ListCount(qs), pageSize=page_size, **kwargs)
+
+        # Cursor for the deep page, taken from the previous page
+        previous_page = _paginate(page=page - 1)
+        if previous_page.next_cursor is None:
+            raise CommandError(f'Not enough rows for page {page}, use --seed')
+        deep_cursor = previous_page.next_cursor
+        assert _paginate(page=page).results == _paginate(after=deep_cursor).results
+
+        self.stdout.write(f'{list_name}: {qs.count()} rows, page size {page_size}')
+        for label, kwargs in [
+            ('offset page 1', dict(page=1)),
+            (f'offset page {page}', dict(page=page)),
+            ('cursor page 1', dict()),
+            (f'cursor page {page}', dict(after=deep_cursor)),
+        ]:
+            self.stdout.write(f'  {label:<20} {self._time(lambda: _paginate(**kwargs), repeat):>10.2f} ms')
+
+    def handle(self, *args, **options):
+        if options['seed'] and options['list'] != 'orders':
+            raise CommandError('--seed is only supported for orders')
+        with transaction.atomic():
+            if options['seed']:
+                self._seed_orders(options['seed'])
+            try:
+                self._benchmark(options['list'], options['page'], options['page_size'], options['repeat'])
+            finally:
+                # Seeded rows are not kept
+                transaction.set_rollback(True)
@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from graphene_django.settings import graphene_settings
+from graphql.error import GraphQLSyntaxError
+from graphql.language.base import parse
+from graphql.validation import validate
+
+from utils.graphene.backend import get_document_hash
+from apps.common.models import PersistedQuery
+
+
+def get_manifest_documents(manifest):
+    """
+    Returns {hash: document} for the manifest, supported formats:
+        {"<sha256>": "<document>", ...}
+        {"format": "apollo-persisted-query-manifest", "operations": [{"id": "<sha256>", "body": "<document>"}, ...]}
+    """
+    if 'operations' in manifest:
+        return {
+            operation['id']: operation['body']
+            for operation in manifest['operations']
+        }
+    return manifest
+
+
+class Command(BaseCommand):
+    help = 'Imports the persisted queries (allowlist) from the manifest generated by the frontend build'
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest', help='JSON manifest file')
+        parser.add_argument(
+            '--replace', action='store_true',
+            help='Remove the persisted queries which are not in the manifest',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['manifest']) as fp:
+                documents = get_manifest_documents(json.load(fp))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise CommandError(f'Invalid manifest: {e}')
+
+        schema = graphene_settings.SCHEMA
+        for document_hash, document in documents.items():
+            if get_document_hash(document) != document_hash:
+                raise CommandError(f'{document_hash}: hash does not match the document')
+            try:
+                errors = validate(schema, parse(document))
+            except GraphQLSyntaxError as e:
+                errors = [e]
+            if errors:
+                raise CommandError(f'{document_hash}: {errors[0]}')
+
+        with transaction.atomic():
+            deleted = 0
+            if options['replace']:
+                deleted, _ = PersistedQuery.objects.exclude(document_hash__in=documents.keys()).delete()
+            existing = set(
+                PersistedQuery.objects.filter(document_hash__in=documents.keys()).values_list('document_hash', flat=True)
+            )
+            PersistedQuery.objects.bulk_create([
+                PersistedQuery(document_hash=document_hash, document=document)
+                for document_hash, document in documents.items()
+                if document_hash not in existing
+            ])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{len(documents) - len(existing)} persisted queries imported, {len(existing)} already exist, '
+                f'{deleted} removed.'
+            )
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from utils.shared_cache import SHARED_CACHES
+from utils.graphene.backend import document_cache_backend
+# Shared caches are defined with the dataloaders
+import config.dataloaders  # noqa: F401
+
+
+class Command(BaseCommand):
+    help = (
+        'Shows hits and misses of the dataloader shared caches and the GraphQL document cache '
+        '(counted across all the processes)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after showing them')
+
+    def handle(self, *args, **options):
+        for name, shared_cache in sorted(SHARED_CACHES.items()):
+            stats = shared_cache.get_stats()
+            total = sum(stats.values())
+            hits = stats['local_hits'] + stats['redis_hits']
+            self.stdout.write(
+                f"{name}: local hits {stats['local_hits']}, redis hits {stats['redis_hits']}, "
+                f"misses {stats['misses']}, hit rate {hits / total if total else 0:.2%}"
+            )
+            if options['reset']:
+                shared_cache.reset_stats()
+
+        stats = document_cache_backend.get_stats()
+        total = sum(stats.values())
+        self.stdout.write(
+            f"graphql-document-cache: hits {stats['hits']}, misses {stats['misses']}, "
+            f"hit rate {stats['hits'] / total if total else 0:.2%}"
+        )
+        if options['reset']:
+            document_cache_backend.reset_stats()
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:12
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0004_auto_20220302_1008'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slice', models.CharField(choices=[('users', 'Users'), ('books', 'Books'), ('orders', 'Orders'), ('packages', 'Packages')], max_length=20, verbose_name='Slice')),
+                ('language', models.CharField(choices=[('en', 'English'), ('ne', 'Nepali')], max_length=10, verbose_name='Language')),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Data')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Refreshed at')),
+            ],
+            options={
+                'verbose_name': 'Report snapshot',
+                'verbose_name_plural': 'Report snapshots',
+                'unique_together': {('slice', 'language')},
+            },
+        ),
+    ]
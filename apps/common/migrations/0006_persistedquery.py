@@ -0,0 +1,26 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0005_reportsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersistedQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_hash', models.CharField(max_length=64, unique=True, verbose_name='Document hash')),
+                ('document', models.TextField(verbose_name='Document')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+            ],
+            options={
+                'verbose_name': 'Persisted query',
+                'verbose_name_plural': 'Persisted queries',
+            },
+        ),
+    ]
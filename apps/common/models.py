@@ -1,4 +1,6 @@
 from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils.translation import gettext_lazy as _
 
 
@@ -105,3 +107,43 @@ class BaseActivityLog(models.Model):
 
     class Meta:
         abstract = True
+
+
+class ReportSnapshot(models.Model):
+    """
+    Precomputed moderator report datasets, stored per slice and language
+    """
+    class Slice(models.TextChoices):
+        USERS = 'users', _('Users')
+        BOOKS = 'books', _('Books')
+        ORDERS = 'orders', _('Orders')
+        PACKAGES = 'packages', _('Packages')
+
+    slice = models.CharField(verbose_name=_('Slice'), max_length=20, choices=Slice.choices)
+    language = models.CharField(verbose_name=_('Language'), max_length=10, choices=settings.LANGUAGES)
+    data = models.JSONField(verbose_name=_('Data'), encoder=DjangoJSONEncoder, default=dict)
+    refreshed_at = models.DateTimeField(verbose_name=_('Refreshed at'))
+
+    class Meta:
+        unique_together = ('slice', 'language')
+        verbose_name = _('Report snapshot')
+        verbose_name_plural = _('Report snapshots')
+
+    def __str__(self):
+        return f'{self.slice} ({self.language})'
+
+
+class PersistedQuery(models.Model):
+    """
+    GraphQL documents registered by the frontend at build time (import_persisted_queries command)
+    """
+    document_hash = models.CharField(verbose_name=_('Document hash'), max_length=64, unique=True)
+    document = models.TextField(verbose_name=_('Document'))
+    created_at = models.DateTimeField(verbose_name=_('Created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Persisted query')
+        verbose_name_plural = _('Persisted queries')
+
+    def __str__(self):
+        return self.document_hash
@@ -0,0 +1,69 @@
+"""
+Persisted queries: The frontend registers the documents at build time (import_persisted_queries command) and the
+requests send only the hash of the document (Apollo persisted query extension):
+    {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": "<sha256 of the document>"}}, "variables": {}}
+For GET requests extensions is sent as JSON in the query string.
+
+With settings.ENABLE_PERSISTED_QUERY_ALLOWLIST (enabled when not DEBUG) only the registered documents are executed,
+documents sent in full are also checked against the allowlist.
+"""
+import json
+
+from django.conf import settings
+from django.http import HttpResponseBadRequest, HttpResponseForbidden
+from graphene_django.views import HttpError
+
+from utils.shared_cache import LRUCache
+from utils.graphene.backend import get_document_hash
+from apps.common.models import PersistedQuery
+
+# Imported documents are seen by the running processes after this
+PERSISTED_QUERY_LOCAL_TTL = 60
+
+# Unknown hashes are also cached (None)
+persisted_documents = LRUCache(10000, PERSISTED_QUERY_LOCAL_TTL)
+
+
+def get_persisted_document(document_hash):
+    documents = persisted_documents.get_many([document_hash])
+    if document_hash in documents:
+        return documents[document_hash]
+    document = PersistedQuery.objects.filter(
+        document_hash=document_hash,
+    ).values_list('document', flat=True).first()
+    persisted_documents.set_many({document_hash: document})
+    return document
+
+
+def get_persisted_query_hash(request, data):
+    extensions = request.GET.get('extensions') or data.get('extensions')
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise HttpError(HttpResponseBadRequest('Extensions are invalid JSON.'))
+    if not isinstance(extensions, dict):
+        return None
+    persisted_query = extensions.get('persistedQuery')
+    if isinstance(persisted_query, dict):
+        return persisted_query.get('sha256Hash')
+
+
+def resolve_persisted_query(request, data, query):
+    """
+    Returns the document to execute for the request (query or the persisted document of the hash)
+    """
+    document_hash = get_persisted_query_hash(request, data)
+    if query:
+        query_hash = get_document_hash(query)
+        if document_hash is not None and document_hash != query_hash:
+            raise HttpError(HttpResponseBadRequest('Provided sha256Hash does not match query'))
+        if settings.ENABLE_PERSISTED_QUERY_ALLOWLIST and get_persisted_document(query_hash) is None:
+            raise HttpError(HttpResponseForbidden('PersistedQueryNotAllowed'))
+        return query
+    if document_hash is None:
+        return query
+    document = get_persisted_document(document_hash)
+    if document is None:
+        raise HttpError(HttpResponseBadRequest('PersistedQueryNotFound'))
+    return document
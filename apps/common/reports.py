@@ -0,0 +1,551 @@
+import logging
+from collections import defaultdict
+
+import redis
+from django.conf import settings
+from django.db import transaction, connections
+from django.db.models import Sum, Count, F, Q, Case, When, Value, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone, translation
+from django.utils.functional import cached_property
+
+from utils.single_flight import run_single_flight, get_single_flight_key, get_redis_client
+
+from apps.common.models import District, ReportSnapshot
+from apps.user.models import User
+from apps.book.models import Book
+from apps.order.models import Order, BookOrder, OrderWindow
+from apps.package.models import SchoolPackage
+
+logger = logging.getLogger(__name__)
+
+# Changes are collected for this many seconds before a refresh is triggered
+REPORT_SNAPSHOT_REFRESH_DELAY = 30
+
+
+def get_book_grades_per_order_window(order_qs, order_window_qs):
+    order_window_title_by_id = {
+        _id: title
+        for _id, title in order_window_qs.values_list('id', 'title').order_by('id')
+    }
+
+    order_qs = order_qs.filter(
+        book_order__book__grade__isnull=False,
+    ).values(
+        'assigned_order_window',
+        'book_order__book__grade',
+    ).annotate(
+        number_of_books=Sum('book_order__quantity'),
+    ).values_list(
+        'assigned_order_window',
+        'book_order__book__grade',
+        'number_of_books',
+    ).order_by(
+        'assigned_order_window',
+        'book_order__book__grade',
+    )
+
+    # Group grades by order_window (Grades are sorted from db)
+    grades_by_order_window_id = defaultdict(list)
+    for od_id, grade, number_of_books in order_qs:
+        grades_by_order_window_id[od_id].append(dict(
+            grade=Book.Grade(grade).label,  # Sending label instead of ENUM value
+            number_of_books=number_of_books,
+        ))
+
+    return [
+        # Order Window
+        dict(
+            order_window_id=order_window_id,
+            title=order_window_title,
+            grades=grades_by_order_window_id.get(order_window_id, []),
+        )
+        for order_window_id, order_window_title in order_window_title_by_id.items()
+    ]
+
+
+# Report fields provided by get_book_catalog_breakdown
+BOOK_CATALOG_BREAKDOWN_FIELDS = (
+    'books_per_publisher',
+    'books_per_category',
+    'books_per_grade',
+    'books_per_language',
+    'books_per_publisher_per_category',
+)
+
+# Grouping sets used by the catalog breakdown (Columns from get_book_catalog_breakdown's rows)
+BOOK_CATALOG_GROUPING_SETS = (
+    (),
+    ('publisher_id', 'publisher_name'),
+    ('category_id', 'category'),
+    ('grade',),
+    ('language',),
+    ('publisher_id', 'publisher_name', 'category_id', 'category'),
+)
+
+
+def get_book_catalog_breakdown(book_qs, school_report=False):
+    """
+    Number of books per publisher, category, grade, language and publisher/category using a single
+    GROUPING SETS query over book_qs.
+    For school report, ordered quantity is used instead of number of books.
+    """
+    if school_report:
+        # book_qs is already joined to the school's book orders
+        measure, unit = F('ordered_book__quantity'), F('ordered_book__id')
+    else:
+        measure, unit = Value(1), F('id')
+    # One row per (unit x category). unit_rank is used to count each unit once for non-category dimensions
+    rows_qs = book_qs.order_by().annotate(
+        publisher_name=F('publisher__name'),
+        category_id=F('categories__id'),
+        category=F('categories__name'),
+        measure=measure,
+        unit_rank=Window(expression=RowNumber(), partition_by=[unit]),
+    ).values(
+        'publisher_id', 'publisher_name', 'category_id', 'category', 'grade', 'language', 'measure', 'unit_rank',
+    )
+    rows_sql, params = rows_qs.query.sql_with_params()
+    grouping_sets = ', '.join(
+        '({})'.format(', '.join(columns))
+        for columns in BOOK_CATALOG_GROUPING_SETS
+    )
+    sql = f'''
+        SELECT
+            GROUPING(publisher_id), GROUPING(category_id), GROUPING(grade), GROUPING(language),
+            publisher_id, publisher_name, category_id, category, grade, language,
+            SUM(measure),
+            SUM(measure) FILTER (WHERE unit_rank = 1)
+        FROM ({rows_sql}) AS catalog
+        GROUP BY GROUPING SETS ({grouping_sets})
+        ORDER BY publisher_name, publisher_id, category, category_id
+    '''
+    with connections[book_qs.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        grouped_rows = cursor.fetchall()
+
+    number_of_books = 0
+    books_per_publisher = []
+    books_per_category = []
+    books_per_grade = []
+    books_per_language = []
+    books_per_publisher_per_category = {}
+    for (
+        no_publisher, no_category, no_grade, no_language,
+        publisher_id, publisher_name, category_id, category, grade, language,
+        total, unit_total,
+    ) in grouped_rows:
+        if not no_publisher and not no_category:
+            books_per_publisher_per_category.setdefault(publisher_id, dict(
+                publisher_id=publisher_id,
+                publisher_name=publisher_name,
+                categories=[],
+            ))['categories'].append(dict(
+                category_id=category_id,
+                category=category,
+                number_of_books=total,
+            ))
+        elif not no_publisher:
+            books_per_publisher.append(dict(
+                publisher_id=publisher_id,
+                publisher_name=publisher_name,
+                number_of_books=unit_total,
+            ))
+        elif not no_category:
+            books_per_category.append(dict(
+                category_id=category_id,
+                category=category,
+                number_of_books=total,
+            ))
+        elif not no_grade:
+            if grade is not None:
+                books_per_grade.append(dict(
+                    grade=Book.Grade(grade).label,  # Sending label instead of ENUM value
+                    number_of_books=unit_total,
+                ))
+        elif not no_language:
+            if language is not None:
+                books_per_language.append(dict(
+                    language=Book.LanguageType(language).label,
+                    number_of_books=unit_total,
+                ))
+        else:
+            number_of_books = unit_total or 0
+    return {
+        'number_of_books': number_of_books,
+        'books_per_publisher': books_per_publisher,
+        'books_per_category': books_per_category,
+        'books_per_grade': sorted(books_per_grade, key=lambda x: x['grade']),
+        'books_per_language': sorted(books_per_language, key=lambda x: x['language']),
+        'books_per_publisher_per_category': list(books_per_publisher_per_category.values()),
+    }
+
+
+def get_number_of_incentive_books(school_package_qs):
+    return school_package_qs.filter(total_quantity__gte=10).aggregate(
+        total_incentive_books=Sum(
+            Case(
+                When(total_quantity__lte=30, then=F('total_quantity') * 4),
+                When(total_quantity__gt=30, then=120)
+            )
+        )
+    )['total_incentive_books']
+
+
+def get_users_per_district_qs():
+    return District.objects.filter(
+        schools__school_user__isnull=False, schools__school_user__is_deactivated=False
+    ).values('name').annotate(
+        district_id=F('id'),
+        verified_users=Count('schools__school_user', filter=Q(schools__school_user__is_verified=True)),
+        unverified_users=Count('schools__school_user', filter=Q(schools__school_user__is_verified=False)),
+    )
+
+
+def get_payment_per_order_window_qs():
+    return Order.objects.filter(
+        status=Order.Status.COMPLETED.value,
+    ).values('assigned_order_window__title').annotate(
+        payment=Sum(F('book_order__price') * F('book_order__quantity')),
+        order_window_id=F('assigned_order_window__id'),
+        title=F('assigned_order_window__title'),
+    ).order_by('assigned_order_window__id')
+
+
+def get_books_and_cost_per_school_qs():
+    return User.objects.filter(
+        is_deactivated=False,
+        user_type=User.UserType.SCHOOL_ADMIN.value,
+        order__status=Order.Status.COMPLETED.value,
+    ).values('school__name').annotate(
+        number_of_books_ordered=Sum('order__book_order__quantity'),
+        school_name=F('school__name'),
+        school_id=F('school__id'),
+        total_cost=Sum(F('order__book_order__price') * F('order__book_order__quantity'))
+    )
+
+
+def get_books_ordered_and_incentives_per_district_qs():
+    return District.objects.filter(
+        schools__school_user__school_packages__isnull=False
+    ).values('name').annotate(
+        no_of_books_ordered=Sum('schools__school_user__school_packages__total_quantity'),
+        no_of_incentive_books=Sum(
+            Case(
+                When(
+                    schools__school_user__school_packages__total_quantity__lte=30,
+                    then=F('schools__school_user__school_packages__total_quantity') * 4
+                ),
+                When(
+                    schools__school_user__school_packages__total_quantity__gt=30,
+                    then=120
+                ),
+            )
+        ),
+        district_id=F('id')
+    )
+
+
+def get_deliveries_per_district_qs():
+    return District.objects.filter(
+        schools__school_user__school_packages__isnull=False,
+    ).values('name').annotate(
+        school_delivered=Count('schools__school_user__school_packages'),
+        district_id=F('id')
+    )
+
+
+def generate_users_report():
+    user_qs = User.objects.filter(is_deactivated=False)
+    return {
+        'number_of_schools_registered': user_qs.filter(user_type=User.UserType.SCHOOL_ADMIN.value).count(),
+
+        'number_of_schools_verified': user_qs.filter(
+            user_type=User.UserType.SCHOOL_ADMIN.value, is_verified=True, is_deactivated=False
+        ).count(),
+
+        'number_of_schools_unverified': user_qs.filter(
+            user_type=User.UserType.SCHOOL_ADMIN.value, is_verified=False, is_deactivated=False
+        ).count(),
+
+        'number_of_publishers': user_qs.filter(user_type=User.UserType.PUBLISHER.value).count(),
+
+        'users_per_district': list(get_users_per_district_qs()),
+    }
+
+
+def get_platform_book_catalog_breakdown():
+    return get_book_catalog_breakdown(Book.objects.filter(is_published=True))
+
+
+def get_top_selling_books_qs():
+    return BookOrder.objects.filter(
+        order__status=Order.Status.COMPLETED.value
+    ).values('title').annotate(
+        sold_count=Count('title'),
+        book_id=F('book_id'),
+    ).order_by('-sold_count')
+
+
+def get_top_schools_qs():
+    return User.objects.filter(
+        is_deactivated=False,
+        user_type=User.UserType.SCHOOL_ADMIN.value,
+        order__status=Order.Status.COMPLETED.value,
+    ).annotate(
+        book_ordered_count=Sum('order__book_order__quantity'),
+        school_name=F('school__name'),
+    ).order_by('-book_ordered_count')
+
+
+def get_platform_book_grades_per_order_window():
+    return get_book_grades_per_order_window(
+        Order.objects.filter(status=Order.Status.COMPLETED.value),
+        OrderWindow.objects.all(),
+    )
+
+
+def generate_books_report():
+    catalog_breakdown = get_platform_book_catalog_breakdown()
+    return {
+        'number_of_books_on_the_platform': catalog_breakdown['number_of_books'],
+        **{
+            field: catalog_breakdown[field]
+            for field in BOOK_CATALOG_BREAKDOWN_FIELDS
+        },
+    }
+
+
+def generate_orders_report():
+    user_qs = User.objects.filter(is_deactivated=False)
+    order_qs = Order.objects.filter(status=Order.Status.COMPLETED.value)
+    return {
+        'number_of_books_ordered': order_qs.aggregate(total=Sum('book_order__quantity'))['total'],
+
+        'number_of_districts_reached': user_qs.filter(
+            user_type=User.UserType.SCHOOL_ADMIN.value, order__isnull=False
+        ).values('school__district').annotate(total=Count('school__district')).order_by('total').count(),
+
+        'number_of_municipalities': user_qs.filter(
+            user_type=User.UserType.SCHOOL_ADMIN.value,
+            order__isnull=False,
+            order__status=Order.Status.COMPLETED.value
+        ).values('school__municipality').distinct().count(),
+
+        'number_of_schools_reached': user_qs.filter(
+            user_type=User.UserType.SCHOOL_ADMIN.value,
+            order__status=Order.Status.COMPLETED.value
+        ).distinct().count(),
+
+        'top_selling_books': list(get_top_selling_books_qs()[:5]),
+
+        'top_schools': list(
+            get_top_schools_qs()[:5].values('school_name', 'school_id', 'book_ordered_count')
+        ),
+
+        'payment_per_order_window': list(get_payment_per_order_window_qs()),
+
+        'books_and_cost_per_school': list(get_books_and_cost_per_school_qs()),
+
+        'book_grades_per_order_window': get_platform_book_grades_per_order_window(),
+    }
+
+
+def generate_packages_report():
+    school_package_qs = SchoolPackage.objects.filter(status=SchoolPackage.Status.DELIVERED.value)
+    return {
+        'number_of_incentive_books': get_number_of_incentive_books(school_package_qs),
+
+        'books_ordered_and_incentives_per_district': list(get_books_ordered_and_incentives_per_district_qs()),
+
+        'deliveries_per_district': list(get_deliveries_per_district_qs()),
+    }
+
+
+# Report fields provided by each slice
+REPORT_SNAPSHOT_FIELDS = {
+    ReportSnapshot.Slice.USERS: (
+        'number_of_schools_registered',
+        'number_of_schools_verified',
+        'number_of_schools_unverified',
+        'number_of_publishers',
+        'users_per_district',
+    ),
+    ReportSnapshot.Slice.BOOKS: (
+        'number_of_books_on_the_platform',
+        'books_per_publisher',
+        'books_per_category',
+        'books_per_grade',
+        'books_per_language',
+        'books_per_publisher_per_category',
+    ),
+    ReportSnapshot.Slice.ORDERS: (
+        'number_of_books_ordered',
+        'number_of_districts_reached',
+        'number_of_municipalities',
+        'number_of_schools_reached',
+        'top_selling_books',
+        'top_schools',
+        'payment_per_order_window',
+        'books_and_cost_per_school',
+        'book_grades_per_order_window',
+    ),
+    ReportSnapshot.Slice.PACKAGES: (
+        'number_of_incentive_books',
+        'books_ordered_and_incentives_per_district',
+        'deliveries_per_district',
+    ),
+}
+
+REPORT_SNAPSHOT_SLICE_BY_FIELD = {
+    field: _slice
+    for _slice, fields in REPORT_SNAPSHOT_FIELDS.items()
+    for field in fields
+}
+
+REPORT_SNAPSHOT_GENERATORS = {
+    ReportSnapshot.Slice.USERS: generate_users_report,
+    ReportSnapshot.Slice.BOOKS: generate_books_report,
+    ReportSnapshot.Slice.ORDERS: generate_orders_report,
+    ReportSnapshot.Slice.PACKAGES: generate_packages_report,
+}
+
+
+def update_report_snapshots(slices=None):
+    """
+    Regenerate the given report slices (all if not provided) for every language
+    """
+    slices = slices or REPORT_SNAPSHOT_GENERATORS.keys()
+    snapshots = []
+    for _slice in slices:
+        generator = REPORT_SNAPSHOT_GENERATORS[ReportSnapshot.Slice(_slice)]
+        for language, _ in settings.LANGUAGES:
+            # Names (district, category, publisher, ...) are translated
+            with translation.override(language):
+                data = generator()
+            snapshot, _ = ReportSnapshot.objects.update_or_create(
+                slice=_slice,
+                language=language,
+                defaults=dict(
+                    data=data,
+                    refreshed_at=timezone.now(),
+                ),
+            )
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def get_report_snapshot_pending_key(_slice):
+    return f'report-snapshot-refresh-pending-{_slice}'
+
+
+def set_report_snapshot_pending(_slice):
+    """
+    Returns False if a refresh of the slice is already pending.
+    Flag is kept in redis, it is cleared by the refresh task (celery worker)
+    """
+    try:
+        return bool(get_redis_client().set(
+            get_report_snapshot_pending_key(_slice), 1, nx=True, ex=REPORT_SNAPSHOT_REFRESH_DELAY * 2,
+        ))
+    except redis.RedisError:
+        logger.warning('Report snapshot refresh debounce is not available', exc_info=True)
+        return True
+
+
+def clear_report_snapshots_pending(slices):
+    if not slices:
+        return
+    try:
+        get_redis_client().delete(*[get_report_snapshot_pending_key(_slice) for _slice in slices])
+    except redis.RedisError:
+        logger.warning('Report snapshot refresh debounce is not available', exc_info=True)
+
+
+def schedule_report_snapshots_refresh(slices):
+    """
+    Debounced refresh: Only one refresh per slice is queued at a time
+    """
+    from apps.common.tasks import refresh_report_snapshots
+
+    def _schedule():
+        # Pending flag is set with the task, a rolled back transaction doesn't suppress the next refresh
+        pending_slices = [
+            _slice
+            for _slice in slices
+            if set_report_snapshot_pending(_slice)
+        ]
+        if pending_slices:
+            refresh_report_snapshots.apply_async(
+                args=(pending_slices,),
+                countdown=REPORT_SNAPSHOT_REFRESH_DELAY,
+            )
+
+    transaction.on_commit(_schedule)
+
+
+def get_report_language():
+    language = (translation.get_language() or settings.LANGUAGE_CODE).split('-')[0]
+    if language not in dict(settings.LANGUAGES):
+        return settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+    return language
+
+
+def get_report_snapshots(slices):
+    """
+    Returns snapshots of the given slices for current language. Missing slices are generated synchronously.
+    """
+    language = get_report_language()
+    snapshots = {
+        snapshot.slice: snapshot
+        for snapshot in ReportSnapshot.objects.filter(language=language, slice__in=slices)
+    }
+    missing_slices = sorted(set(slices) - set(snapshots.keys()))
+    if missing_slices:
+        # Concurrent requests for the missing slices share one generation
+        for snapshot in run_single_flight(
+            get_single_flight_key('report-snapshots', missing_slices),
+            lambda: update_report_snapshots(missing_slices),
+        ):
+            if snapshot.language == language:
+                snapshots[snapshot.slice] = snapshot
+    return snapshots
+
+
+class SchoolReport():
+    """
+    Lazily built base querysets shared by the school report fields
+    """
+    def __init__(self, school):
+        self.school = school
+
+    @cached_property
+    def order_qs(self):
+        return Order.objects.filter(created_by=self.school, status=Order.Status.COMPLETED.value)
+
+    @cached_property
+    def school_package_qs(self):
+        return SchoolPackage.objects.filter(
+            status=SchoolPackage.Status.DELIVERED.value,
+            school=self.school,
+        )
+
+    @cached_property
+    def order_window_qs(self):
+        return OrderWindow.objects.filter(
+            orders__status=Order.Status.COMPLETED.value,
+            orders__created_by=self.school,
+        )
+
+    @cached_property
+    def book_qs(self):
+        return Book.objects.filter(
+            is_published=True,
+            ordered_book__order__status=Order.Status.COMPLETED.value,
+            ordered_book__order__created_by=self.school,
+        )
+
+    @cached_property
+    def book_catalog_breakdown(self):
+        # Shared by all the catalog fields, computed once when any of them is requested
+        return get_book_catalog_breakdown(self.book_qs, school_report=True)
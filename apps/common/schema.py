@@ -1,23 +1,26 @@
-from collections import defaultdict
-
 import graphene
+from promise import Promise
 from graphene_django import DjangoObjectType
 from graphene_django_extras import DjangoObjectField, PageGraphqlPagination
-from django.db.models import Sum, Count, F, Q, Case, When
+from django.db.models import Sum, F
 
 from utils.graphene.types import CustomDjangoListObjectType, FileFieldType
 from utils.graphene.fields import DjangoPaginatedListObjectField
 
-from apps.common.models import District, Province, Municipality, ActivityLogFile
+from apps.common.models import District, Province, Municipality, ActivityLogFile, ReportSnapshot
 from apps.common.filters import (
     DistrictFilter,
     ProvinceFilter,
     MunicipalityFilter,
 )
-from apps.user.models import User
-from apps.book.models import Book
-from apps.order.models import Order, BookOrder, OrderWindow
-from apps.package.models import SchoolPackage
+from apps.common.analytics import Analytics, book_order_facts
+from apps.common.reports import (
+    REPORT_SNAPSHOT_SLICE_BY_FIELD,
+    SchoolReport,
+    get_number_of_incentive_books,
+)
+from apps.book.enums import BookGradeEnum, BookLanguageEnum
+from apps.order.enums import OrderStatusEnum
 
 
 class ProvinceType(DjangoObjectType):
@@ -175,7 +178,24 @@ class BookCategoriesPerOrderWindowType(graphene.ObjectType):
     grades = graphene.List(graphene.NonNull(BooksPerGradeType))
 
 
+def resolve_report_snapshot_field(attname, default_value, root, info, **kwargs):
+    """
+    Loads only the snapshot slice providing the requested field
+    """
+    report_snapshot_loader = info.context.dl.common.report_snapshot
+    if attname == 'last_refreshed_at':
+        return Promise.all([
+            report_snapshot_loader.load(_slice) for _slice in ReportSnapshot.Slice
+        ]).then(lambda snapshots: min(snapshot.refreshed_at for snapshot in snapshots))
+    return report_snapshot_loader.load(
+        REPORT_SNAPSHOT_SLICE_BY_FIELD[attname]
+    ).then(lambda snapshot: snapshot.data.get(attname, default_value))
+
+
 class ReportType(graphene.ObjectType):
+    class Meta:
+        default_resolver = resolve_report_snapshot_field
+
     number_of_schools_registered = graphene.NonNull(graphene.Int, description='Number of school registered')
     number_of_schools_verified = graphene.NonNull(graphene.Int, description='Number of schools verified')
     number_of_schools_unverified = graphene.NonNull(graphene.Int, description='Number of schools unVerfied')
@@ -231,6 +251,7 @@ class ReportType(graphene.ObjectType):
         BookCategoriesPerOrderWindowType,
         description='Number of grades books ordered per order window'
     )
+    last_refreshed_at = graphene.DateTime(description='Oldest refresh time of the report snapshots')
 
 
 class SchoolReportType(graphene.ObjectType):
@@ -261,259 +282,102 @@ class SchoolReportType(graphene.ObjectType):
         description='Number of books per category for each publisher',
     )
 
+    @staticmethod
+    def resolve_number_of_books_ordered(root, info, **kwargs):
+        return root.order_qs.aggregate(total=Sum('book_order__quantity'))['total']
 
-def get_books_per_publisher_per_category(book_qs, school_report=False):
-    if school_report:
-        books_per_publishers = book_qs.values('publisher__name').annotate(
-            publisher_name=F('publisher__name'),
-            number_of_books=Sum('ordered_book__quantity'),
-            category=F('categories__name'),
-            category_id=F('categories__id'),
-            publisher_id=F('publisher__id')
-        )
-    else:
-        books_per_publishers = book_qs.values('publisher__name').annotate(
-            publisher_name=F('publisher__name'),
-            number_of_books=Count('id'),
-            category=F('categories__name'),
-            category_id=F('categories__id'),
-            publisher_id=F('publisher__id')
-        )
-    publishers = []
-    for item in books_per_publishers:
-        publishers.append(item['publisher_name'])
-    result = []
-    for publisher in list(set(publishers)):
-        result.append({'publisher_name': publisher, 'categories': []})
-    for publisher in result:
-        for books_per_publisher in books_per_publishers:
-            if publisher['publisher_name'] == books_per_publisher['publisher_name']:
-                publisher['publisher_id'] = books_per_publisher['publisher_id']
-                publisher['categories'].append(
-                    {
-                        'number_of_books': books_per_publisher['number_of_books'],
-                        'category': books_per_publisher['category'],
-                        'category_id': books_per_publisher['category_id'],
-                    }
-                )
-    return result
-
-
-def get_book_grades_per_order_window(order_qs, order_window_qs):
-    order_window_title_by_id = {
-        _id: title
-        for _id, title in order_window_qs.values_list('id', 'title').order_by('id')
-    }
-
-    order_qs = order_qs.filter(
-        book_order__book__grade__isnull=False,
-    ).values(
-        'assigned_order_window',
-        'book_order__book__grade',
-    ).annotate(
-        number_of_books=Sum('book_order__quantity'),
-    ).values_list(
-        'assigned_order_window',
-        'book_order__book__grade',
-        'number_of_books',
-    ).order_by(
-        'assigned_order_window',
-        'book_order__book__grade',
-    )
+    @staticmethod
+    def resolve_number_of_incentive_books(root, info, **kwargs):
+        return get_number_of_incentive_books(root.school_package_qs)
 
-    # Group grades by order_window (Grades are sorted from db)
-    grades_by_order_window_id = defaultdict(list)
-    for od_id, grade, number_of_books in order_qs:
-        grades_by_order_window_id[od_id].append(dict(
-            grade=Book.Grade(grade).label,  # Sending label instead of ENUM value
-            number_of_books=number_of_books,
-        ))
-
-    return [
-        # Order Window
-        dict(
-            order_window_id=order_window_id,
-            title=order_window_title,
-            grades=grades_by_order_window_id.get(order_window_id, []),
+    @staticmethod
+    def resolve_payment_per_order_window(root, info, **kwargs):
+        return root.order_window_qs.values('title').annotate(
+            payment=Sum(F('orders__book_order__price') * F('orders__book_order__quantity')),
+            order_window_id=F('id')
         )
-        for order_window_id, order_window_title in order_window_title_by_id.items()
-    ]
 
+    @staticmethod
+    def resolve_books_per_publisher(root, info, **kwargs):
+        return root.book_catalog_breakdown['books_per_publisher']
 
-def get_book_grade_qs(book_qs, school_report=False):
-    if school_report:
-        grade_data = book_qs.filter(grade__isnull=False).values('grade').annotate(
-            number_of_books=Sum('ordered_book__quantity')
-        )
-    else:
-        grade_data = book_qs.filter(grade__isnull=False).values('grade').annotate(
-            number_of_books=Count('id')
-        )
-    formatted_grade_data = [
-        {
-            'grade': Book.Grade(record['grade']).label,
-            'number_of_books': record['number_of_books']
-        } for record in grade_data
-    ]
-    return sorted(formatted_grade_data, key=lambda x: x['grade'])
-
-
-def get_book_languages(book_qs, school_report=False):
-    if school_report:
-        languages_data = book_qs.filter(language__isnull=False).values('language').annotate(
-            number_of_books=Sum('ordered_book__quantity')
-        )
-    else:
-        languages_data = book_qs.filter(language__isnull=False).values('language').annotate(
-            number_of_books=Count('id')
-        )
-    formatted_languages_data = [
-        {
-            'language': Book.LanguageType(record['language']).label,
-            'number_of_books': record['number_of_books']
-        } for record in languages_data
-    ]
-    return sorted(formatted_languages_data, key=lambda x: x['language'])
+    @staticmethod
+    def resolve_books_per_category(root, info, **kwargs):
+        return root.book_catalog_breakdown['books_per_category']
+
+    @staticmethod
+    def resolve_books_per_grade(root, info, **kwargs):
+        return root.book_catalog_breakdown['books_per_grade']
+
+    @staticmethod
+    def resolve_books_per_language(root, info, **kwargs):
+        return root.book_catalog_breakdown['books_per_language']
+
+    @staticmethod
+    def resolve_books_per_publisher_per_category(root, info, **kwargs):
+        return root.book_catalog_breakdown['books_per_publisher_per_category']
+
+
+class AnalyticsFilterInputType(graphene.InputObjectType):
+    date_from = graphene.Date(description='Orders created on or after this date')
+    date_to = graphene.Date(description='Orders created on or before this date')
+    publishers = graphene.List(graphene.NonNull(graphene.ID))
+    order_windows = graphene.List(graphene.NonNull(graphene.ID))
+    provinces = graphene.List(graphene.NonNull(graphene.ID))
+    districts = graphene.List(graphene.NonNull(graphene.ID))
+    municipalities = graphene.List(graphene.NonNull(graphene.ID))
+    grades = graphene.List(graphene.NonNull(BookGradeEnum))
+    languages = graphene.List(graphene.NonNull(BookLanguageEnum))
+    statuses = graphene.List(graphene.NonNull(OrderStatusEnum))
+
+
+class AnalyticsTotalMixin():
+    quantity = graphene.NonNull(graphene.Int, description='Number of books ordered')
+    amount = graphene.NonNull(graphene.Int, description='Total price of the books ordered')
+    orders_count = graphene.NonNull(graphene.Int, description='Number of orders')
+    book_orders_count = graphene.NonNull(graphene.Int, description='Number of book orders')
+
+
+class AnalyticsGroupType(AnalyticsTotalMixin, graphene.ObjectType):
+    key = graphene.String(description='ID (or enum value/date) of the group, null for missing value')
+    name = graphene.String()
+
+
+def resolve_analytics_field(attname, default_value, root, info, **kwargs):
+    """
+    Groups are computed only for the requested dimensions
+    """
+    if attname.startswith('per_'):
+        return root.get_groups(attname[len('per_'):])
+    return root.totals[attname]
+
+
+class AnalyticsType(AnalyticsTotalMixin, graphene.ObjectType):
+    class Meta:
+        default_resolver = resolve_analytics_field
+
+    per_publisher = graphene.List(graphene.NonNull(AnalyticsGroupType))
+    per_order_window = graphene.List(graphene.NonNull(AnalyticsGroupType))
+    per_province = graphene.List(graphene.NonNull(AnalyticsGroupType))
+    per_district = graphene.List(graphene.NonNull(AnalyticsGroupType))
+    per_municipality = graphene.List(graphene.NonNull(AnalyticsGroupType))
+    per_grade = graphene.List(graphene.NonNull(AnalyticsGroupType))
+    per_language = graphene.List(graphene.NonNull(AnalyticsGroupType))
+    per_status = graphene.List(graphene.NonNull(AnalyticsGroupType))
+    per_date = graphene.List(graphene.NonNull(AnalyticsGroupType))
 
 
 class ReportQuery(graphene.ObjectType):
     reports = graphene.Field(ReportType)
+    analytics = graphene.Field(AnalyticsType, filter=AnalyticsFilterInputType())
 
     @staticmethod
     def resolve_reports(root, info, **kwargs):
-        user_qs = User.objects.filter(is_deactivated=False)
-        book_qs = Book.objects.filter(is_published=True)
-        order_qs = Order.objects.filter(status=Order.Status.COMPLETED.value)
-        school_package_qs = SchoolPackage.objects.filter(status=SchoolPackage.Status.DELIVERED.value)
-        district_qs = District.objects.all()
-        order_window_qs = OrderWindow.objects.all()
-
-        return {
-            'number_of_schools_registered': user_qs.filter(user_type=User.UserType.SCHOOL_ADMIN.value).count(),
-
-            'number_of_schools_verified': user_qs.filter(
-                user_type=User.UserType.SCHOOL_ADMIN.value, is_verified=True, is_deactivated=False
-            ).count(),
-
-            'number_of_schools_unverified': user_qs.filter(
-                user_type=User.UserType.SCHOOL_ADMIN.value, is_verified=False, is_deactivated=False
-            ).count(),
-
-            'number_of_publishers': user_qs.filter(user_type=User.UserType.PUBLISHER.value).count(),
-
-            'number_of_books_on_the_platform': book_qs.count(),
-
-            'number_of_incentive_books': school_package_qs.filter(total_quantity__gte=10).aggregate(
-                total_incentive_books=Sum(
-                    Case(
-                        When(total_quantity__lte=30, then=F('total_quantity') * 4),
-                        When(total_quantity__gt=30, then=120)
-                    )
-                )
-            )['total_incentive_books'],
-
-            'number_of_books_ordered': order_qs.aggregate(total=Sum('book_order__quantity'))['total'],
-
-            'number_of_districts_reached': user_qs.filter(
-                user_type=User.UserType.SCHOOL_ADMIN.value, order__isnull=False
-            ).values('school__district').annotate(total=Count('school__district')).order_by('total').count(),
-
-            'number_of_municipalities': user_qs.filter(
-                user_type=User.UserType.SCHOOL_ADMIN.value,
-                order__isnull=False,
-                order__status=Order.Status.COMPLETED.value
-            ).values('school__municipality').distinct().count(),
-
-
-            'number_of_schools_reached': user_qs.filter(
-                user_type=User.UserType.SCHOOL_ADMIN.value,
-                order__status=Order.Status.COMPLETED.value
-            ).distinct().count(),
-
-            'top_selling_books': BookOrder.objects.filter(
-                order__status=Order.Status.COMPLETED.value
-            ).values('title').annotate(
-                sold_count=Count('title'),
-                book_id=F('book_id'),
-            ).order_by('-sold_count')[:5],
-
-            'top_schools': user_qs.filter(
-                user_type=User.UserType.SCHOOL_ADMIN.value,
-                order__status=Order.Status.COMPLETED.value,
-            ).annotate(
-                book_ordered_count=Sum('order__book_order__quantity'),
-                school_name=F('school__name'),
-            ).order_by('-book_ordered_count')[:5].values('school_name', 'school_id', 'book_ordered_count'),
-
-            'users_per_district': district_qs.filter(
-                schools__school_user__isnull=False, schools__school_user__is_deactivated=False
-            ).values('name').annotate(
-                district_id=F('id'),
-                verified_users=Count('schools__school_user', filter=Q(schools__school_user__is_verified=True)),
-                unverified_users=Count('schools__school_user', filter=Q(schools__school_user__is_verified=False)),
-            ),
-
-            'books_ordered_and_incentives_per_district': district_qs.filter(
-                schools__school_user__school_packages__isnull=False
-            ).values('name').annotate(
-                no_of_books_ordered=Sum('schools__school_user__school_packages__total_quantity'),
-                no_of_incentive_books=Sum(
-                    Case(
-                        When(
-                            schools__school_user__school_packages__total_quantity__lte=30,
-                            then=F('schools__school_user__school_packages__total_quantity') * 4
-                        ),
-                        When(
-                            schools__school_user__school_packages__total_quantity__gt=30,
-                            then=120
-                        ),
-                    )
-                ),
-                district_id=F('id')
-            ),
-
-            'deliveries_per_district': district_qs.filter(
-                schools__school_user__school_packages__isnull=False,
-            ).values('name').annotate(
-                school_delivered=Count('schools__school_user__school_packages'),
-                district_id=F('id')
-            ),
-
-            'payment_per_order_window': order_qs.values('assigned_order_window__title').annotate(
-                payment=Sum(F('book_order__price') * F('book_order__quantity')),
-                order_window_id=F('assigned_order_window__id'),
-                title=F('assigned_order_window__title'),
-            ).order_by('assigned_order_window__id'),
-
-            'books_per_publisher': book_qs.values('publisher__name').annotate(
-                number_of_books=Count('id'),
-                publisher_name=F('publisher__name'),
-                publisher_id=F('publisher__id')
-            ),
-
-            'books_per_category': book_qs.values('categories__name').annotate(
-                number_of_books=Count('id'),
-                category=F('categories__name'),
-                category_id=F('categories__id'),
-            ),
-
-            'books_per_grade': get_book_grade_qs(book_qs),
-
-            'books_per_language': get_book_languages(book_qs),
-            'books_per_publisher_per_category': get_books_per_publisher_per_category(book_qs),
-
-            'books_and_cost_per_school': user_qs.filter(
-                user_type=User.UserType.SCHOOL_ADMIN.value,
-                order__status=Order.Status.COMPLETED.value,
-            ).values('school__name').annotate(
-                number_of_books_ordered=Sum('order__book_order__quantity'),
-                school_name=F('school__name'),
-                school_id=F('school__id'),
-                total_cost=Sum(F('order__book_order__price') * F('order__book_order__quantity'))
-            ),
-
-            'book_grades_per_order_window': get_book_grades_per_order_window(order_qs, order_window_qs),
-        }
+        return {}
+
+    @staticmethod
+    def resolve_analytics(root, info, filter=None, **kwargs):
+        return Analytics(book_order_facts, **(filter or {}))
 
 
 class ScholReportQuery(graphene.ObjectType):
@@ -521,50 +385,4 @@ class ScholReportQuery(graphene.ObjectType):
 
     @staticmethod
     def resolve_reports(root, info, **kwargs):
-        order_qs = Order.objects.filter(created_by=info.context.user, status=Order.Status.COMPLETED.value)
-        school_package_qs = SchoolPackage.objects.filter(
-            status=SchoolPackage.Status.DELIVERED.value,
-            school=info.context.user
-        )
-        order_window_qs = OrderWindow.objects.filter(
-            orders__status=Order.Status.COMPLETED.value,
-            orders__created_by=info.context.user
-        )
-        book_qs = Book.objects.filter(
-            is_published=True,
-            ordered_book__order__status=Order.Status.COMPLETED.value,
-            ordered_book__order__created_by=info.context.user
-        )
-
-        return {
-            'number_of_books_ordered': order_qs.aggregate(total=Sum('book_order__quantity'))['total'],
-            'number_of_incentive_books': school_package_qs.filter(total_quantity__gte=10).aggregate(
-                total_incentive_books=Sum(
-                    Case(
-                        When(total_quantity__lte=30, then=F('total_quantity') * 4),
-                        When(total_quantity__gt=30, then=120)
-                    )
-                )
-            )['total_incentive_books'],
-            'payment_per_order_window': order_window_qs.values('title').annotate(
-                payment=Sum(F('orders__book_order__price') * F('orders__book_order__quantity')),
-                order_window_id=F('id')
-            ),
-            'books_per_publisher': book_qs.values('publisher__name').annotate(
-                number_of_books=Sum('ordered_book__quantity'),
-                publisher_name=F('publisher__name'),
-                publisher_id=F('publisher__id')
-            ),
-
-            'books_per_category': book_qs.values('categories__name').annotate(
-                number_of_books=Sum('ordered_book__quantity'),
-                category=F('categories__name'),
-                category_id=F('categories__id'),
-            ),
-
-            'books_per_grade': get_book_grade_qs(book_qs, school_report=True),
-
-            'books_per_language': get_book_languages(book_qs, school_report=True),
-
-            'books_per_publisher_per_category': get_books_per_publisher_per_category(book_qs, school_report=True),
-        }
+        return SchoolReport(info.context.user)
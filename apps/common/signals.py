@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.common.models import District, Municipality, ReportSnapshot
+from apps.common.reports import schedule_report_snapshots_refresh
+from apps.common.analytics import mark_orders_changed
+from utils.graphene.response_cache import is_response_cache_model, invalidate_response_cache
+from apps.user.models import User
+from apps.school.models import School
+from apps.publisher.models import Publisher
+from apps.book.models import Book, Category
+from apps.order.models import Order, BookOrder, OrderWindow
+from apps.order.signals import orders_bulk_updated
+from apps.package.models import SchoolPackage
+
+Slice = ReportSnapshot.Slice
+
+# Report slices affected by changes in each model
+REPORT_SLICES_BY_MODEL = {
+    # Order datasets are scoped to active school users
+    User: (Slice.USERS, Slice.ORDERS),
+    School: (Slice.USERS, Slice.ORDERS, Slice.PACKAGES),
+    # District names are used by the district datasets (users_per_district, ...)
+    District: (Slice.USERS, Slice.ORDERS, Slice.PACKAGES),
+    Municipality: (Slice.ORDERS,),
+    Publisher: (Slice.BOOKS,),
+    Category: (Slice.BOOKS,),
+    # Book titles are used by the order datasets (top_selling_books, ...)
+    Book: (Slice.BOOKS, Slice.ORDERS),
+    Order: (Slice.ORDERS,),
+    BookOrder: (Slice.ORDERS,),
+    OrderWindow: (Slice.ORDERS,),
+    SchoolPackage: (Slice.PACKAGES,),
+}
+
+
+def _is_last_login_update(sender, update_fields):
+    # Login updates user row frequently, which doesn't affect reports
+    return sender == User and update_fields is not None and set(update_fields) <= {'last_login'}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def refresh_report_snapshots_on_change(sender, update_fields=None, **kwargs):
+    slices = REPORT_SLICES_BY_MODEL.get(sender)
+    if not slices or _is_last_login_update(sender, update_fields):
+        return
+    schedule_report_snapshots_refresh(slices)
+
+
+@receiver(m2m_changed, sender=Book.categories.through)
+def refresh_report_snapshots_on_book_categories_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # Categories are only used by the book datasets
+        schedule_report_snapshots_refresh(REPORT_SLICES_BY_MODEL[Category])
+
+
+@receiver(orders_bulk_updated)
+def refresh_report_snapshots_on_orders_bulk_update(sender, **kwargs):
+    schedule_report_snapshots_refresh(REPORT_SLICES_BY_MODEL[Order])
+
+
+def _mark_analytics_orders_changed_on_commit(order_ids):
+    # Facts reloaded before the commit would miss the changes
+    order_ids = list(order_ids)
+    transaction.on_commit(lambda: mark_orders_changed(order_ids))
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def mark_analytics_order_changed(sender, instance, **kwargs):
+    _mark_analytics_orders_changed_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=BookOrder)
+@receiver(post_delete, sender=BookOrder)
+def mark_analytics_book_order_changed(sender, instance, **kwargs):
+    _mark_analytics_orders_changed_on_commit([instance.order_id])
+
+
+@receiver(orders_bulk_updated)
+def mark_analytics_orders_bulk_updated(sender, order_qs, **kwargs):
+    _mark_analytics_orders_changed_on_commit(order_qs.values_list('id', flat=True))
+
+
+def _invalidate_response_cache_on_commit(*models):
+    models = [model for model in models if is_response_cache_model(model)]
+    if models:
+        transaction.on_commit(lambda: invalidate_response_cache(*models))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_response_cache_on_change(sender, **kwargs):
+    _invalidate_response_cache_on_commit(sender)
+
+
+@receiver(m2m_changed)
+def invalidate_response_cache_on_m2m_change(sender, instance, model, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate_response_cache_on_commit(type(instance), model)
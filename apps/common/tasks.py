@@ -19,3 +19,12 @@ def generic_email_sender(subject, message, recipient, html_context=None):
             "emails/generic_email.html", html_context
         )
     send_mail(**email_data)
+
+
+@shared_task(name="report_snapshot_refresher")
+def refresh_report_snapshots(slices=None):
+    from apps.common.reports import update_report_snapshots, clear_report_snapshots_pending
+
+    # Clear pending flags first so that changes made during generation queue a new refresh
+    clear_report_snapshots_pending(slices)
+    update_report_snapshots(slices)
@@ -0,0 +1,189 @@
+import time
+import datetime
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from utils.graphene.tests import GraphQLTestCase
+
+from apps.user.models import User
+from apps.book.models import Book
+from apps.order.models import Order
+from apps.common.analytics import (
+    ANALYTICS_FACTS_MAX_AGE,
+    AnalyticsNotReady,
+    BookOrderFacts,
+    book_order_facts,
+    select_facts,
+    aggregate_facts,
+)
+from apps.user.tests.test_shared_cache import LocalRedisWithCache
+
+from apps.user.factories import UserFactory
+from apps.school.factories import SchoolFactory
+from apps.publisher.factories import PublisherFactory
+from apps.book.factories import BookFactory
+from apps.order.factories import OrderFactory, BookOrderFactory
+
+
+class TestAnalytics(GraphQLTestCase):
+    ANALYTICS_QUERY = '''
+        query MyQuery($filter: AnalyticsFilterInputType) {
+          moderatorQuery {
+            analytics(filter: $filter) {
+              quantity
+              amount
+              ordersCount
+              bookOrdersCount
+              perDistrict {
+                key
+                name
+                quantity
+                ordersCount
+              }
+              perGrade {
+                key
+                name
+                quantity
+              }
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.redis = LocalRedisWithCache()
+        redis_patcher = patch('apps.common.analytics.get_redis_client', return_value=self.redis)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+        # Facts are kept in memory, make sure data from previous tests are not used
+        book_order_facts.reset()
+        self.moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+        self.school1, self.school2 = SchoolFactory.create_batch(2)
+        school_user1 = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN, school=self.school1)
+        school_user2 = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN, school=self.school2)
+        publisher = PublisherFactory.create()
+        book1 = BookFactory.create(publisher=publisher, grade=Book.Grade.GRADE_1, price=10)
+        book2 = BookFactory.create(publisher=publisher, grade=Book.Grade.GRADE_2, price=20)
+
+        order1 = OrderFactory.create(created_by=school_user1, status=Order.Status.COMPLETED)
+        BookOrderFactory.create(order=order1, book=book1, quantity=2)
+        BookOrderFactory.create(order=order1, book=book2, quantity=3)
+        self.order2 = OrderFactory.create(created_by=school_user2, status=Order.Status.PENDING)
+        BookOrderFactory.create(order=self.order2, book=book1, quantity=4)
+
+    def _query_analytics(self, **filters):
+        self.force_login(self.moderator)
+        content = self.query_check(self.ANALYTICS_QUERY, variables={'filter': filters})
+        return content['data']['moderatorQuery']['analytics']
+
+    def test_analytics(self):
+        analytics = self._query_analytics()
+        self.assertEqual(analytics['quantity'], 9)
+        self.assertEqual(analytics['amount'], 2 * 10 + 3 * 20 + 4 * 10)
+        self.assertEqual(analytics['ordersCount'], 2)
+        self.assertEqual(analytics['bookOrdersCount'], 3)
+        self.assertEqual(analytics['perDistrict'], [
+            {'key': str(self.school1.district_id), 'name': self.school1.district.name, 'quantity': 5, 'ordersCount': 1},
+            {'key': str(self.school2.district_id), 'name': self.school2.district.name, 'quantity': 4, 'ordersCount': 1},
+        ])
+        self.assertEqual(analytics['perGrade'], [
+            {'key': Book.Grade.GRADE_1.value, 'name': Book.Grade.GRADE_1.label, 'quantity': 6},
+            {'key': Book.Grade.GRADE_2.value, 'name': Book.Grade.GRADE_2.label, 'quantity': 3},
+        ])
+
+        # Using filters
+        analytics = self._query_analytics(statuses=[self.genum(Order.Status.COMPLETED)])
+        self.assertEqual(analytics['quantity'], 5)
+        analytics = self._query_analytics(grades=[self.genum(Book.Grade.GRADE_1)], districts=[self.school2.district_id])
+        self.assertEqual(analytics['quantity'], 4)
+        self.assertEqual(analytics['perGrade'], [
+            {'key': Book.Grade.GRADE_1.value, 'name': Book.Grade.GRADE_1.label, 'quantity': 4},
+        ])
+        analytics = self._query_analytics(dateFrom=str(self.order2.created_at.date() + datetime.timedelta(days=1)))
+        self.assertEqual(analytics['quantity'], 0)
+        self.assertEqual(analytics['perDistrict'], [])
+
+    def test_analytics_is_updated_incrementally(self):
+        completed_filter = dict(statuses=[self.genum(Order.Status.COMPLETED)])
+        self.assertEqual(self._query_analytics(**completed_filter)['quantity'], 5)
+        self.order2.status = Order.Status.COMPLETED
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order2.save(update_fields=('status',))
+            # Change log is written after the commit
+            self.assertEqual(self._query_analytics(**completed_filter)['quantity'], 5)
+        with patch.object(book_order_facts, 'rebuild', wraps=book_order_facts.rebuild) as rebuild_mock:
+            self.assertEqual(self._query_analytics(**completed_filter)['quantity'], 9)
+            rebuild_mock.assert_not_called()
+        self.assertEqual(self._query_analytics()['bookOrdersCount'], 3)
+
+    def test_changes_of_other_processes_are_applied_incrementally(self):
+        # Facts of an other worker process, change log is shared using redis
+        other_process_facts = BookOrderFacts()
+        other_process_facts.sync()
+        self._query_analytics()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order2.delete()
+        with patch.object(other_process_facts, 'rebuild') as rebuild_mock:
+            columns = other_process_facts.sync()
+            rebuild_mock.assert_not_called()
+        self.assertEqual(int(columns['quantity'][select_facts(columns)].sum()), 5)
+
+    def test_aggregate_facts(self):
+        columns = book_order_facts.sync()
+        mask = select_facts(columns)
+        self.assertEqual(int(mask.sum()), 3)
+        # Orders are counted once per group
+        totals_by_publisher = aggregate_facts(columns, mask, group_by='publisher_id')
+        self.assertEqual(list(totals_by_publisher.values()), [
+            dict(quantity=9, amount=2 * 10 + 3 * 20 + 4 * 10, orders_count=2, book_orders_count=3),
+        ])
+        totals_by_status = aggregate_facts(columns, mask, group_by='status')
+        self.assertEqual(totals_by_status[Order.Status.values.index(Order.Status.COMPLETED)], dict(
+            quantity=5, amount=2 * 10 + 3 * 20, orders_count=1, book_orders_count=2,
+        ))
+        # Rows of the changed orders are inactive
+        order2_id = self.order2.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order2.delete()
+        columns = book_order_facts.sync()
+        mask = select_facts(columns, order_id=[order2_id])
+        self.assertEqual(int(mask.sum()), 0)
+        self.assertEqual(aggregate_facts(columns, mask), {})
+
+    @override_settings(ENABLE_ANALYTICS_FACTS_BACKGROUND_REBUILD=True)
+    def test_analytics_is_rebuilt_in_background(self):
+        with self.settings(ENABLE_ANALYTICS_FACTS_BACKGROUND_REBUILD=False):
+            self.assertEqual(self._query_analytics()['quantity'], 9)
+        book_order_facts.built_at -= datetime.timedelta(seconds=ANALYTICS_FACTS_MAX_AGE + 1)
+        with patch.object(book_order_facts, 'rebuild') as rebuild_mock:
+            # Request doesn't wait for the rebuild, last built columns are used
+            self.assertEqual(self._query_analytics()['quantity'], 9)
+            book_order_facts.wait_for_rebuild()
+            rebuild_mock.assert_called_once()
+
+    @override_settings(ENABLE_ANALYTICS_FACTS_BACKGROUND_REBUILD=True)
+    def test_first_build_is_waited_for(self):
+        # Database connection of the rebuild thread doesn't see the test data, facts are built here
+        built_facts = BookOrderFacts()
+        built_facts.rebuild()
+
+        def _rebuild():
+            time.sleep(0.1)
+            with book_order_facts.lock:
+                book_order_facts._set_buffers(built_facts.buffers)
+                book_order_facts.version = built_facts.version
+                book_order_facts.built_at = built_facts.built_at
+
+        with patch.object(book_order_facts, 'rebuild', side_effect=_rebuild):
+            self.assertEqual(self._query_analytics()['quantity'], 9)
+
+        # Empty columns are not returned, if the first build isn't ready in time
+        book_order_facts.reset()
+        with patch.object(book_order_facts, 'rebuild', side_effect=lambda: time.sleep(0.3)), \
+                patch('apps.common.analytics.ANALYTICS_FACTS_FIRST_BUILD_TIMEOUT', 0.05):
+            self.force_login(self.moderator)
+            content = self.query_check(self.ANALYTICS_QUERY, variables={'filter': {}}, assert_for_error=True)
+            self.assertEqual(content['errors'][0]['message'], str(AnalyticsNotReady()))
+            book_order_facts.wait_for_rebuild()
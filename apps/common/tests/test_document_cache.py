@@ -0,0 +1,83 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from graphql.language.base import parse
+from graphql.validation import validate
+
+from utils.graphene.tests import GraphQLTestCase
+from utils.graphene.backend import document_cache_backend
+
+from apps.user.tests.test_shared_cache import LocalRedisWithCache
+from apps.book.factories import BookFactory
+from apps.publisher.factories import PublisherFactory
+
+
+class TestDocumentCache(GraphQLTestCase):
+    BOOKS_QUERY = '''
+        query MyQuery($pageSize: Int) {
+          books(pageSize: $pageSize) {
+            results {
+              id
+              title
+            }
+          }
+        }
+    '''
+
+    INVALID_QUERY = '''
+        query MyQuery {
+          books {
+            unknownField
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.redis = LocalRedisWithCache()
+        redis_patcher = patch('utils.shared_cache.get_redis_client', return_value=self.redis)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+        # Flush the counters on every lookup
+        stats_patcher = patch('utils.shared_cache.SHARED_CACHE_STATS_FLUSH_INTERVAL', -1)
+        stats_patcher.start()
+        self.addCleanup(stats_patcher.stop)
+        # Counted by the other tests
+        document_cache_backend.stats.count()
+        document_cache_backend.reset_stats()
+        document_cache_backend.clear()
+        self.addCleanup(document_cache_backend.clear)
+
+        BookFactory.create_batch(2, publisher=PublisherFactory.create(), is_published=True)
+
+    def _query(self, query, **kwargs):
+        with patch('utils.graphene.backend.parse', wraps=parse) as parse_mock, \
+                patch('utils.graphene.backend.validate', wraps=validate) as validate_mock:
+            content = self.query(query, **kwargs).json()
+        return content, parse_mock.call_count + validate_mock.call_count
+
+    def test_parsed_and_validated_once(self):
+        content, calls = self._query(self.BOOKS_QUERY, variables=dict(pageSize=1))
+        self.assertEqual(len(content['data']['books']['results']), 1)
+        self.assertEqual(calls, 2)
+        # Same document with other variables uses the cached document
+        content, calls = self._query(self.BOOKS_QUERY, variables=dict(pageSize=2))
+        self.assertEqual(len(content['data']['books']['results']), 2)
+        self.assertEqual(calls, 0)
+
+        stdout = StringIO()
+        call_command('shared_cache_stats', stdout=stdout)
+        self.assertIn('graphql-document-cache: hits 1, misses 1', stdout.getvalue())
+
+    def test_validation_errors_are_cached(self):
+        for expected_calls in [2, 0]:
+            content, calls = self._query(self.INVALID_QUERY)
+            self.assertIn('unknownField', content['errors'][0]['message'])
+            self.assertEqual(calls, expected_calls)
+
+    def test_syntax_errors_are_not_cached(self):
+        for _ in range(2):
+            content, calls = self._query('query {')
+            self.assertIn('Syntax Error', content['errors'][0]['message'])
+            self.assertEqual(calls, 1)
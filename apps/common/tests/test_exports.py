@@ -0,0 +1,100 @@
+import io
+import csv
+
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from utils.graphene.tests import GraphQLTestCase
+
+from apps.user.models import User
+from apps.book.models import Book
+from apps.order.models import Order
+from apps.common.exports import REPORT_EXPORTS
+
+from apps.user.factories import UserFactory
+from apps.school.factories import SchoolFactory
+from apps.publisher.factories import PublisherFactory
+from apps.book.factories import BookFactory
+from apps.order.factories import OrderFactory, BookOrderFactory
+
+
+class TestReportExport(GraphQLTestCase):
+    def setUp(self):
+        super().setUp()
+        self.moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+        self.school_users = [
+            UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN, school=SchoolFactory.create())
+            for _ in range(3)
+        ]
+        self.publisher = PublisherFactory.create()
+        book = BookFactory.create(publisher=self.publisher, price=100, is_published=True, grade=Book.Grade.GRADE_1)
+        for quantity, school_user in enumerate(self.school_users, start=1):
+            order = OrderFactory.create(created_by=school_user, status=Order.Status.COMPLETED)
+            BookOrderFactory.create(order=order, book=book, quantity=quantity)
+
+    def _get_export_url(self, report, file_format):
+        return reverse('common:report-export', kwargs=dict(report=report, file_format=file_format))
+
+    def test_export_csv(self):
+        self.force_login(self.moderator)
+        response = self.client.get(self._get_export_url('books_and_cost_per_school', 'csv'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['School ID', 'School', 'Number of books ordered', 'Total cost'])
+        self.assertEqual(
+            sorted(rows[1:]),
+            sorted([
+                [str(school_user.school_id), school_user.school.name, str(quantity), str(quantity * 100)]
+                for quantity, school_user in enumerate(self.school_users, start=1)
+            ]),
+        )
+
+    def _get_csv_rows(self, report):
+        response = self.client.get(self._get_export_url(report, 'csv'))
+        self.assertEqual(response.status_code, 200)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_export_all_reports(self):
+        self.force_login(self.moderator)
+        for report, (_, columns) in REPORT_EXPORTS.items():
+            with self.subTest(report=report):
+                rows = self._get_csv_rows(report)
+                self.assertEqual(rows[0], [str(header) for _, header in columns])
+                for row in rows[1:]:
+                    self.assertEqual(len(row), len(columns))
+                response = self.client.get(self._get_export_url(report, 'xlsx'))
+                workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+                self.assertEqual(len(list(workbook.active.values)), len(rows))
+        # Querysets
+        self.assertEqual(
+            [row[1:] for row in self._get_csv_rows('top_schools')[1:]],
+            [
+                [school_user.school.name, str(quantity)]
+                for quantity, school_user in reversed(list(enumerate(self.school_users, start=1)))
+            ],
+        )
+        # In memory rows
+        self.assertEqual(
+            self._get_csv_rows('books_per_publisher')[1:],
+            [[str(self.publisher.pk), self.publisher.name, '1']],
+        )
+        self.assertEqual(self._get_csv_rows('books_per_grade')[1:], [[str(Book.Grade.GRADE_1.label), '1']])
+
+    def test_export_xlsx(self):
+        self.force_login(self.moderator)
+        response = self.client.get(self._get_export_url('books_and_cost_per_school', 'xlsx'))
+        self.assertEqual(response.status_code, 200)
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[0], ('School ID', 'School', 'Number of books ordered', 'Total cost'))
+        self.assertEqual(len(rows), 4)
+
+    def test_export_permission(self):
+        url = self._get_export_url('books_and_cost_per_school', 'csv')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.force_login(self.school_users[0])
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.force_login(self.moderator)
+        self.assertEqual(self.client.get(self._get_export_url('unknown', 'csv')).status_code, 404)
+        self.assertEqual(self.client.get(self._get_export_url('books_and_cost_per_school', 'pdf')).status_code, 404)
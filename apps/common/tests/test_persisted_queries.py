@@ -0,0 +1,112 @@
+import os
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+
+from utils.graphene.tests import GraphQLTestCase
+from utils.graphene.backend import get_document_hash
+
+from apps.common.models import PersistedQuery
+from apps.common.persisted_queries import persisted_documents
+from apps.book.factories import BookFactory
+from apps.publisher.factories import PublisherFactory
+
+
+class TestPersistedQueries(GraphQLTestCase):
+    BOOKS_QUERY = '''
+        query MyQuery($pageSize: Int) {
+          books(pageSize: $pageSize) {
+            results {
+              id
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        persisted_documents.clear()
+        self.addCleanup(persisted_documents.clear)
+        BookFactory.create_batch(2, publisher=PublisherFactory.create(), is_published=True)
+        self.books_query_hash = get_document_hash(self.BOOKS_QUERY)
+
+    def _import(self, manifest, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as fp:
+            json.dump(manifest, fp)
+        self.addCleanup(os.remove, fp.name)
+        stdout = StringIO()
+        call_command('import_persisted_queries', fp.name, *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def _post(self, **body):
+        response = self.client.post('/graphql/', json.dumps(body), content_type='application/json')
+        return response.status_code, response.json()
+
+    def _post_hash(self, document_hash, **body):
+        return self._post(
+            extensions={'persistedQuery': {'version': 1, 'sha256Hash': document_hash}},
+            variables={'pageSize': 1},
+            **body,
+        )
+
+    def test_import_manifest(self):
+        output = self._import({self.books_query_hash: self.BOOKS_QUERY})
+        self.assertIn('1 persisted queries imported, 0 already exist', output)
+        other_query = '{ books { totalCount } }'
+        output = self._import({
+            'format': 'apollo-persisted-query-manifest',
+            'version': 1,
+            'operations': [
+                dict(id=get_document_hash(other_query), name=None, type='query', body=other_query),
+            ],
+        }, '--replace')
+        self.assertIn('1 persisted queries imported, 0 already exist, 1 removed', output)
+        self.assertEqual(
+            list(PersistedQuery.objects.values_list('document_hash', flat=True)),
+            [get_document_hash(other_query)],
+        )
+
+        with self.assertRaisesMessage(CommandError, 'hash does not match the document'):
+            self._import({self.books_query_hash: other_query})
+        invalid_query = '{ books { unknownField } }'
+        with self.assertRaisesMessage(CommandError, 'Cannot query field "unknownField"'):
+            self._import({get_document_hash(invalid_query): invalid_query})
+
+    def test_query_using_hash(self):
+        status_code, content = self._post_hash(self.books_query_hash)
+        self.assertEqual(status_code, 400)
+        self.assertEqual(content['errors'][0]['message'], 'PersistedQueryNotFound')
+
+        self._import({self.books_query_hash: self.BOOKS_QUERY})
+        # Unknown hash is cached for PERSISTED_QUERY_LOCAL_TTL
+        persisted_documents.clear()
+        status_code, content = self._post_hash(self.books_query_hash)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(len(content['data']['books']['results']), 1)
+
+        # GET request, extensions as JSON
+        response = self.client.get('/graphql/', {
+            'extensions': json.dumps({'persistedQuery': {'version': 1, 'sha256Hash': self.books_query_hash}}),
+        })
+        self.assertEqual(len(response.json()['data']['books']['results']), 2)
+
+        status_code, content = self._post_hash(self.books_query_hash, query='{ books { totalCount } }')
+        self.assertEqual(status_code, 400)
+        self.assertEqual(content['errors'][0]['message'], 'Provided sha256Hash does not match query')
+
+    @override_settings(ENABLE_PERSISTED_QUERY_ALLOWLIST=True)
+    def test_allowlist(self):
+        self._import({self.books_query_hash: self.BOOKS_QUERY})
+        status_code, content = self._post(query=self.BOOKS_QUERY)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(len(content['data']['books']['results']), 2)
+        status_code, _ = self._post_hash(self.books_query_hash)
+        self.assertEqual(status_code, 200)
+
+        status_code, content = self._post(query='{ books { totalCount } }')
+        self.assertEqual(status_code, 403)
+        self.assertEqual(content['errors'][0]['message'], 'PersistedQueryNotAllowed')
@@ -0,0 +1,95 @@
+from django.test import override_settings
+
+from utils.graphene.tests import GraphQLTestCase
+
+from apps.user.models import User
+from apps.user.factories import UserFactory
+from apps.book.factories import BookFactory
+from apps.publisher.factories import PublisherFactory
+
+
+class TestQueryCost(GraphQLTestCase):
+    BOOKS_QUERY = '''
+        query MyQuery($pageSize: Int) {
+          books(pageSize: $pageSize) {
+            pageSize
+            results {
+              id
+              publisher {
+                id
+              }
+              authors {
+                id
+              }
+            }
+          }
+        }
+    '''
+
+    ORDERS_QUERY = '''
+        query MyQuery {
+          orders(pageSize: 5) {
+            results {
+              id
+              createdBy {
+                id
+              }
+              ...BookOrders
+            }
+          }
+        }
+        fragment BookOrders on OrderType {
+          bookOrders(pageSize: 2) {
+            results {
+              id
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        BookFactory.create_batch(3, publisher=PublisherFactory.create(), is_published=True)
+        self.moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+
+    def _query(self, query, **variables):
+        response = self.query(query, variables=variables)
+        return response.status_code, response.json()
+
+    def test_cost_in_extensions(self):
+        status_code, content = self._query(self.BOOKS_QUERY, pageSize=2)
+        self.assertEqual(status_code, 200)
+        # books: 1, results: 2, publisher: 2, authors: 2 * GRAPHENE_QUERY_COST_LIST_SIZE
+        self.assertEqual(content['extensions']['cost'], dict(requestedQueryCost=25, maximumAvailable=5000))
+
+        self.force_login(self.moderator)
+        status_code, content = self._query(self.ORDERS_QUERY)
+        self.assertEqual(status_code, 200)
+        # orders: 1, results: 5, createdBy: 5, bookOrders: 5, results (of bookOrders): 10
+        self.assertEqual(content['extensions']['cost'], dict(requestedQueryCost=26, maximumAvailable=100000))
+
+    def test_page_size_ceiling(self):
+        status_code, content = self._query(self.BOOKS_QUERY, pageSize=100000)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(content['data']['books']['pageSize'], 50)
+        self.assertEqual(len(content['data']['books']['results']), 3)
+        self.assertEqual(content['extensions']['cost']['requestedQueryCost'], 1 + 50 + 50 + 500)
+
+        status_code, content = self._query(self.BOOKS_QUERY, pageSize=-1)
+        self.assertEqual(content['errors'][0]['message'], 'pageSize should be a positive number')
+
+    @override_settings(GRAPHENE_QUERY_COST_BUDGETS={None: 100, 'default': 200, 'moderator': 1000})
+    def test_budget(self):
+        status_code, content = self._query(self.BOOKS_QUERY, pageSize=5)
+        self.assertEqual(status_code, 200)
+
+        status_code, content = self._query(self.BOOKS_QUERY, pageSize=10)
+        self.assertEqual(status_code, 400)
+        self.assertEqual(content['errors'][0]['message'], 'Query cost 121 exceeds the maximum cost 100')
+        self.assertNotIn('data', content)
+
+        # Budget of the user type
+        self.force_login(UserFactory.create(user_type=User.UserType.INDIVIDUAL_USER))
+        status_code, content = self._query(self.BOOKS_QUERY, pageSize=10)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(content['extensions']['cost']['maximumAvailable'], 200)
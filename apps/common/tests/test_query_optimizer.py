@@ -0,0 +1,166 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from utils.graphene.tests import GraphQLTestCase
+
+from apps.user.models import User
+from apps.book.models import Book
+from apps.blog.models import Blog
+from apps.order.models import Order, OrderActivityLog
+
+from apps.user.factories import UserFactory
+from apps.school.factories import SchoolFactory
+from apps.publisher.factories import PublisherFactory
+from apps.book.factories import BookFactory, AuthorFactory, CategoryFactory, TagFactory
+from apps.order.factories import OrderFactory
+from apps.blog.factories import BlogFactory
+
+
+class TestQueryOptimizer(GraphQLTestCase):
+    BOOKS_QUERY = '''
+        query MyQuery($pageSize: Int) {
+          books(pageSize: $pageSize) {
+            totalCount
+            results {
+              id
+              title
+              publisher {
+                id
+                name
+              }
+              ...BookRelations
+            }
+          }
+        }
+        fragment BookRelations on BookType {
+          authors {
+            id
+            name
+          }
+          categories {
+            id
+            name
+            parentCategory {
+              id
+            }
+          }
+          tags {
+            id
+          }
+        }
+    '''
+
+    ORDERS_QUERY = '''
+        query MyQuery($pageSize: Int) {
+          orders(pageSize: $pageSize) {
+            totalCount
+            results {
+              id
+              createdBy {
+                id
+                fullName
+              }
+              activityLog {
+                id
+                createdBy {
+                  id
+                }
+              }
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+
+    def _get_query_count(self, query, page_size):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(query, variables={'pageSize': page_size})
+        return len(queries), content
+
+    def _assert_constant_query_count(self, query, list_field, total_count):
+        query_count, content = self._get_query_count(query, 2)
+        self.assertEqual(len(content['data'][list_field]['results']), 2)
+        query_count_all, content = self._get_query_count(query, total_count)
+        self.assertEqual(len(content['data'][list_field]['results']), total_count)
+        self.assertEqual(query_count, query_count_all)
+        return content
+
+    def test_books_query_count(self):
+        parent_category = CategoryFactory.create()
+        for _ in range(6):
+            BookFactory.create(
+                publisher=PublisherFactory.create(),
+                is_published=True,
+                authors=AuthorFactory.create_batch(2),
+                categories=[CategoryFactory.create(parent_category=parent_category)],
+                tags=TagFactory.create_batch(2),
+            )
+        self.force_login(self.moderator)
+        content = self._assert_constant_query_count(self.BOOKS_QUERY, 'books', 6)
+        for book in content['data']['books']['results']:
+            self.assertEqual(len(book['authors']), 2)
+            self.assertEqual(len(book['tags']), 2)
+            self.assertEqual(book['categories'][0]['parentCategory']['id'], str(parent_category.pk))
+
+    def test_books_columns(self):
+        query = '''
+            query MyQuery {
+              books {
+                results {
+                  id
+                  title
+                  gradeDisplay
+                  wishlistId
+                  publisher {
+                    name
+                  }
+                }
+              }
+            }
+        '''
+        BookFactory.create(publisher=PublisherFactory.create(), is_published=True, grade=Book.Grade.GRADE_1)
+        self.force_login(self.moderator)
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(query)
+        self.assertEqual(len(content['data']['books']['results']), 1)
+        books_sql = next(
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "book_book"' in query['sql'] and 'LIMIT' in query['sql']
+        )
+        for column in ['title', 'title_en', 'title_ne', 'grade', 'publisher_id']:
+            self.assertIn(f'"book_book"."{column}"', books_sql)
+        self.assertIn('"publisher_publisher"."name"', books_sql)
+        for column in ['description', 'description_ne', 'og_description', 'weight']:
+            self.assertNotIn(f'"book_book"."{column}"', books_sql)
+
+    def test_save_instances_loaded_without_image(self):
+        book = BookFactory.create(publisher=PublisherFactory.create())
+        blog = BlogFactory.create()
+        Book.objects.filter(pk=book.pk).update(image='book/images/cover.png')
+        Blog.objects.filter(pk=blog.pk).update(image='blog/images/cover.png')
+        for model, instance in [(Book, book), (Blog, blog)]:
+            with self.subTest(model=model.__name__), \
+                    patch(f'{model.__module__}.get_social_sharable_image') as get_social_sharable_image_mock:
+                # Image is not loaded
+                model.objects.only('id').get(pk=instance.pk).save()
+                # Deferred image is loaded on access, it is not changed
+                instance = model.objects.only('id').get(pk=instance.pk)
+                self.assertEqual(instance.image.name, f'{model._meta.app_label}/images/cover.png')
+                instance.save()
+                get_social_sharable_image_mock.assert_not_called()
+
+    def test_orders_query_count(self):
+        for _ in range(6):
+            school_user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN, school=SchoolFactory.create())
+            order = OrderFactory.create(created_by=school_user, status=Order.Status.PENDING)
+            OrderActivityLog.objects.create(order=order, created_by=self.moderator, comment='Verified')
+        self.force_login(self.moderator)
+        content = self._assert_constant_query_count(self.ORDERS_QUERY, 'orders', 6)
+        for order in content['data']['orders']['results']:
+            self.assertIsNotNone(order['createdBy'])
+            self.assertEqual(order['activityLog'][0]['createdBy']['id'], str(self.moderator.pk))
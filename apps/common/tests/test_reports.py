@@ -0,0 +1,335 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from utils.graphene.tests import GraphQLTestCase
+
+from apps.user.models import User
+from apps.order.models import Order
+from apps.common.models import ReportSnapshot
+from apps.common.tasks import refresh_report_snapshots
+from apps.common.reports import (
+    get_report_snapshot_pending_key,
+    get_book_catalog_breakdown,
+    schedule_report_snapshots_refresh,
+)
+from apps.user.tests.test_shared_cache import LocalRedisWithCache
+from apps.book.models import Book
+
+from apps.user.factories import UserFactory
+from apps.school.factories import SchoolFactory
+from apps.publisher.factories import PublisherFactory
+from apps.book.factories import BookFactory, CategoryFactory
+from apps.order.factories import OrderFactory, BookOrderFactory
+
+
+class TestReportSnapshot(GraphQLTestCase):
+    REPORTS_QUERY = '''
+        query MyQuery {
+          moderatorQuery {
+            reports {
+              numberOfSchoolsRegistered
+              numberOfPublishers
+              numberOfBooksOnThePlatform
+              numberOfBooksOrdered
+              numberOfSchoolsReached
+              lastRefreshedAt
+              booksPerCategory {
+                category
+                numberOfBooks
+              }
+              usersPerDistrict {
+                name
+                verifiedUsers
+                unverifiedUsers
+              }
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.redis = LocalRedisWithCache()
+        redis_patcher = patch('apps.common.reports.get_redis_client', return_value=self.redis)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+        self.moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+        self.publisher = PublisherFactory.create()
+        UserFactory.create(user_type=User.UserType.PUBLISHER, publisher=self.publisher)
+        self.school_user = UserFactory.create(
+            user_type=User.UserType.SCHOOL_ADMIN, school=SchoolFactory.create(), is_verified=True,
+        )
+        self.category = CategoryFactory.create()
+        self.book = BookFactory.create(publisher=self.publisher, is_published=True, categories=[self.category])
+        order = OrderFactory.create(created_by=self.school_user, status=Order.Status.COMPLETED)
+        BookOrderFactory.create(order=order, book=self.book, quantity=5)
+        self._clear_pending_refreshes()
+
+    def _clear_pending_refreshes(self):
+        # Refreshes scheduled by the previous changes
+        self.redis.delete(*[get_report_snapshot_pending_key(_slice) for _slice in ReportSnapshot.Slice])
+
+    def _query_reports(self):
+        self.force_login(self.moderator)
+        return self.query_check(self.REPORTS_QUERY)['data']['moderatorQuery']['reports']
+
+    def test_reports_are_generated_into_snapshots(self):
+        self.assertEqual(ReportSnapshot.objects.count(), 0)
+        reports = self._query_reports()
+        self.assertEqual(reports['numberOfSchoolsRegistered'], 1)
+        self.assertEqual(reports['numberOfPublishers'], 1)
+        self.assertEqual(reports['numberOfBooksOnThePlatform'], 1)
+        self.assertEqual(reports['numberOfBooksOrdered'], 5)
+        self.assertEqual(reports['numberOfSchoolsReached'], 1)
+        self.assertEqual(reports['booksPerCategory'], [{'category': self.category.name, 'numberOfBooks': 1}])
+        self.assertEqual(reports['usersPerDistrict'], [
+            {'name': self.school_user.school.district.name, 'verifiedUsers': 1, 'unverifiedUsers': 0}
+        ])
+        self.assertIsNotNone(reports['lastRefreshedAt'])
+        # All slices are stored for all languages
+        self.assertEqual(ReportSnapshot.objects.count(), len(ReportSnapshot.Slice) * 2)
+
+    def test_reports_are_served_from_snapshots(self):
+        self._query_reports()
+        order = OrderFactory.create(created_by=self.school_user, status=Order.Status.COMPLETED)
+        BookOrderFactory.create(order=order, book=self.book, quantity=10)
+        # Snapshot isn't refreshed yet
+        self.assertEqual(self._query_reports()['numberOfBooksOrdered'], 5)
+        # Refresh only orders slice
+        books_snapshot = ReportSnapshot.objects.get(slice=ReportSnapshot.Slice.BOOKS, language='en')
+        refresh_report_snapshots([ReportSnapshot.Slice.ORDERS])
+        self.assertEqual(self._query_reports()['numberOfBooksOrdered'], 15)
+        books_snapshot_refreshed_at = books_snapshot.refreshed_at
+        books_snapshot.refresh_from_db()
+        self.assertEqual(books_snapshot.refreshed_at, books_snapshot_refreshed_at)
+
+    def test_changes_refresh_affected_slices(self):
+        self._query_reports()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = OrderFactory.create(created_by=self.school_user, status=Order.Status.COMPLETED)
+            BookOrderFactory.create(order=order, book=self.book, quantity=10)
+        self.assertEqual(self._query_reports()['numberOfBooksOrdered'], 15)
+
+    def test_district_changes_refresh_district_datasets(self):
+        self._query_reports()
+        district = self.school_user.school.district
+        district.name = 'Renamed district'
+        with self.captureOnCommitCallbacks(execute=True):
+            district.save()
+        self.assertEqual(
+            [item['name'] for item in self._query_reports()['usersPerDistrict']],
+            ['Renamed district'],
+        )
+
+    @patch('apps.common.tasks.refresh_report_snapshots.apply_async')
+    def test_refresh_is_debounced(self, apply_async_mock):
+        with self.captureOnCommitCallbacks(execute=True):
+            BookFactory.create(publisher=self.publisher, is_published=True)
+            BookFactory.create(publisher=self.publisher, is_published=True)
+        apply_async_mock.assert_called_once()
+        self.assertEqual(
+            list(apply_async_mock.call_args[1]['args'][0]),
+            [ReportSnapshot.Slice.BOOKS, ReportSnapshot.Slice.ORDERS],
+        )
+
+        # Login doesn't trigger any refresh
+        apply_async_mock.reset_mock()
+        self._clear_pending_refreshes()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.school_user.save(update_fields=['last_login'])
+        apply_async_mock.assert_not_called()
+
+    @patch('apps.common.tasks.refresh_report_snapshots.apply_async')
+    def test_rolled_back_change_does_not_debounce_refresh(self, apply_async_mock):
+        # On commit callbacks are discarded (rollback)
+        with self.captureOnCommitCallbacks():
+            BookFactory.create(publisher=self.publisher, is_published=True)
+        self.assertIsNone(self.redis.get(get_report_snapshot_pending_key(ReportSnapshot.Slice.BOOKS)))
+        with self.captureOnCommitCallbacks(execute=True):
+            BookFactory.create(publisher=self.publisher, is_published=True)
+        apply_async_mock.assert_called_once()
+
+    def test_pending_flag_is_cleared_by_refresh_task(self):
+        slices = [ReportSnapshot.Slice.BOOKS]
+        with patch('apps.common.tasks.refresh_report_snapshots.apply_async') as apply_async_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_report_snapshots_refresh(slices)
+                schedule_report_snapshots_refresh(slices)
+            apply_async_mock.assert_called_once()
+        # Refresh task runs in the celery worker, which doesn't share the web process's django cache
+        with self.settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'celery-worker'},
+        }):
+            with patch('apps.common.reports.update_report_snapshots'):
+                refresh_report_snapshots(slices)
+        self.assertIsNone(self.redis.get(get_report_snapshot_pending_key(ReportSnapshot.Slice.BOOKS)))
+        # Next change is scheduled right after the refresh
+        with patch('apps.common.tasks.refresh_report_snapshots.apply_async') as apply_async_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_report_snapshots_refresh(slices)
+            apply_async_mock.assert_called_once()
+
+    def test_only_selected_slices_are_loaded(self):
+        self._query_reports()
+        query = '''
+            query MyQuery {
+              moderatorQuery {
+                reports {
+                  numberOfBooksOrdered
+                  numberOfSchoolsReached
+                }
+              }
+            }
+        '''
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(query)
+        self.assertEqual(content['data']['moderatorQuery']['reports']['numberOfBooksOrdered'], 5)
+        snapshot_queries = [
+            query['sql'] for query in queries.captured_queries
+            if ReportSnapshot._meta.db_table in query['sql']
+        ]
+        # Both fields are from orders slice, loaded using a single query
+        self.assertEqual(len(snapshot_queries), 1, snapshot_queries)
+        self.assertIn("'orders'", snapshot_queries[0])
+        self.assertNotIn("'books'", snapshot_queries[0])
+
+
+class TestBookCatalogBreakdown(GraphQLTestCase):
+    def setUp(self):
+        super().setUp()
+        self.school_user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN, school=SchoolFactory.create())
+        self.publisher1, self.publisher2 = PublisherFactory.create_batch(2)
+        self.category1, self.category2 = CategoryFactory.create_batch(2)
+        # Book with multiple categories are counted once for non-category dimensions
+        self.book1 = BookFactory.create(
+            publisher=self.publisher1, is_published=True, grade=Book.Grade.GRADE_1,
+            language=Book.LanguageType.NEPALI, categories=[self.category1, self.category2],
+        )
+        self.book2 = BookFactory.create(
+            publisher=self.publisher1, is_published=True, grade=Book.Grade.GRADE_2,
+            language=Book.LanguageType.ENGLISH, categories=[self.category1],
+        )
+        self.book3 = BookFactory.create(
+            publisher=self.publisher2, is_published=True, grade=None,
+            language=Book.LanguageType.ENGLISH, categories=[self.category2],
+        )
+        # Not published
+        BookFactory.create(publisher=self.publisher2, categories=[self.category2])
+        order = OrderFactory.create(created_by=self.school_user, status=Order.Status.COMPLETED)
+        BookOrderFactory.create(order=order, book=self.book1, quantity=3)
+        BookOrderFactory.create(order=order, book=self.book2, quantity=4)
+        other_order = OrderFactory.create(created_by=self.school_user, status=Order.Status.COMPLETED)
+        BookOrderFactory.create(order=other_order, book=self.book1, quantity=5)
+        # Pending order
+        pending_order = OrderFactory.create(created_by=self.school_user, status=Order.Status.PENDING)
+        BookOrderFactory.create(order=pending_order, book=self.book3, quantity=7)
+
+    def _get_breakdown(self, book_qs, **kwargs):
+        with self.assertNumQueries(1):
+            return get_book_catalog_breakdown(book_qs, **kwargs)
+
+    def test_platform_breakdown(self):
+        breakdown = self._get_breakdown(Book.objects.filter(is_published=True))
+        self.assertEqual(breakdown['number_of_books'], 3)
+        self.assertEqual(
+            {item['publisher_id']: item['number_of_books'] for item in breakdown['books_per_publisher']},
+            {self.publisher1.pk: 2, self.publisher2.pk: 1},
+        )
+        self.assertEqual(
+            {item['category_id']: item['number_of_books'] for item in breakdown['books_per_category']},
+            {self.category1.pk: 2, self.category2.pk: 2},
+        )
+        self.assertEqual(breakdown['books_per_grade'], [
+            {'grade': 'Grade 1', 'number_of_books': 1},
+            {'grade': 'Grade 2', 'number_of_books': 1},
+        ])
+        self.assertEqual(breakdown['books_per_language'], [
+            {'language': 'English', 'number_of_books': 2},
+            {'language': 'Nepali', 'number_of_books': 1},
+        ])
+        self.assertEqual(
+            {
+                item['publisher_id']: {
+                    category['category_id']: category['number_of_books']
+                    for category in item['categories']
+                }
+                for item in breakdown['books_per_publisher_per_category']
+            },
+            {
+                self.publisher1.pk: {self.category1.pk: 2, self.category2.pk: 1},
+                self.publisher2.pk: {self.category2.pk: 1},
+            },
+        )
+
+    def test_school_breakdown(self):
+        book_qs = Book.objects.filter(
+            is_published=True,
+            ordered_book__order__status=Order.Status.COMPLETED.value,
+            ordered_book__order__created_by=self.school_user,
+        )
+        breakdown = self._get_breakdown(book_qs, school_report=True)
+        self.assertEqual(
+            {item['publisher_id']: item['number_of_books'] for item in breakdown['books_per_publisher']},
+            {self.publisher1.pk: 12},
+        )
+        self.assertEqual(
+            {item['category_id']: item['number_of_books'] for item in breakdown['books_per_category']},
+            {self.category1.pk: 12, self.category2.pk: 8},
+        )
+        self.assertEqual(breakdown['books_per_grade'], [
+            {'grade': 'Grade 1', 'number_of_books': 8},
+            {'grade': 'Grade 2', 'number_of_books': 4},
+        ])
+        self.assertEqual(breakdown['books_per_language'], [
+            {'language': 'English', 'number_of_books': 4},
+            {'language': 'Nepali', 'number_of_books': 8},
+        ])
+        self.assertEqual(
+            [
+                (item['publisher_id'], {
+                    category['category_id']: category['number_of_books']
+                    for category in item['categories']
+                })
+                for item in breakdown['books_per_publisher_per_category']
+            ],
+            [(self.publisher1.pk, {self.category1.pk: 12, self.category2.pk: 8})],
+        )
+
+
+class TestSchoolReport(GraphQLTestCase):
+    def setUp(self):
+        super().setUp()
+        self.school_user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN, school=SchoolFactory.create())
+        book = BookFactory.create(
+            publisher=PublisherFactory.create(), is_published=True, categories=[CategoryFactory.create()],
+        )
+        order = OrderFactory.create(created_by=self.school_user, status=Order.Status.COMPLETED)
+        BookOrderFactory.create(order=order, book=book, quantity=5)
+
+    def test_only_selected_field_is_computed(self):
+        query = '''
+            query MyQuery {
+              schoolQuery {
+                reports {
+                  numberOfBooksOrdered
+                }
+              }
+            }
+        '''
+        self.force_login(self.school_user)
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(query)
+        self.assertEqual(content['data']['schoolQuery']['reports']['numberOfBooksOrdered'], 5)
+        report_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'SUM(' in query['sql'] or 'COUNT(' in query['sql']
+        ]
+        self.assertEqual(len(report_queries), 1, report_queries)
+        self.assertIn('"order_bookorder"."quantity"', report_queries[0])
+        for table in ('package_schoolpackage', 'order_orderwindow', 'book_book'):
+            self.assertFalse(
+                any(table in query['sql'] for query in queries.captured_queries),
+                f'{table} should not be queried',
+            )
@@ -0,0 +1,127 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from config.urls import CustomGraphQLView
+from utils.graphene.tests import GraphQLTestCase
+from utils.graphene.response_cache import get_version_key
+
+from apps.user.models import User
+from apps.user.tests.test_shared_cache import LocalRedisWithCache
+
+from apps.user.factories import UserFactory
+from apps.publisher.factories import PublisherFactory
+from apps.book.factories import BookFactory
+
+
+@override_settings(ENABLE_GRAPHENE_RESPONSE_CACHE=True)
+class TestResponseCache(GraphQLTestCase):
+    BOOKS_QUERY = '''
+        query MyQuery($pageSize: Int) {
+          books(pageSize: $pageSize, ordering: "id") {
+            totalCount
+            results {
+              id
+              title
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.redis = LocalRedisWithCache()
+        redis_patcher = patch('utils.graphene.response_cache.get_redis_client', return_value=self.redis)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+        self.publisher = PublisherFactory.create()
+        with self.captureOnCommitCallbacks(execute=True):
+            BookFactory.create_batch(2, publisher=self.publisher, is_published=True)
+
+    def _query(self, query=None, **variables):
+        with patch.object(
+            CustomGraphQLView, 'execute_graphql_request', autospec=True,
+            side_effect=CustomGraphQLView.execute_graphql_request,
+        ) as execute_mock:
+            with CaptureQueriesContext(connection) as queries:
+                content = self.query_check(query or self.BOOKS_QUERY, variables=variables)
+        return content['data'], execute_mock.called, len(queries)
+
+    def test_response_cache(self):
+        data, executed, _ = self._query(pageSize=10)
+        self.assertTrue(executed)
+        self.assertEqual(data['books']['totalCount'], 2)
+
+        cached_data, executed, query_count = self._query(pageSize=10)
+        self.assertFalse(executed)
+        self.assertEqual(query_count, 0)
+        self.assertEqual(cached_data, data)
+
+        # Different variables
+        _, executed, _ = self._query(pageSize=1)
+        self.assertTrue(executed)
+
+        # Model change invalidates the cached responses
+        with self.captureOnCommitCallbacks(execute=True):
+            BookFactory.create(publisher=self.publisher, is_published=True)
+        data, executed, _ = self._query(pageSize=10)
+        self.assertTrue(executed)
+        self.assertEqual(data['books']['totalCount'], 3)
+
+        # Related model change also invalidates
+        self._query(pageSize=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publisher.save()
+        _, executed, _ = self._query(pageSize=10)
+        self.assertTrue(executed)
+
+    def test_changes_of_other_processes_invalidate(self):
+        self._query(pageSize=10)
+        _, executed, _ = self._query(pageSize=10)
+        self.assertFalse(executed)
+        # Book changed by an other process (celery, admin, ...), versions are shared using redis
+        self.redis.incr(get_version_key('book.Book'))
+        _, executed, _ = self._query(pageSize=10)
+        self.assertTrue(executed)
+
+    def test_not_cached(self):
+        # Authenticated users
+        self.force_login(UserFactory.create(user_type=User.UserType.MODERATOR))
+        self._query(pageSize=10)
+        _, executed, _ = self._query(pageSize=10)
+        self.assertTrue(executed)
+        self.client.logout()
+
+        # Root fields which are not cached
+        query = '''
+            query MyQuery {
+              books {
+                totalCount
+              }
+              orderWindows {
+                totalCount
+              }
+            }
+        '''
+        for _ in range(2):
+            with patch.object(
+                CustomGraphQLView, 'execute_graphql_request', autospec=True,
+                side_effect=CustomGraphQLView.execute_graphql_request,
+            ) as execute_mock:
+                self.query_check(query, assert_for_error=True)
+            self.assertTrue(execute_mock.called)
+
+    def test_language(self):
+        self._query(pageSize=10)
+        for expected_executed in [True, False]:
+            with patch.object(
+                CustomGraphQLView, 'execute_graphql_request', autospec=True,
+                side_effect=CustomGraphQLView.execute_graphql_request,
+            ) as execute_mock:
+                response = self.query(
+                    self.BOOKS_QUERY, variables=dict(pageSize=10), headers={'HTTP_ACCEPT_LANGUAGE': 'ne'},
+                )
+            self.assertResponseNoErrors(response)
+            self.assertEqual(execute_mock.called, expected_executed)
@@ -0,0 +1,167 @@
+import time
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from utils.graphene.tests import GraphQLTestCase
+from utils.single_flight import run_single_flight
+
+from apps.user.models import User
+from apps.order.schema import OrderStatType
+from apps.user.factories import UserFactory
+from apps.publisher.factories import PublisherFactory
+
+
+class LocalRedis():
+    """
+    In-process stand-in for the redis commands used by single flight
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def _get(self, key):
+        value, expire_at = self.data.get(key, (None, None))
+        if expire_at is not None and expire_at < time.monotonic():
+            self.data.pop(key)
+            return None
+        return value
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key)
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        with self.lock:
+            if nx and self._get(key) is not None:
+                return None
+            if isinstance(value, (str, int)):
+                value = str(value).encode()
+            if ex:
+                px = ex * 1000
+            self.data[key] = (value, px and time.monotonic() + px / 1000)
+            return True
+
+    def eval(self, script, numkeys, key, token):
+        # Only RELEASE_LOCK_SCRIPT is used
+        with self.lock:
+            if self._get(key) == token.encode():
+                self.data.pop(key)
+                return 1
+            return 0
+
+
+@override_settings(ENABLE_SINGLE_FLIGHT=True)
+class TestSingleFlight(GraphQLTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = LocalRedis()
+        redis_patcher = patch('utils.single_flight.get_redis_client', return_value=self.redis)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    def _run_concurrently(self, func, count=10, **options):
+        return self._run_all_concurrently([
+            lambda: run_single_flight('test-key', func, **options)
+            for _ in range(count)
+        ])
+
+    def _run_all_concurrently(self, funcs):
+        barrier = threading.Barrier(len(funcs))
+        results = []
+
+        def _run(func):
+            barrier.wait()
+            try:
+                results.append(func())
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=_run, args=(func,)) for func in funcs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_computation(self):
+        computations = []
+
+        def _compute():
+            computations.append(1)
+            time.sleep(0.3)
+            return {'total': 10}
+
+        results = self._run_concurrently(_compute)
+        self.assertEqual(len(computations), 1)
+        self.assertEqual(results, [{'total': 10}] * 10)
+
+    def test_waiting_calls_compute_after_wait_timeout(self):
+        computations = []
+
+        def _compute():
+            computations.append(1)
+            time.sleep(0.5)
+            return 10
+
+        results = self._run_concurrently(_compute, count=3, wait_timeout=0.1)
+        # Waiting calls don't wait for the slow computation, lock is still held by the first caller
+        self.assertEqual(len(computations), 3)
+        self.assertEqual(results, [10] * 3)
+
+    def test_failed_computation_is_retried_by_waiting_calls(self):
+        computations = []
+
+        def _compute():
+            computations.append(1)
+            time.sleep(0.1)
+            if len(computations) == 1:
+                raise Exception('Failed')
+            return 10
+
+        results = self._run_concurrently(_compute, count=5)
+        # Error is raised only for the first caller, computation is retried by one of the waiting callers
+        self.assertEqual(len(computations), 2)
+        self.assertEqual(len([result for result in results if isinstance(result, Exception)]), 1)
+        self.assertEqual([result for result in results if not isinstance(result, Exception)], [10] * 4)
+
+    def test_result_is_not_used_after_computation(self):
+        computations = []
+
+        def _compute():
+            computations.append(1)
+            return len(computations)
+
+        # Calls which didn't wait for a running computation get a fresh result
+        self.assertEqual(run_single_flight('test-key', _compute), 1)
+        self.assertEqual(run_single_flight('test-key', _compute), 2)
+
+    def test_order_stat_is_shared_by_same_scope_only(self):
+        publisher_user_1, publisher_user_2 = [
+            UserFactory.create(user_type=User.UserType.PUBLISHER, publisher=PublisherFactory.create())
+            for _ in range(2)
+        ]
+
+        def _resolve(user):
+            info = SimpleNamespace(
+                context=SimpleNamespace(user=user),
+                parent_type=SimpleNamespace(name='OrderStatType'),
+                field_name='totalBooksUploaded',
+            )
+            return lambda: OrderStatType.resolve_total_books_uploaded(None, info)
+
+        def _count():
+            time.sleep(0.3)
+            return 5
+
+        with patch('apps.order.schema.Book.objects') as book_objects:
+            book_objects.filter.return_value.count.side_effect = _count
+            results = self._run_all_concurrently([
+                _resolve(user)
+                for user in [publisher_user_1] * 3 + [publisher_user_2] * 3
+            ])
+        self.assertEqual(results, [5] * 6)
+        # Concurrent resolutions are computed once per publisher
+        self.assertEqual(book_objects.filter.call_count, 2)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from apps.common.views import export_report
+
+app_name = 'common'
+
+urlpatterns = [
+    path('reports/<str:report>/export.<str:file_format>', export_report, name='report-export'),
+]
@@ -0,0 +1,28 @@
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, StreamingHttpResponse, FileResponse
+
+from apps.user.models import User
+from apps.common.exports import REPORT_EXPORTS, iter_report_csv, get_report_xlsx
+
+
+def export_report(request, report, file_format):
+    """
+    Streams moderator report dataset as csv/xlsx
+    """
+    if not request.user.is_authenticated or request.user.user_type != User.UserType.MODERATOR:
+        raise PermissionDenied
+    if report not in REPORT_EXPORTS:
+        raise Http404
+    filename = f'{report}.{file_format}'
+    if file_format == 'csv':
+        response = StreamingHttpResponse(iter_report_csv(report), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    elif file_format == 'xlsx':
+        return FileResponse(
+            get_report_xlsx(report),
+            as_attachment=True,
+            filename=filename,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    raise Http404
@@ -37,6 +37,10 @@ class Notification(models.Model):
     class Meta:
         verbose_name = _("Notification")
         verbose_name_plural = _("Notifications")
+        indexes = [
+            # Cursor pagination of the recipient notifications (-created_at, -id)
+            models.Index(fields=['recipient', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return self.title
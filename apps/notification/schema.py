@@ -1,10 +1,11 @@
 import graphene
 from graphene_django import DjangoObjectType
-from graphene_django_extras import DjangoObjectField, PageGraphqlPagination
-from typing import Union
+from graphene_django_extras import DjangoObjectField
 
 from utils.graphene.types import CustomDjangoListObjectType
 from utils.graphene.fields import DjangoPaginatedListObjectField
+from utils.graphene.pagination import CursorPageGraphqlPagination
+from utils.graphene.dataloaders import batch_load
 
 from apps.notification.models import Notification
 from apps.notification.filters import NotificationFilter
@@ -30,9 +31,7 @@ class NotificationType(DjangoObjectType):
     def get_custom_queryset(queryset, info, **kwargs):
         return get_notification_qs(info)
 
-    @staticmethod
-    def resolve_order(root, info, **kwargs) -> Union[Order, None]:
-        return info.context.dl.notification.order.load(root.pk)
+    resolve_order = batch_load('content_object', model=Order)
 
 
 class NotificationWithCountType(graphene.ObjectType):
@@ -61,9 +60,11 @@ class Query(graphene.ObjectType):
     notification = DjangoObjectField(NotificationType)
     notifications = DjangoPaginatedListObjectField(
         NotificationListType,
-        pagination=PageGraphqlPagination(
+        pagination=CursorPageGraphqlPagination(
+            ordering='-created_at',
             page_size_query_param='pageSize'
-        )
+        ),
+        estimated_count=True,
     )
 
     @staticmethod
@@ -1,3 +1,6 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from utils.graphene.tests import GraphQLTestCase
 
 from apps.user.models import User
@@ -116,3 +119,40 @@ class TestNotificationForOrder(GraphQLTestCase):
         self.assertEqual(content['data']['notifications']['unreadCount'], 1)
         self.assertEqual(content['data']['notifications']['readCount'], 0)
         self.assertEqual(content['data']['notifications']['totalCount'], 1)
+
+    def test_notification_orders_query_count(self):
+        query = '''
+            query Query {
+              notifications {
+                results {
+                  id
+                  order {
+                    id
+                    status
+                  }
+                }
+              }
+            }
+        '''
+        orders = OrderFactory.create_batch(4, created_by=self.individual_user)
+        for order in orders:
+            Notification.objects.create(
+                recipient=self.individual_user, title='Order', content_object=order,
+                notification_type=Notification.NotificationType.ORDER_RECEIVED,
+            )
+        # Other targets are not resolved as order
+        Notification.objects.create(recipient=self.individual_user, title='Book', content_object=self.book)
+        self.force_login(self.individual_user)
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(query)
+        results = content['data']['notifications']['results']
+        self.assertEqual(
+            sorted(notification['order']['id'] for notification in results if notification['order']),
+            sorted(str(order.pk) for order in orders),
+        )
+        self.assertEqual(len([notification for notification in results if notification['order'] is None]), 1)
+        data_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "notification_notification"' in query['sql'] or 'FROM "order_order"' in query['sql']
+        ]
+        self.assertEqual(len(data_queries), 2)
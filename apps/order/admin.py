@@ -1,7 +1,7 @@
 from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin
 
-from apps.order.models import CartItem, BookOrder, Order, OrderWindow
+from apps.order.models import CartItem, BookOrder, Order, OrderWindow, Checkout
 
 
 class CartItemAdmin(admin.ModelAdmin):
@@ -31,7 +31,19 @@ class OrderAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('created_by')
 
 
+class CheckoutAdmin(admin.ModelAdmin):
+    list_display = ['id', 'ticket', 'created_by', 'status', 'order', 'created_at']
+    list_display_links = ['id', 'ticket']
+    list_filter = ['status']
+    search_fields = ['ticket', 'created_by__full_name', ]
+    autocomplete_fields = ['created_by', 'order']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('created_by')
+
+
 admin.site.register(CartItem, CartItemAdmin)
 admin.site.register(BookOrder, BookOrderAdmin)
 admin.site.register(Order, OrderAdmin)
 admin.site.register(OrderWindow)
+admin.site.register(Checkout, CheckoutAdmin)
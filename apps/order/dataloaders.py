@@ -2,7 +2,7 @@ from collections import defaultdict
 from django.db import models
 from promise import Promise
 from django.utils.functional import cached_property
-from .models import CartItem, BookOrder
+from .models import Cart, CartItem, BookOrder
 from utils.graphene.dataloaders import DataLoaderWithContext, WithContextMixin
 
 
@@ -18,6 +18,15 @@ class TotalPriceLoader(DataLoaderWithContext):
         return Promise.resolve([total_price.get(key, 0) for key in keys])
 
 
+class CartLoader(DataLoaderWithContext):
+    def batch_load_fn(self, keys):
+        carts = {
+            cart.created_by_id: cart
+            for cart in Cart.objects.filter(created_by__in=keys)
+        }
+        return Promise.resolve([carts.get(key) for key in keys])
+
+
 class BookOrdersLoader(DataLoaderWithContext):
     def batch_load_fn(self, keys):
         book_order_qs = BookOrder.objects.filter(order__in=keys)
@@ -28,11 +37,31 @@ class BookOrdersLoader(DataLoaderWithContext):
         return Promise.resolve([_map[key] for key in keys])
 
 
+class OrderTotalQuantityLoader(DataLoaderWithContext):
+    def batch_load_fn(self, keys):
+        book_order_qs = BookOrder.objects.filter(order__in=keys).order_by().values('order').annotate(
+            total_quantity=models.Sum('quantity')
+        ).values_list('order', 'total_quantity')
+        total_quantity = {
+            order_id: total_quantity
+            for order_id, total_quantity in book_order_qs
+        }
+        return Promise.resolve([total_quantity.get(key) for key in keys])
+
+
 class DataLoaders(WithContextMixin):
     @cached_property
     def total_price(self):
         return TotalPriceLoader(context=self.context)
 
+    @cached_property
+    def cart(self):
+        return CartLoader(context=self.context)
+
     @cached_property
     def book_orders(self):
         return BookOrdersLoader(context=self.context)
+
+    @cached_property
+    def total_quantity(self):
+        return OrderTotalQuantityLoader(context=self.context)
@@ -3,15 +3,17 @@ from utils.graphene.enums import (
     get_enum_name_from_django_field,
 )
 
-from .models import Order, OrderWindow
+from .models import Order, OrderWindow, Checkout
 
 OrderStatusEnum = convert_enum_to_graphene_enum(Order.Status, name='OrderStatusEnum')
 OrderWindowTypeEnum = convert_enum_to_graphene_enum(OrderWindow.OrderWindowType, name='OrderWindowTypeEnum')
+CheckoutStatusEnum = convert_enum_to_graphene_enum(Checkout.Status, name='CheckoutStatusEnum')
 
 enum_map = {
     get_enum_name_from_django_field(field): enum
     for field, enum in (
         (Order.status, OrderStatusEnum),
         (OrderWindow.type, OrderWindowTypeEnum),
+        (Checkout.status, CheckoutStatusEnum),
     )
 }
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.order.models import OrderDailyStat
+
+
+class Command(BaseCommand):
+    help = 'Rebuild order daily stats (used by order stat) from existing orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted per query')
+
+    def handle(self, *args, **options):
+        OrderDailyStat.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Order daily stats rebuilt: {OrderDailyStat.objects.count()} rows'
+        ))
@@ -0,0 +1,85 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.user.models import User
+from apps.book.models import Book
+from apps.order.models import Cart, Checkout, OrderWindow
+from apps.order.serializers import CreateOrderFromCartSerializer, CheckoutSerializer
+
+
+class Command(BaseCommand):
+    help = 'Measures createOrderFromCart (duration and query count) for the cart sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, nargs='+', default=[10, 100, 1000], help='Cart sizes')
+        parser.add_argument('--repeat', type=int, default=5, help='Best time of the repeats is used')
+        parser.add_argument(
+            '--async-checkout', action='store_true',
+            help='Measure the request of the asynchronous checkout (ENABLE_ASYNC_CHECKOUT), the queue is not run',
+        )
+
+    def _get_books(self, count):
+        books = list(Book.objects.order_by('id')[:count])
+        if not books:
+            raise CommandError('At least one book is required')
+        # Copies of the first book are used for the missing books
+        Book.objects.bulk_create([
+            Book(**{
+                **{field.attname: getattr(books[0], field.attname) for field in Book._meta.concrete_fields},
+                'id': None,
+            })
+            for _ in range(count - len(books))
+        ])
+        return list(Book.objects.order_by('id')[:count])
+
+    def _checkout(self, request, serializer_class):
+        with transaction.atomic():
+            serializer = serializer_class(data={}, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+    def _benchmark(self, items, repeat, async_checkout):
+        books = self._get_books(max(items))
+        user = User.objects.create_user(
+            f'checkout-benchmark-{uuid.uuid4().hex}@example.com', user_type=User.UserType.SCHOOL_ADMIN,
+        )
+        if OrderWindow.get_active_window(user) is None:
+            today = timezone.now().date()
+            # bulk_create skips the clean (conflicting order windows)
+            OrderWindow.objects.bulk_create([
+                OrderWindow(
+                    title='Checkout benchmark', start_date=today, end_date=today,
+                    type=OrderWindow.OrderWindowType.SCHOOL,
+                ),
+            ])
+        request = RequestFactory().post('/graphql/')
+        request.user = user
+        serializer_class = CheckoutSerializer if async_checkout else CreateOrderFromCartSerializer
+
+        for count in items:
+            durations = []
+            for _ in range(repeat):
+                Cart.upsert_items(user.pk, {book.pk: 1 for book in books[:count]})
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    self._checkout(request, serializer_class)
+                    durations.append(time.perf_counter() - start)
+                # Checkout in progress is returned for the next request
+                Checkout.objects.filter(created_by=user).delete()
+            self.stdout.write(
+                f'{count:>6} cart items {min(durations) * 1000:>10.2f} ms {len(queries.captured_queries):>4} queries'
+            )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            try:
+                self._benchmark(options['items'], options['repeat'], options['async_checkout'])
+            finally:
+                # Benchmark rows (user, books, orders) are not kept
+                transaction.set_rollback(True)
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('publisher', '0002_publisher_internal_code'),
+        ('order', '0010_auto_20230119_1225'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_transit', 'IN TRANSIT'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=40, verbose_name='Order status')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Orders count')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Quantity')),
+                ('revenue', models.BigIntegerField(default=0, verbose_name='Revenue')),
+                ('order_window', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='order.orderwindow', verbose_name='Order window')),
+                ('publisher', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='publisher.publisher', verbose_name='Publisher')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Order daily stat',
+                'verbose_name_plural': 'Order daily stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='orderdailystat',
+            index=models.Index(fields=['user', 'date'], name='order_order_user_id_0e1925_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdailystat',
+            index=models.Index(fields=['publisher', 'status', 'date'], name='order_order_publish_5c6a73_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdailystat',
+            index=models.Index(fields=['status', 'date'], name='order_order_status_95ca02_idx'),
+        ),
+    ]
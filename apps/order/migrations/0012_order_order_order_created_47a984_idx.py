@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0011_orderdailystat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='order_order_created_47a984_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_carts(apps, schema_editor):
+    Cart = apps.get_model('order', 'Cart')
+    CartItem = apps.get_model('order', 'CartItem')
+    Cart.objects.bulk_create([
+        Cart(
+            created_by_id=row['created_by'],
+            item_count=row['item_count'],
+            total_quantity=row['total_quantity'],
+            total_price=row['total_price'],
+        )
+        for row in CartItem.objects.order_by().values('created_by').annotate(
+            item_count=models.Count('id'),
+            total_quantity=models.Sum('quantity'),
+            total_price=models.Sum(models.F('book__price') * models.F('quantity')),
+        )
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('order', '0012_order_order_order_created_47a984_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_count', models.PositiveIntegerField(default=0, verbose_name='Item count')),
+                ('total_quantity', models.PositiveIntegerField(default=0, verbose_name='Total quantity')),
+                ('total_price', models.BigIntegerField(default=0, verbose_name='Total price')),
+                ('created_by', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cart', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+            ],
+            options={
+                'verbose_name': 'Cart',
+                'verbose_name_plural': 'Carts',
+            },
+        ),
+        migrations.RunPython(create_carts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-18 21:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('order', '0013_cart'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Idempotency key'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='order',
+            unique_together={('created_by', 'idempotency_key')},
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-18 21:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('order', '0014_order_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Checkout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticket', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('idempotency_key', models.CharField(blank=True, max_length=255, null=True, verbose_name='Idempotency key')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=40, verbose_name='Checkout status')),
+                ('errors', models.JSONField(blank=True, null=True, verbose_name='Errors')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkouts', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='order.order', verbose_name='Order')),
+            ],
+            options={
+                'verbose_name': 'Checkout',
+                'verbose_name_plural': 'Checkouts',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['status', 'id'], name='order_check_status_a99fda_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='checkout',
+            unique_together={('created_by', 'idempotency_key')},
+        ),
+    ]
@@ -1,10 +1,14 @@
 import uuid
+from functools import reduce
+from operator import or_
 
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _, gettext
 from django.core.exceptions import ValidationError
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q, Sum, Count
+from django.db.models.functions import Cast, Coalesce
 from apps.book.models import Book
 
 
@@ -110,6 +114,126 @@ class CartItem(models.Model):
     def __str__(self):
         return f'{self.created_by} - {self.book}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Saved values, used to update the cart totals (apps/order/signals.py)
+        instance._saved_values = (instance.__dict__.get('book_id'), instance.__dict__.get('quantity'))
+        return instance
+
+
+class Cart(models.Model):
+    """
+    Cart header: Totals of the user's cart items, updated with F() expressions in the same transaction as the
+    cart item changes (apps/order/signals.py). Total price uses the current book prices.
+    """
+    created_by = models.OneToOneField(
+        'user.User', on_delete=models.CASCADE, related_name='cart', verbose_name=_('Created by'),
+    )
+    item_count = models.PositiveIntegerField(default=0, verbose_name=_('Item count'))
+    total_quantity = models.PositiveIntegerField(default=0, verbose_name=_('Total quantity'))
+    total_price = models.BigIntegerField(default=0, verbose_name=_('Total price'))
+
+    class Meta:
+        verbose_name = _('Cart')
+        verbose_name_plural = _('Carts')
+
+    def __str__(self):
+        return str(self.created_by_id)
+
+    @classmethod
+    def get_for_user(cls, user):
+        """
+        Returns cart of the user, unsaved empty cart if the user doesn't have one
+        """
+        return cls.objects.filter(created_by=user).first() or cls(created_by=user)
+
+    @classmethod
+    def update_totals(cls, user_id, item_count=0, quantity=0, price=0):
+        """
+        Adds the changes to the totals, the cart is created using the cart items if it doesn't exist
+        """
+        updated = cls.objects.filter(created_by=user_id).update(
+            item_count=models.F('item_count') + item_count,
+            total_quantity=models.F('total_quantity') + quantity,
+            total_price=models.F('total_price') + price,
+        )
+        if not updated:
+            cls.refresh_totals([user_id], create=True)
+
+    @classmethod
+    def refresh_totals(cls, user_ids, create=False):
+        """
+        Recalculates the totals of the users using the cart items (eg: book price change)
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        cart_item_qs = CartItem.objects.filter(created_by=models.OuterRef('created_by')).order_by().values('created_by')
+
+        def _subquery(aggregate):
+            return Coalesce(
+                models.Subquery(cart_item_qs.annotate(value=aggregate).values('value')),
+                0,
+            )
+
+        with transaction.atomic():
+            if create:
+                for user_id in user_ids:
+                    cls.objects.get_or_create(created_by_id=user_id)
+            # Locked before the aggregation, so that the concurrent changes are included
+            list(cls.objects.select_for_update().filter(created_by__in=user_ids).values_list('pk'))
+            cls.objects.filter(created_by__in=user_ids).update(
+                item_count=_subquery(Count('id')),
+                total_quantity=_subquery(Sum('quantity')),
+                total_price=_subquery(Sum(models.F('book__price') * models.F('quantity'))),
+            )
+
+    @classmethod
+    def clear(cls, user_id):
+        """
+        Deletes the cart items of the user and resets the totals
+        """
+        with transaction.atomic():
+            # Signals are not required, the totals are reset here
+            cart_item_qs = CartItem.objects.filter(created_by=user_id)
+            cart_item_qs._raw_delete(cart_item_qs.db)
+            cls.objects.filter(created_by=user_id).update(item_count=0, total_quantity=0, total_price=0)
+
+    @classmethod
+    def upsert_items(cls, user_id, quantities):
+        """
+        Sets the quantity of the user's cart items ({book_id: quantity}), cart items are created for the new books.
+        Bulk operations don't send the signals, the totals are recalculated once. Returns the cart items.
+        """
+        with transaction.atomic():
+            cls.objects.get_or_create(created_by_id=user_id)
+            # Concurrent upserts of the user wait here, so that a book is not added twice
+            list(cls.objects.select_for_update().filter(created_by=user_id).values_list('pk'))
+            cart_items = list(CartItem.objects.filter(created_by=user_id, book__in=quantities.keys()))
+            for cart_item in cart_items:
+                cart_item.quantity = quantities[cart_item.book_id]
+            CartItem.objects.bulk_update(cart_items, ['quantity'])
+            existing_book_ids = {cart_item.book_id for cart_item in cart_items}
+            cart_items += CartItem.objects.bulk_create([
+                CartItem(created_by_id=user_id, book_id=book_id, quantity=quantity)
+                for book_id, quantity in quantities.items()
+                if book_id not in existing_book_ids
+            ])
+            cls.refresh_totals([user_id])
+        cart_items_by_book = {cart_item.book_id: cart_item for cart_item in cart_items}
+        return [cart_items_by_book[book_id] for book_id in quantities]
+
+    @classmethod
+    def remove_items(cls, user_id, cart_item_ids):
+        """
+        Deletes the cart items of the user, the totals are recalculated once
+        """
+        with transaction.atomic():
+            cart_item_qs = CartItem.objects.filter(created_by=user_id, id__in=cart_item_ids)
+            cart_item_qs._raw_delete(cart_item_qs.db)
+            cls.refresh_totals([user_id])
+
 
 class BookOrder(models.Model):
     title = models.CharField(max_length=255, verbose_name=_('Title'))
@@ -163,7 +287,7 @@ class BookOrder(models.Model):
                 f'title_{lang}'
                 for lang, _ in settings.LANGUAGES
             ),
-            'publisher',
+            'publisher_id',
             'price',
             'isbn',
             'edition',
@@ -210,15 +334,77 @@ class Order(models.Model):
         default=Status.PENDING,
         verbose_name=_("Order status")
     )
+    # Sent by the client with createOrderFromCart, retried requests get the same order
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, verbose_name=_('Idempotency key'))
 
     class Meta:
         verbose_name = _('Order')
         verbose_name_plural = _('Orders')
+        unique_together = ('created_by', 'idempotency_key')
+        indexes = [
+            # Cursor pagination (-created_at, -id)
+            models.Index(fields=['created_at', 'id']),
+        ]
 
     def __str__(self):
         return self.status
 
 
+class Checkout(models.Model):
+    """
+    Asynchronous checkout (settings.ENABLE_ASYNC_CHECKOUT): createOrderFromCart returns the ticket and the order is
+    created by the checkout queue (apps/order/tasks.py), progress is reported by checkoutStatus
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pending')  # Waiting in the queue
+        PROCESSING = 'processing', _('Processing')
+        COMPLETED = 'completed', _('Completed')
+        FAILED = 'failed', _('Failed')
+
+    ticket = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_by = models.ForeignKey(
+        'user.User', on_delete=models.CASCADE, related_name='checkouts', verbose_name=_('Created by'),
+    )
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, verbose_name=_('Idempotency key'))
+    status = models.CharField(
+        max_length=40, choices=Status.choices, default=Status.PENDING, verbose_name=_('Checkout status'),
+    )
+    order = models.ForeignKey(
+        Order, on_delete=models.SET_NULL, related_name='+', null=True, blank=True, verbose_name=_('Order'),
+    )
+    # Mutation errors of the failed checkout
+    errors = models.JSONField(null=True, blank=True, verbose_name=_('Errors'))
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Checkout')
+        verbose_name_plural = _('Checkouts')
+        unique_together = ('created_by', 'idempotency_key')
+        indexes = [
+            # Pending checkouts (admission control, queue position)
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return str(self.ticket)
+
+    @classmethod
+    def get_in_progress(cls, user):
+        return cls.objects.filter(
+            created_by=user,
+            status__in=[cls.Status.PENDING, cls.Status.PROCESSING],
+        ).order_by('id').first()
+
+    def get_queue_position(self):
+        """
+        Position of the pending checkout in the queue, starting from 1
+        """
+        if self.status != self.Status.PENDING:
+            return None
+        return Checkout.objects.filter(status=self.Status.PENDING, id__lt=self.id).count() + 1
+
+
 class OrderActivityLog(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='activity_logs')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -233,3 +419,106 @@ class OrderActivityLog(models.Model):
 
     class Meta:
         ordering = ('-id',)
+
+
+class OrderDailyStat(models.Model):
+    """
+    Daily rollup of orders per (date, user, publisher, order window, status).
+    Rows without publisher hold the totals across all publishers.
+    """
+    date = models.DateField(verbose_name=_('Date'))
+    user = models.ForeignKey(
+        'user.User', on_delete=models.CASCADE, related_name='+', verbose_name=_('User'),
+    )
+    publisher = models.ForeignKey(
+        'publisher.Publisher', on_delete=models.CASCADE, related_name='+', verbose_name=_('Publisher'),
+        null=True, blank=True,
+    )
+    order_window = models.ForeignKey(
+        OrderWindow, on_delete=models.SET_NULL, related_name='+', verbose_name=_('Order window'),
+        null=True, blank=True,
+    )
+    status = models.CharField(max_length=40, choices=Order.Status.choices, verbose_name=_('Order status'))
+    orders_count = models.PositiveIntegerField(default=0, verbose_name=_('Orders count'))
+    quantity = models.PositiveIntegerField(default=0, verbose_name=_('Quantity'))
+    revenue = models.BigIntegerField(default=0, verbose_name=_('Revenue'))
+
+    class Meta:
+        verbose_name = _('Order daily stat')
+        verbose_name_plural = _('Order daily stats')
+        indexes = [
+            models.Index(fields=['user', 'date']),
+            models.Index(fields=['publisher', 'status', 'date']),
+            models.Index(fields=['status', 'date']),
+        ]
+
+    def __str__(self):
+        return f'{self.date} - {self.user_id} - {self.status}'
+
+    @staticmethod
+    def get_order_date(created_at):
+        # Same as Cast('created_at', DateField()) (Database connection uses UTC)
+        return created_at.astimezone(timezone.utc).date()
+
+    @classmethod
+    def _generate(cls, order_qs):
+        order_qs = order_qs.order_by().annotate(created_at_date=Cast('created_at', models.DateField()))
+        group_by_fields = ('created_at_date', 'created_by', 'assigned_order_window', 'status')
+        aggregates = dict(
+            orders_count=Count('id', distinct=True),
+            total_quantity=Sum('book_order__quantity'),
+            total_revenue=Sum('book_order__total_price'),
+        )
+        for qs in [
+            # Totals across publishers
+            order_qs.values(*group_by_fields),
+            # Per publisher
+            order_qs.filter(book_order__isnull=False).values(*group_by_fields, 'book_order__publisher'),
+        ]:
+            for row in qs.annotate(**aggregates):
+                yield cls(
+                    date=row['created_at_date'],
+                    user_id=row['created_by'],
+                    publisher_id=row.get('book_order__publisher'),
+                    order_window_id=row['assigned_order_window'],
+                    status=row['status'],
+                    orders_count=row['orders_count'],
+                    quantity=row['total_quantity'] or 0,
+                    revenue=row['total_revenue'] or 0,
+                )
+
+    @classmethod
+    def refresh(cls, user_dates):
+        """
+        Rebuild the rows of the given (user_id, date) pairs using the orders
+        """
+        user_dates = set(user_dates)
+        if not user_dates:
+            return
+        order_qs = Order.objects.annotate(
+            created_at_date=Cast('created_at', models.DateField()),
+        ).filter(
+            reduce(or_, [Q(created_by=user_id, created_at_date=date) for user_id, date in user_dates])
+        )
+        with transaction.atomic():
+            cls.objects.filter(
+                reduce(or_, [Q(user=user_id, date=date) for user_id, date in user_dates])
+            ).delete()
+            cls.objects.bulk_create(cls._generate(order_qs))
+
+    @classmethod
+    def refresh_for_orders(cls, order_qs):
+        cls.refresh(
+            order_qs.order_by().annotate(
+                created_at_date=Cast('created_at', models.DateField()),
+            ).values_list('created_by', 'created_at_date').distinct()
+        )
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """
+        Rebuild all rows from scratch
+        """
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(cls._generate(Order.objects.all()), batch_size=batch_size)
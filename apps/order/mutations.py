@@ -1,7 +1,9 @@
 import graphene
+from django.conf import settings
 from django.db.models import F
+from django.utils.translation import gettext
 
-from utils.graphene.error_types import CustomErrorType
+from utils.graphene.error_types import CustomErrorType, mutation_is_not_valid
 from utils.graphene.mutation import (
     generate_input_type_for_serializer,
     CreateUpdateGrapheneMutation,
@@ -10,10 +12,12 @@ from utils.graphene.mutation import (
 from config.permissions import UserPermissions
 
 from apps.user.models import User
-from apps.order.models import CartItem, Order
-from apps.order.schema import CartItemType, OrderType
+from apps.order.models import Cart, CartItem, Order
+from apps.order.schema import CartItemType, CheckoutType, OrderType
 from apps.order.serializers import (
     CartItemSerializer,
+    CartItemBulkUpsertSerializer,
+    CheckoutSerializer,
     CreateOrderFromCartSerializer,
     OrderUpdateSerializer,
 )
@@ -60,13 +64,68 @@ class DeleteCartItem(CartItemMixin, DeleteMutation):
     permissions = [UserPermissions.Permission.CAN_CRUD_CART_ITEM]
 
 
+class BulkUpsertCartItems(CreateUpdateGrapheneMutation):
+    class Arguments:
+        items = graphene.List(graphene.NonNull(CartItemInputType), required=True)
+    serializer_class = CartItemBulkUpsertSerializer
+    result = graphene.List(graphene.NonNull(CartItemType))
+    permissions = [UserPermissions.Permission.CAN_CRUD_CART_ITEM]
+
+    @classmethod
+    def perform_mutate(cls, root, info, **kwargs):
+        # Existing cart items of the books are updated, errors are returned per item
+        instances, errors = cls._save_item({'items': kwargs['items']}, info)
+        return cls(result=instances, errors=errors, ok=not errors)
+
+
+class BulkDeleteCartItems(CartItemMixin, CreateUpdateGrapheneMutation):
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+    model = CartItem
+    result = graphene.List(graphene.NonNull(CartItemType))
+    permissions = [UserPermissions.Permission.CAN_CRUD_CART_ITEM]
+
+    @classmethod
+    def perform_mutate(cls, root, info, **kwargs):
+        ids = {str(id) for id in kwargs['ids']}
+        instances = list(cls.get_queryset(info).filter(id__in=[id for id in ids if id.isdigit()]))
+        not_found_ids = ids - {str(instance.id) for instance in instances}
+        if not_found_ids:
+            return cls(result=None, errors=[dict(
+                field='ids',
+                messages=gettext('Cart items not found: %(ids)s') % dict(ids=', '.join(sorted(not_found_ids))),
+            )], ok=False)
+        Cart.remove_items(info.context.user.pk, [instance.id for instance in instances])
+        return cls(result=instances, errors=None, ok=True)
+
+
+CreateOrderFromCartInputType = generate_input_type_for_serializer(
+    'CreateOrderFromCartInputType',
+    serializer_class=CreateOrderFromCartSerializer
+)
+
+
 class CreateOrderFromCart(CreateUpdateGrapheneMutation):
+    class Arguments:
+        data = CreateOrderFromCartInputType()
     errors = graphene.List(graphene.NonNull(CustomErrorType))
     ok = graphene.Boolean()
     result = graphene.Field(OrderType)
+    # With settings.ENABLE_ASYNC_CHECKOUT, order is created later (checkoutStatus)
+    checkout = graphene.Field(CheckoutType)
     permissions = [UserPermissions.Permission.CREATE_ORDER]
     serializer_class = CreateOrderFromCartSerializer
 
+    @classmethod
+    def perform_mutate(cls, root, info, **kwargs):
+        if not settings.ENABLE_ASYNC_CHECKOUT:
+            return super().perform_mutate(root, info, **kwargs)
+        serializer = CheckoutSerializer(data=kwargs.get('data', {}), context={'request': info.context})
+        errors = mutation_is_not_valid(serializer)
+        if errors:
+            return cls(errors=errors, ok=False)
+        return cls(checkout=serializer.save(), errors=None, ok=True)
+
 
 class OrderMutationMixin():
     @classmethod
@@ -101,5 +160,7 @@ class Mutation(graphene.ObjectType):
     create_cart_item = CreateCartItem.Field()
     update_cart_item = UpdateCartItem.Field()
     delete_cart_item = DeleteCartItem.Field()
+    bulk_upsert_cart_items = BulkUpsertCartItems.Field()
+    bulk_delete_cart_items = BulkDeleteCartItems.Field()
     create_order_from_cart = CreateOrderFromCart.Field()
     update_order = UpdateOrder.Field()
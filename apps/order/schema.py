@@ -5,22 +5,27 @@ from graphene_django import DjangoObjectType
 from graphene_django_extras import PageGraphqlPagination, DjangoObjectField
 
 from django.db.models import QuerySet, F, Sum, Count
-from django.db.models.fields import DateField
-from django.db.models.functions import Cast
 
 from utils.graphene.types import CustomDjangoListObjectType, FileFieldType
 from utils.graphene.fields import DjangoPaginatedListObjectField, CustomDjangoListField
+from utils.graphene.pagination import CursorPageGraphqlPagination
 from utils.graphene.enums import EnumDescription
+from utils.graphene.error_types import CustomErrorType
+from utils.graphene.optimizer import OptimizerHint
+from utils.graphene.dataloaders import batch_load
+from utils.single_flight import single_flight
 
 from apps.user.models import User
 from apps.book.models import Book
 
 from .models import (
     CartItem,
+    Checkout,
     Order,
     BookOrder,
     OrderWindow,
     OrderActivityLog,
+    OrderDailyStat,
 )
 from .filters import (
     BookOrderFilterSet,
@@ -28,7 +33,7 @@ from .filters import (
     OrderWindowFilterSet,
     OrderActivityLogFilterSet,
 )
-from .enums import OrderStatusEnum, OrderWindowTypeEnum
+from .enums import OrderStatusEnum, OrderWindowTypeEnum, CheckoutStatusEnum
 from apps.book.enums import BookGradeEnum, BookLanguageEnum
 
 
@@ -51,6 +56,18 @@ def get_orders_qs(info):
     return _qs().distinct()
 
 
+def get_order_daily_stat_qs(info):
+    user = info.context.user
+    if user.user_type == User.UserType.PUBLISHER.value:
+        if user.publisher_id is None:
+            return OrderDailyStat.objects.none()
+        return OrderDailyStat.objects.filter(publisher=user.publisher_id, user__is_deactivated=False)
+    # Rows without publisher holds the totals
+    elif user.user_type == User.UserType.MODERATOR.value:
+        return OrderDailyStat.objects.filter(publisher__isnull=True, user__is_deactivated=False)
+    return OrderDailyStat.objects.filter(publisher__isnull=True, user=user)
+
+
 class OrderWindowType(DjangoObjectType):
     type = graphene.Field(OrderWindowTypeEnum)
 
@@ -87,12 +104,21 @@ class CartGrandTotalType(graphene.ObjectType):
         )
 
     @staticmethod
-    def resolve_grand_total_price(root, info, **kwargs) -> QuerySet:
-        return get_cart_items_qs(info).aggregate(Sum('total_price'))['total_price__sum']
+    def _get_cart_total(info, field):
+        # Totals are maintained in the cart header (Cart), empty cart doesn't have totals
+        if not info.context.user.is_authenticated:
+            return None
+        return info.context.dl.cart_item.cart.load(info.context.user.pk).then(
+            lambda cart: getattr(cart, field) if cart is not None and cart.item_count else None
+        )
+
+    @staticmethod
+    def resolve_grand_total_price(root, info, **kwargs):
+        return CartGrandTotalType._get_cart_total(info, 'total_price')
 
     @staticmethod
     def resolve_total_quantity(root, info, **kwargs):
-        return get_cart_items_qs(info).aggregate(Sum('quantity'))['quantity__sum']
+        return CartGrandTotalType._get_cart_total(info, 'total_quantity')
 
 
 class CartType(CustomDjangoListObjectType, CartGrandTotalType):
@@ -138,7 +164,8 @@ class OrderType(DjangoObjectType):
         BookOrderListType,
         pagination=PageGraphqlPagination(
             page_size_query_param='pageSize'
-        )
+        ),
+        batch_key='order',
     )
     total_quantity = graphene.Int()
     activity_log = graphene.List(graphene.NonNull(OrderActivityLogType))
@@ -146,6 +173,12 @@ class OrderType(DjangoObjectType):
     status = graphene.Field(OrderStatusEnum)
     status_display = EnumDescription(source='get_status_display')
 
+    optimizer_hints = dict(
+        activity_log=OptimizerHint(relation='activity_logs'),
+        book_orders=OptimizerHint(only=()),
+        total_quantity=OptimizerHint(only=()),
+    )
+
     class Meta:
         model = Order
         fields = ('id', 'order_code', 'total_price', 'created_by', 'status', 'created_at')
@@ -154,18 +187,26 @@ class OrderType(DjangoObjectType):
     def get_custom_queryset(queryset, info):
         return get_orders_qs(info)
 
-    @staticmethod
-    def resolve_activity_log(root, info, **kwargs):
-        # FIXME: Use dataloader
-        return root.activity_logs.all()
+    resolve_activity_log = batch_load('activity_logs')
 
     @staticmethod
-    def resolve_book_orders(root, info, **kwargs):
-        return root.book_order.select_related('publisher')
+    def resolve_total_quantity(root, info, **kwargs):
+        return info.context.dl.cart_item.total_quantity.load(root.pk)
+
+
+class CheckoutType(DjangoObjectType):
+    status = graphene.Field(CheckoutStatusEnum, required=True)
+    status_display = EnumDescription(source='get_status_display')
+    queue_position = graphene.Int()
+    errors = graphene.List(graphene.NonNull(CustomErrorType))
+
+    class Meta:
+        model = Checkout
+        fields = ('ticket', 'status', 'order', 'created_at', 'updated_at')
 
     @staticmethod
-    def resolve_total_quantity(root, info, **kwargs):
-        return root.book_order.aggregate(Sum('quantity'))['quantity__sum']
+    def resolve_queue_position(root, info, **kwargs):
+        return root.get_queue_position()
 
 
 class OrderListType(CustomDjangoListObjectType):
@@ -179,9 +220,19 @@ class OrderStatisticType(graphene.ObjectType):
     total_quantity = graphene.Int()
 
 
+def get_order_stat_scope(info):
+    # Same as get_order_daily_stat_qs
+    user = info.context.user
+    if user.user_type == User.UserType.PUBLISHER.value:
+        return (user.user_type, user.publisher_id)
+    elif user.user_type == User.UserType.MODERATOR.value:
+        return (user.user_type,)
+    return (user.user_type, user.pk)
+
+
 def get_stat_daterange():
     stat_to = timezone.now()
-    return stat_to - timezone.timedelta(90), stat_to
+    return (stat_to - timezone.timedelta(90)).date(), stat_to.date()
 
 
 class OrderStatType(graphene.ObjectType):
@@ -194,6 +245,7 @@ class OrderStatType(graphene.ObjectType):
         fields = ()
 
     @staticmethod
+    @single_flight(scope=get_order_stat_scope)
     def resolve_total_books_uploaded(root, info, **kwargs):
         '''
         Returns total books uploaded count
@@ -205,6 +257,7 @@ class OrderStatType(graphene.ObjectType):
         return Book.objects.filter(created_by=info.context.user).count()
 
     @staticmethod
+    @single_flight(scope=get_order_stat_scope)
     def resolve_orders_completed_count(root, info, **kwargs):
         '''
         Returns total orders completed in last 3 months
@@ -212,11 +265,12 @@ class OrderStatType(graphene.ObjectType):
         stat_from, stat_to = get_stat_daterange()
         return root.filter(
             status=Order.Status.COMPLETED.value,
-            created_at__gte=stat_from,
-            created_at__lte=stat_to
-        ).count()
+            date__gte=stat_from,
+            date__lte=stat_to
+        ).aggregate(total=Sum('orders_count'))['total'] or 0
 
     @staticmethod
+    @single_flight(scope=get_order_stat_scope)
     def resolve_total_books_ordered(root, info, **kwargs):
         '''
         Returns total books ordered in last 3 months
@@ -224,11 +278,12 @@ class OrderStatType(graphene.ObjectType):
         stat_from, stat_to = get_stat_daterange()
         return root.filter(
             status=Order.Status.COMPLETED.value,
-            created_at__gte=stat_from,
-            created_at__lte=stat_to
-        ).aggregate(Sum('book_order__quantity'))['book_order__quantity__sum']
+            date__gte=stat_from,
+            date__lte=stat_to
+        ).aggregate(total=Sum('quantity'))['total']
 
     @staticmethod
+    @single_flight(scope=get_order_stat_scope)
     def resolve_stat(root, info, **kwargs):
         '''
         Returns order stat of in last 3 months
@@ -236,11 +291,11 @@ class OrderStatType(graphene.ObjectType):
         stat_from, stat_to = get_stat_daterange()
         return root.filter(
             status=Order.Status.COMPLETED.value,
-            created_at__gte=stat_from,
-            created_at__lte=stat_to
-        ).annotate(created_at_date=Cast('created_at', DateField())).values('created_at_date').annotate(
-            total_quantity=Sum('book_order__quantity')
-        ).values('created_at_date', 'total_quantity')
+            date__gte=stat_from,
+            date__lte=stat_to
+        ).values('date').annotate(
+            total_quantity=Sum('quantity')
+        ).order_by('date').values('total_quantity', created_at_date=F('date'))
 
 
 class OrderSummaryType(graphene.ObjectType):
@@ -265,12 +320,15 @@ class Query(graphene.ObjectType):
     order = DjangoObjectField(OrderType)
     orders = DjangoPaginatedListObjectField(
         OrderListType,
-        pagination=PageGraphqlPagination(
+        pagination=CursorPageGraphqlPagination(
+            ordering='-created_at',
             page_size_query_param='pageSize'
-        )
+        ),
+        estimated_count=True,
     )
     order_stat = graphene.Field(OrderStatType)
     order_summary = graphene.Field(OrderSummaryType)
+    checkout_status = graphene.Field(CheckoutType, ticket=graphene.UUID(required=True))
     # Order window
     order_window_active = graphene.Field(OrderWindowType)
     order_window = DjangoObjectField(OrderWindowType)
@@ -293,12 +351,14 @@ class Query(graphene.ObjectType):
             )
 
     @staticmethod
-    def resolve_order_window_active(root, info, **kwargs) -> Union[None, OrderWindow]:
-        return OrderWindow.get_active_window(info.context.user)
+    def resolve_checkout_status(root, info, ticket, **kwargs) -> Union[None, Checkout]:
+        if not info.context.user.is_authenticated:
+            return None
+        return Checkout.objects.filter(created_by=info.context.user, ticket=ticket).first()
 
     @staticmethod
-    def resolve_cart_grand_total_price(root, info, **kwargs) -> QuerySet:
-        return get_cart_items_qs(info).aggregate(Sum('total_price'))['total_price__sum']
+    def resolve_order_window_active(root, info, **kwargs) -> Union[None, OrderWindow]:
+        return OrderWindow.get_active_window(info.context.user)
 
     @staticmethod
     def resolve_orders(root, info, **kwargs) -> QuerySet:
@@ -310,7 +370,7 @@ class Query(graphene.ObjectType):
 
     def resolve_order_stat(root, info, **kwargs):
         if info.context.user.is_authenticated:
-            return get_orders_qs(info)
+            return get_order_daily_stat_qs(info)
         return None
 
 
@@ -318,7 +378,7 @@ class OrderActivityLogQuery(graphene.ObjectType):
     order_activity_log = DjangoObjectField(OrderActivityLogType)
     order_activity_logs = DjangoPaginatedListObjectField(
         OrderActivityLogListType,
-        pagination=PageGraphqlPagination(
+        pagination=CursorPageGraphqlPagination(
             page_size_query_param='pageSize'
         )
     )
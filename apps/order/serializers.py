@@ -1,49 +1,109 @@
 from rest_framework import serializers
-from django.db.models import F, Sum
+from django.conf import settings
 from django.utils.translation import gettext
 from django.db import transaction
 
 from config.serializers import CreatedUpdatedBaseSerializer
 
 from apps.user.models import User
-from apps.book.models import WishList
+from apps.book.models import Book, WishList
 
 from .models import (
+    Cart,
     CartItem,
+    Checkout,
     Order,
     BookOrder,
     OrderWindow,
     OrderActivityLog,
 )
-from .tasks import send_notification
+from .signals import orders_bulk_updated
+from .tasks import send_notification, process_checkout
 from apps.package.models import SchoolPackage, InstitutionPackage
 
 
+class CartItemListSerializer(serializers.ListSerializer):
+    """
+    Cart items of the bulk upsert, the batch is validated with set-based queries: books and the cart items of the
+    books are fetched once instead of per item
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            book_ids = {
+                str(item['book'])
+                for item in data
+                if isinstance(item, dict) and item.get('book') is not None
+            }
+            self.books = {
+                str(book.pk): book
+                for book in Book.objects.filter(pk__in=[book_id for book_id in book_ids if book_id.isdigit()])
+            }
+            self.existing_quantities = dict(
+                CartItem.objects.filter(
+                    created_by=self.context['request'].user,
+                    book__in=self.books.values(),
+                ).values_list('book_id', 'quantity')
+            )
+            self.seen_book_ids = set()
+        return super().to_internal_value(data)
+
+    def validate_item_book(self, book):
+        if book.pk in self.seen_book_ids:
+            raise serializers.ValidationError(
+                gettext('Book is repeated in the request.')
+            )
+        self.seen_book_ids.add(book.pk)
+        return book
+
+
+class CartItemBookField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        list_serializer = self.parent.parent
+        if not isinstance(list_serializer, CartItemListSerializer):
+            return super().to_internal_value(data)
+        # Fetched by CartItemListSerializer
+        book = list_serializer.books.get(str(data))
+        if book is None:
+            self.fail('does_not_exist', pk_value=data)
+        return book
+
+
 class CartItemSerializer(CreatedUpdatedBaseSerializer, serializers.ModelSerializer):
     MAX_ITEMS_ALLOWED = 1000
 
+    book = CartItemBookField(queryset=Book.objects.all())
+
     class Meta:
         model = CartItem
         fields = ('book', 'quantity',)
+        list_serializer_class = CartItemListSerializer
 
-    def validate_quantity(self, quantity):
-        created_by = self.context['request'].user
-        cart_item_qs = CartItem.objects.filter(created_by=created_by)
-        if self.instance:
-            # Exclude current item if already in database
-            cart_item_qs = cart_item_qs.exclude(pk=self.instance.pk)
-        current_total_cart_items_count = cart_item_qs.aggregate(Sum('quantity'))['quantity__sum'] or 0
-        new_count = current_total_cart_items_count + quantity
-        if new_count > self.MAX_ITEMS_ALLOWED:
+    @classmethod
+    def validate_total_quantity(cls, new_count):
+        if new_count > cls.MAX_ITEMS_ALLOWED:
             raise serializers.ValidationError(
                 gettext('Only %(new_count)d books are allowed. Current request has %(allowed_count)d books.') % dict(
                     new_count=new_count,
-                    allowed_count=self.MAX_ITEMS_ALLOWED,
+                    allowed_count=cls.MAX_ITEMS_ALLOWED,
                 )
             )
+
+    def validate_quantity(self, quantity):
+        if isinstance(self.parent, CartItemListSerializer):
+            # Total of the batch is validated by CartItemBulkUpsertSerializer
+            return quantity
+        created_by = self.context['request'].user
+        current_total_cart_items_count = Cart.get_for_user(created_by).total_quantity
+        if self.instance:
+            # Exclude current item if already in database
+            current_total_cart_items_count -= self.instance.quantity
+        self.validate_total_quantity(current_total_cart_items_count + quantity)
         return quantity
 
     def validate_book(self, book):
+        if isinstance(self.parent, CartItemListSerializer):
+            # Existing cart items of the books are updated
+            return self.parent.validate_item_book(book)
         created_by = self.context['request'].user
         if not self.instance and CartItem.objects.filter(
             created_by=created_by, book=book
@@ -54,18 +114,57 @@ class CartItemSerializer(CreatedUpdatedBaseSerializer, serializers.ModelSerializ
         return book
 
 
+class CartItemBulkUpsertSerializer(serializers.Serializer):
+    items = CartItemSerializer(many=True, allow_empty=False, max_length=CartItemSerializer.MAX_ITEMS_ALLOWED)
+
+    def validate(self, data):
+        created_by = self.context['request'].user
+        items_serializer = self.fields['items']
+        # Quantities of the existing cart items are replaced
+        current_total_cart_items_count = (
+            Cart.get_for_user(created_by).total_quantity - sum(items_serializer.existing_quantities.values())
+        )
+        CartItemSerializer.validate_total_quantity(
+            current_total_cart_items_count + sum(item['quantity'] for item in data['items'])
+        )
+        return data
+
+    def create(self, validated_data):
+        return Cart.upsert_items(
+            self.context['request'].user.pk,
+            {item['book'].pk: item['quantity'] for item in validated_data['items']},
+        )
+
+
 class CreateOrderFromCartSerializer(CreatedUpdatedBaseSerializer, serializers.ModelSerializer):
     class Meta:
         model = Order
-        fields = ()
+        fields = ('idempotency_key',)
 
     def validate(self, data):
         created_by = self.context['request'].user
-        # Get current users cart
-        cart_items = CartItem.objects.filter(created_by=created_by).annotate(
-            total_price=F('book__price') * F('quantity')
+        # Cart is locked until the order is created (ATOMIC_MUTATIONS), concurrent checkouts of the user don't wait
+        cart_qs = Cart.objects.filter(created_by=created_by)
+        if not cart_qs.select_for_update(skip_locked=True).exists() and cart_qs.exists():
+            raise serializers.ValidationError(
+                gettext('Your order is already being processed.')
+            )
+        idempotency_key = data.get('idempotency_key')
+        if idempotency_key:
+            order = Order.objects.filter(created_by=created_by, idempotency_key=idempotency_key).first()
+            if order is not None:
+                # Retried request
+                data['order'] = order
+                return data
+
+        # Cart items with the books are read once
+        cart_items = list(
+            CartItem.objects.filter(created_by=created_by)
+            .select_related('book')
+            .select_for_update(of=('self',))
+            .order_by('id')
         )
-        if not cart_items.exists():
+        if not cart_items:
             raise serializers.ValidationError(
                 gettext('Your cart is empty.')
             )
@@ -79,35 +178,34 @@ class CreateOrderFromCartSerializer(CreatedUpdatedBaseSerializer, serializers.Mo
         # Create order
         data['created_by'] = created_by
         data['assigned_order_window'] = active_order_window
-        total_price = cart_items.aggregate(Sum('total_price'))['total_price__sum']
-        cart_items.aggregate(Sum('total_price'))['total_price__sum']
-        data['total_price'] = total_price
-        data['cart_items'] = cart_items
+        book_orders = []
+        for cart_item in cart_items:
+            book_order = BookOrder(quantity=cart_item.quantity, book=cart_item.book)
+            # Set attributes from book
+            book_order._set_book_attributes()
+            book_orders.append(book_order)
+        data['total_price'] = sum(book_order.total_price for book_order in book_orders)
+        data['book_orders'] = book_orders
         return data
 
     def create(self, validated_data):
-        cart_items = validated_data.pop('cart_items')
+        if 'order' in validated_data:
+            return validated_data['order']
+        book_orders = validated_data.pop('book_orders')
+        created_by = validated_data['created_by']
         order = super().create(validated_data)
         # Create book orders
-        book_orders = []
-        for cart_item in cart_items:
-            book_order = BookOrder(
-                quantity=cart_item.quantity,
-                total_price=cart_item.total_price,
-                order=order,
-                book=cart_item.book,
-            )
-            # Fetch and set attributes from book
-            book_order._set_book_attributes()
-            book_orders.append(book_order)
+        for book_order in book_orders:
+            book_order.order = order
         BookOrder.objects.bulk_create(book_orders)
-        # Remove books form withlist
-        book_ids = CartItem.objects\
-            .filter(created_by=validated_data['created_by'])\
-            .values_list('book', flat=True)
-        WishList.objects.filter(book_id__in=book_ids).delete()
+        orders_bulk_updated.send(sender=Order, order_qs=Order.objects.filter(pk=order.pk))
+        # Remove books from user's wishlist
+        WishList.objects.filter(
+            created_by=created_by,
+            book__in=[book_order.book_id for book_order in book_orders],
+        ).delete()
         # Clear cart
-        cart_items.delete()
+        Cart.clear(created_by.pk)
         # Send notification
         transaction.on_commit(
             lambda: send_notification.delay(order.id)
@@ -115,6 +213,52 @@ class CreateOrderFromCartSerializer(CreatedUpdatedBaseSerializer, serializers.Mo
         return order
 
 
+class CheckoutSerializer(CreatedUpdatedBaseSerializer, serializers.ModelSerializer):
+    """
+    Asynchronous createOrderFromCart, only the cheap checks are done here. Cart is validated again by the
+    checkout queue (CreateOrderFromCartSerializer)
+    """
+    class Meta:
+        model = Checkout
+        fields = ('idempotency_key',)
+
+    def validate(self, data):
+        created_by = self.context['request'].user
+        idempotency_key = data.get('idempotency_key')
+        checkout = (
+            idempotency_key and
+            Checkout.objects.filter(created_by=created_by, idempotency_key=idempotency_key).first()
+        ) or Checkout.get_in_progress(created_by)
+        if checkout is not None:
+            # Retried request
+            data['checkout'] = checkout
+            return data
+
+        if not Cart.get_for_user(created_by).item_count:
+            raise serializers.ValidationError(
+                gettext('Your cart is empty.')
+            )
+        if OrderWindow.get_active_window(created_by) is None:
+            raise serializers.ValidationError(
+                gettext('No active order window available right now.')
+            )
+        # Admission control
+        if Checkout.objects.filter(status=Checkout.Status.PENDING).count() >= settings.CHECKOUT_QUEUE_MAX_PENDING:
+            raise serializers.ValidationError(
+                gettext('Too many orders are being processed right now, please try again later.')
+            )
+        return data
+
+    def create(self, validated_data):
+        if 'checkout' in validated_data:
+            return validated_data['checkout']
+        checkout = super().create(validated_data)
+        transaction.on_commit(
+            lambda: process_checkout.delay(checkout.id)
+        )
+        return checkout
+
+
 class OrderUpdateSerializer(serializers.ModelSerializer):
     '''
     This serializer is used to update status of order only
@@ -0,0 +1,68 @@
+from django.db.models.signals import post_save, post_delete
+from django.db.models import F, Subquery
+from django.db.models.functions import Coalesce
+from django.dispatch import receiver, Signal
+
+from apps.book.models import Book
+from apps.order.models import Order, BookOrder, OrderDailyStat, CartItem, Cart
+
+# Sent with order_qs when orders are changed in bulk (QuerySet.update and bulk_create don't send model signals)
+orders_bulk_updated = Signal()
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def refresh_order_daily_stat_on_order_change(sender, instance, **kwargs):
+    OrderDailyStat.refresh([
+        (instance.created_by_id, OrderDailyStat.get_order_date(instance.created_at)),
+    ])
+
+
+@receiver(post_save, sender=BookOrder)
+@receiver(post_delete, sender=BookOrder)
+def refresh_order_daily_stat_on_book_order_change(sender, instance, **kwargs):
+    # Order can be already deleted (cascade), which is handled by the order's signal
+    OrderDailyStat.refresh_for_orders(Order.objects.filter(pk=instance.order_id))
+
+
+@receiver(orders_bulk_updated)
+def refresh_order_daily_stat_on_orders_bulk_update(sender, order_qs, **kwargs):
+    OrderDailyStat.refresh_for_orders(order_qs)
+
+
+@receiver(post_save, sender=CartItem)
+def update_cart_on_cart_item_save(sender, instance, created, **kwargs):
+    saved_book_id, saved_quantity = getattr(instance, '_saved_values', (None, None))
+    if created:
+        Cart.update_totals(
+            instance.created_by_id, item_count=1, quantity=instance.quantity,
+            price=instance.quantity * instance.book.price,
+        )
+    elif saved_book_id == instance.book_id and saved_quantity is not None:
+        quantity = instance.quantity - saved_quantity
+        Cart.update_totals(instance.created_by_id, quantity=quantity, price=quantity * instance.book.price)
+    else:
+        # Book is changed or the saved values are not known
+        Cart.refresh_totals([instance.created_by_id], create=True)
+    instance._saved_values = (instance.book_id, instance.quantity)
+
+
+@receiver(post_delete, sender=CartItem)
+def update_cart_on_cart_item_delete(sender, instance, **kwargs):
+    _, quantity = getattr(instance, '_saved_values', (None, instance.quantity))
+    # Cart can be already deleted (cascade), it is not created again
+    Cart.objects.filter(created_by=instance.created_by_id).update(
+        item_count=F('item_count') - 1,
+        total_quantity=F('total_quantity') - quantity,
+        total_price=F('total_price') - Coalesce(
+            Subquery(Book.objects.filter(pk=instance.book_id).values('price')), 0,
+        ) * quantity,
+    )
+
+
+@receiver(post_save, sender=Book)
+def refresh_carts_on_book_save(sender, instance, created, **kwargs):
+    if not created:
+        Cart.refresh_totals(
+            CartItem.objects.filter(book=instance).values_list('created_by', flat=True)
+        )
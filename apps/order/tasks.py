@@ -1,8 +1,11 @@
+from types import SimpleNamespace
+
 from celery import shared_task
-from django.utils.translation import gettext_lazy as _
+from django.utils.translation import gettext_lazy as _, gettext
 from django.db import transaction
 
-from apps.order.models import Order
+from utils.graphene.error_types import mutation_is_not_valid
+from apps.order.models import Order, Checkout
 from apps.notification.models import Notification
 from apps.common.tasks import generic_email_sender
 import logging
@@ -81,3 +84,40 @@ def send_notification(order_id):
         title = _('Book order cancelled.')
         notification_type = Notification.NotificationType.ORDER_CANCELLED.value
         send_notification_to_customer(order_obj, notification_type, title)
+
+
+@shared_task(name='order_checkout')
+def process_checkout(checkout_id):
+    """
+    Creates the order of the asynchronous checkout (settings.ENABLE_ASYNC_CHECKOUT)
+    """
+    from apps.order.serializers import CreateOrderFromCartSerializer
+
+    checkout_qs = Checkout.objects.filter(pk=checkout_id)
+    updated = checkout_qs.filter(
+        status__in=[Checkout.Status.PENDING, Checkout.Status.PROCESSING],
+    ).update(status=Checkout.Status.PROCESSING)
+    if not updated:
+        # Redelivered task of the processed checkout
+        return
+    checkout = checkout_qs.select_related('created_by').get()
+    serializer = CreateOrderFromCartSerializer(
+        # Ticket is used as the idempotency key, the redelivered task doesn't create another order
+        data=dict(idempotency_key=checkout.idempotency_key or str(checkout.ticket)),
+        # Only the user of the request is used
+        context={'request': SimpleNamespace(user=checkout.created_by)},
+    )
+    try:
+        with transaction.atomic():
+            errors = mutation_is_not_valid(serializer)
+            if not errors:
+                order = serializer.save()
+                checkout_qs.update(status=Checkout.Status.COMPLETED, order=order)
+                return
+    except Exception:
+        checkout_qs.update(
+            status=Checkout.Status.FAILED,
+            errors=[dict(field='nonFieldErrors', messages=gettext('Order could not be created, please try again.'))],
+        )
+        raise
+    checkout_qs.update(status=Checkout.Status.FAILED, errors=errors)
@@ -1,11 +1,15 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from utils.graphene.tests import GraphQLTestCase
 
-from apps.order.models import CartItem
+from apps.order.models import CartItem, Cart
 
 from apps.order.serializers import CartItemSerializer
 from apps.book.factories import BookFactory
 from apps.user.factories import UserFactory
 from apps.publisher.factories import PublisherFactory
+from apps.order.factories import CartItemFactory
 
 
 class TestCart(GraphQLTestCase):
@@ -124,3 +128,126 @@ class TestCart(GraphQLTestCase):
             minput={'book': self.book.id, 'quantity': 2},
             okay=False
         )
+
+    def _get_totals(self, user):
+        cart = Cart.objects.get(created_by=user)
+        return cart.item_count, cart.total_quantity, cart.total_price
+
+    def test_cart_totals(self):
+        book1 = BookFactory.create(publisher=self.publisher, price=10)
+        book2 = BookFactory.create(publisher=self.publisher, price=20)
+        self.force_login(self.user)
+
+        content = self.query_check(self.create_cart_item, minput={'book': book1.id, 'quantity': 2}, okay=True)
+        cart_item_1 = CartItem.objects.get(pk=content['data']['createCartItem']['result']['id'])
+        self.assertEqual(self._get_totals(self.user), (1, 2, 20))
+        cart_item_2 = CartItemFactory.create(created_by=self.user, book=book2, quantity=3)
+        self.assertEqual(self._get_totals(self.user), (2, 5, 80))
+
+        # Quantity change
+        with CaptureQueriesContext(connection) as queries:
+            self.query_check(
+                self.update_cart_item, minput={'book': book1.id, 'quantity': 5},
+                variables={'id': cart_item_1.pk}, okay=True,
+            )
+        self.assertFalse([query for query in queries.captured_queries if 'SUM(' in query['sql']])
+        self.assertEqual(self._get_totals(self.user), (2, 8, 110))
+        # Book change
+        self.query_check(
+            self.update_cart_item, minput={'book': self.book.id, 'quantity': 1},
+            variables={'id': cart_item_1.pk}, okay=True,
+        )
+        self.assertEqual(self._get_totals(self.user), (2, 4, 60 + self.book.price))
+        # Book price change
+        book2.price = 30
+        book2.save()
+        self.assertEqual(self._get_totals(self.user), (2, 4, 90 + self.book.price))
+
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(self.retrieve_cart_items)
+        self.assertEqual(content['data']['cartItems']['grandTotalPrice'], 90 + self.book.price)
+        self.assertEqual(len([query for query in queries.captured_queries if 'order_cart"' in query['sql']]), 1)
+
+        self.query_check(self.delete_cart_item, variables={'id': cart_item_2.pk}, okay=True)
+        self.assertEqual(self._get_totals(self.user), (1, 1, self.book.price))
+
+        Cart.clear(self.user.pk)
+        self.assertEqual(self._get_totals(self.user), (0, 0, 0))
+        self.assertFalse(CartItem.objects.filter(created_by=self.user).exists())
+        content = self.query_check(self.retrieve_cart_items)
+        self.assertIsNone(content['data']['cartItems']['grandTotalPrice'])
+
+    def test_bulk_cart_items(self):
+        bulk_upsert_cart_items = '''
+            mutation Mutation($items: [CartItemInputType!]!) {
+                bulkUpsertCartItems(items: $items) {
+                    ok
+                    errors
+                    result {
+                      id
+                      quantity
+                      totalPrice
+                    }
+                }
+            }
+        '''
+        bulk_delete_cart_items = '''
+            mutation Mutation($ids: [ID!]!) {
+                bulkDeleteCartItems(ids: $ids) {
+                    ok
+                    errors
+                    result {
+                      id
+                    }
+                }
+            }
+        '''
+        books = BookFactory.create_batch(30, publisher=self.publisher, price=10)
+        cart_item = CartItemFactory.create(created_by=self.user, book=books[0], quantity=5)
+        other_user_cart_item = CartItemFactory.create(book=books[0], quantity=5)
+        self.force_login(self.user)
+
+        def _upsert(books, quantity=2, **kwargs):
+            items = [dict(book=book.pk, quantity=quantity) for book in books]
+            return self.query_check(bulk_upsert_cart_items, variables={'items': items}, **kwargs)
+
+        # Query count doesn't depend on the number of items
+        with CaptureQueriesContext(connection) as queries:
+            _upsert(books[:3], okay=True)
+        with CaptureQueriesContext(connection) as bulk_queries:
+            content = _upsert(books, okay=True)
+        self.assertEqual(len(bulk_queries), len(queries))
+        result = content['data']['bulkUpsertCartItems']['result']
+        self.assertEqual(len(result), 30)
+        # Existing cart item is updated
+        self.assertEqual(result[0], dict(id=str(cart_item.pk), quantity=2, totalPrice=20))
+        self.assertEqual(CartItem.objects.filter(created_by=self.user).count(), 30)
+        self.assertEqual(self._get_totals(self.user), (30, 60, 600))
+
+        # Per item errors, nothing is saved
+        content = self.query_check(bulk_upsert_cart_items, variables={'items': [
+            dict(book=books[0].pk, quantity=1),
+            dict(book=0, quantity=1),
+            dict(book=books[0].pk, quantity=1),
+        ]}, okay=False)
+        errors = content['data']['bulkUpsertCartItems']['errors'][0]
+        self.assertEqual(errors['field'], 'items')
+        self.assertEqual([error['key'] for error in errors['arrayErrors']], ['NOT_FOUND_1', 'NOT_FOUND_2'])
+        self.assertEqual(self._get_totals(self.user), (30, 60, 600))
+        # Quantities which are replaced are excluded from the total
+        _upsert(books, quantity=CartItemSerializer.MAX_ITEMS_ALLOWED // 30 + 1, okay=False)
+        _upsert(books, quantity=CartItemSerializer.MAX_ITEMS_ALLOWED // 30, okay=True)
+        self.assertEqual(self._get_totals(self.user), (30, 990, 9900))
+
+        # Bulk delete
+        cart_items = list(CartItem.objects.filter(created_by=self.user).order_by('id'))
+        content = self.query_check(
+            bulk_delete_cart_items, variables={'ids': [cart_items[0].pk, other_user_cart_item.pk]}, okay=False,
+        )
+        self.assertEqual(content['data']['bulkDeleteCartItems']['errors'][0]['field'], 'ids')
+        content = self.query_check(
+            bulk_delete_cart_items, variables={'ids': [cart_item.pk for cart_item in cart_items[:20]]}, okay=True,
+        )
+        self.assertEqual(len(content['data']['bulkDeleteCartItems']['result']), 20)
+        self.assertEqual(self._get_totals(self.user), (10, 330, 3300))
+        self.assertTrue(CartItem.objects.filter(pk=other_user_cart_item.pk).exists())
@@ -0,0 +1,219 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from utils.graphene.tests import GraphQLTestCase
+
+from apps.user.models import User
+from apps.order.models import Order, OrderActivityLog
+
+from apps.user.factories import UserFactory
+from apps.publisher.factories import PublisherFactory
+from apps.book.factories import BookFactory
+from apps.order.factories import OrderFactory, BookOrderFactory
+
+
+class TestOrderListCount(GraphQLTestCase):
+    ORDERS_QUERY = '''
+        query MyQuery($page: Int, $pageSize: Int) {
+          orders(page: $page, pageSize: $pageSize) {
+            results {
+              id
+            }
+          }
+        }
+    '''
+
+    ORDERS_WITH_COUNT_QUERY = '''
+        query MyQuery($page: Int, $pageSize: Int) {
+          orders(page: $page, pageSize: $pageSize) {
+            totalCount
+            totalCountIsEstimated
+            results {
+              id
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+        school_user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN)
+        self.orders = OrderFactory.create_batch(5, created_by=school_user, status=Order.Status.PENDING)
+        self.force_login(self.moderator)
+
+    def _query(self, query, **variables):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(query, variables=variables)
+        count_queries = [query for query in queries.captured_queries if 'COUNT(' in query['sql']]
+        return content['data']['orders'], count_queries
+
+    def test_count_only_when_selected(self):
+        orders, count_queries = self._query(self.ORDERS_QUERY, pageSize=2)
+        self.assertEqual(len(orders['results']), 2)
+        self.assertEqual(count_queries, [])
+
+        orders, count_queries = self._query(self.ORDERS_WITH_COUNT_QUERY, pageSize=2)
+        self.assertEqual(len(orders['results']), 2)
+        self.assertEqual(orders['totalCount'], 5)
+        self.assertFalse(orders['totalCountIsEstimated'])
+        self.assertEqual(len(count_queries), 1)
+
+        # Count is required for the negative pages, still counted once
+        orders, count_queries = self._query(self.ORDERS_WITH_COUNT_QUERY, page=-1, pageSize=2)
+        self.assertEqual(len(orders['results']), 2)
+        self.assertEqual(len(count_queries), 1)
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=-1)
+    def test_estimated_count(self):
+        orders, count_queries = self._query(self.ORDERS_WITH_COUNT_QUERY, pageSize=2)
+        self.assertTrue(orders['totalCountIsEstimated'])
+        self.assertGreaterEqual(orders['totalCount'], 0)
+        self.assertEqual(count_queries, [])
+
+
+class TestOrderListCursor(GraphQLTestCase):
+    ORDERS_QUERY = '''
+        query MyQuery($after: String, $before: String, $ordering: String, $pageSize: Int) {
+          orders(after: $after, before: $before, ordering: $ordering, pageSize: $pageSize) {
+            nextCursor
+            previousCursor
+            results {
+              id
+              createdBy {
+                id
+              }
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+        school_user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN)
+        orders = OrderFactory.create_batch(7, created_by=school_user, status=Order.Status.PENDING)
+        # Same created_at for some orders, id is used as tie-breaker
+        Order.objects.filter(pk__in=[order.pk for order in orders[2:5]]).update(created_at=orders[2].created_at)
+        self.force_login(self.moderator)
+
+    def _query(self, **variables):
+        return self.query_check(self.ORDERS_QUERY, variables=dict(pageSize=3, **variables))['data']['orders']
+
+    def _page_through(self, ordering=None):
+        ids = []
+        pages = []
+        cursor = None
+        while True:
+            page = self._query(after=cursor, ordering=ordering)
+            pages.append(page)
+            ids.extend(order['id'] for order in page['results'])
+            cursor = page['nextCursor']
+            if cursor is None:
+                return ids, pages
+
+    def test_forward_and_backward(self):
+        expected_ids = [
+            str(pk) for pk in Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        ]
+        ids, pages = self._page_through()
+        self.assertEqual(ids, expected_ids)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previousCursor'])
+
+        # Backward from the last page
+        page = self._query(before=pages[2]['previousCursor'])
+        self.assertEqual(page['results'], pages[1]['results'])
+        page = self._query(before=page['previousCursor'])
+        self.assertEqual(page['results'], pages[0]['results'])
+        self.assertIsNone(page['previousCursor'])
+        self.assertEqual(page['nextCursor'], pages[0]['nextCursor'])
+
+    def test_ordering_argument(self):
+        ids, _ = self._page_through(ordering='id')
+        self.assertEqual(ids, [str(pk) for pk in Order.objects.order_by('id').values_list('id', flat=True)])
+
+    def test_constant_query_count(self):
+        _, pages = self._page_through()
+        with CaptureQueriesContext(connection) as first_page_queries:
+            self._query()
+        with CaptureQueriesContext(connection) as last_page_queries:
+            self._query(after=pages[1]['nextCursor'])
+        self.assertEqual(len(first_page_queries), len(last_page_queries))
+
+    def test_invalid_cursor(self):
+        content = self.query_check(self.ORDERS_QUERY, variables=dict(after='invalid'), assert_for_error=True)
+        self.assertEqual(content['errors'][0]['message'], 'Invalid cursor')
+
+
+class TestOrderChildren(GraphQLTestCase):
+    ORDERS_QUERY = '''
+        query MyQuery($pageSize: Int) {
+          orders(pageSize: $pageSize, ordering: "id") {
+            results {
+              id
+              totalQuantity
+              activityLog {
+                id
+                comment
+              }
+              bookOrders(pageSize: 2, ordering: "-quantity") {
+                totalCount
+                results {
+                  id
+                  quantity
+                  publisher {
+                    id
+                  }
+                }
+              }
+              lastBookOrders: bookOrders(page: -1, pageSize: 2, ordering: "-quantity") {
+                results {
+                  id
+                }
+              }
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+        school_user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN)
+        book = BookFactory.create(publisher=PublisherFactory.create())
+        self.orders = OrderFactory.create_batch(6, created_by=school_user, status=Order.Status.PENDING)
+        for index, order in enumerate(self.orders, start=1):
+            for quantity in range(1, index + 1):
+                BookOrderFactory.create(order=order, book=book, publisher=book.publisher, quantity=quantity)
+            OrderActivityLog.objects.create(order=order, created_by=self.moderator, comment=f'Comment {index}')
+        self.force_login(self.moderator)
+
+    def _query(self, page_size):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(self.ORDERS_QUERY, variables=dict(pageSize=page_size))
+        return content['data']['orders']['results'], len(queries)
+
+    def test_children(self):
+        orders, _ = self._query(6)
+        for index, (order, db_order) in enumerate(zip(orders, self.orders), start=1):
+            book_orders = list(db_order.book_order.order_by('-quantity'))
+            self.assertEqual(order['totalQuantity'], sum(range(1, index + 1)))
+            self.assertEqual(order['activityLog'], [
+                dict(id=str(log.pk), comment=log.comment) for log in db_order.activity_logs.all()
+            ])
+            self.assertEqual(order['bookOrders']['totalCount'], index)
+            self.assertEqual(
+                [book_order['quantity'] for book_order in order['bookOrders']['results']],
+                [book_order.quantity for book_order in book_orders[:2]],
+            )
+            self.assertEqual(
+                [book_order['id'] for book_order in order['lastBookOrders']['results']],
+                [str(book_order.pk) for book_order in book_orders[max(0, index - 2):]],
+            )
+
+    def test_constant_query_count(self):
+        _, query_count = self._query(2)
+        _, query_count_all = self._query(6)
+        self.assertEqual(query_count, query_count_all)
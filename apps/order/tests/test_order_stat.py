@@ -1,8 +1,11 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.utils import timezone
 
 from apps.common.tests.test_permissions import TestPermissions
 from apps.user.models import User
-from apps.order.models import Order
+from apps.order.models import Order, OrderDailyStat
 from apps.book.models import Book
 
 from apps.user.factories import UserFactory
@@ -140,3 +143,47 @@ class TestOrderState(TestPermissions):
         order_stat = content['data']['orderStat']
         self.assertEqual(order_stat['stat'][0]['createdAtDate'], str(self.stat_to.date()))
         self.assertEqual(order_stat['stat'][0]['totalQuantity'], 30)
+
+    def test_stat_is_updated_on_order_status_change(self):
+        order = OrderFactory.create(created_by=self.individual_user, status=Order.Status.PENDING)
+        BookOrderFactory.create(
+            order=order, book=self.book_3, quantity=7,
+            grade=Book.Grade.GRADE_1.value, language=Book.LanguageType.ENGLISH.value
+        )
+        self.force_login(self.publisher_user_2)
+        order_stat = self.query_check(self.order_stat)['data']['orderStat']
+        self.assertEqual(order_stat['totalBooksOrdered'], 5)
+        self.assertEqual(order_stat['ordersCompletedCount'], 1)
+
+        order.status = Order.Status.COMPLETED
+        order.save(update_fields=('status',))
+        order_stat = self.query_check(self.order_stat)['data']['orderStat']
+        self.assertEqual(order_stat['totalBooksOrdered'], 12)
+        self.assertEqual(order_stat['ordersCompletedCount'], 2)
+        self.assertEqual(order_stat['stat'][0]['totalQuantity'], 12)
+
+    def test_stat_is_not_counted_twice_for_multiple_publishers(self):
+        order = OrderFactory.create(created_by=self.individual_user, status=Order.Status.COMPLETED)
+        for book in [self.book_1, self.book_3]:
+            BookOrderFactory.create(
+                order=order, book=book, quantity=1,
+                grade=Book.Grade.GRADE_1.value, language=Book.LanguageType.ENGLISH.value
+            )
+        self.force_login(self.super_admin)
+        order_stat = self.query_check(self.order_stat)['data']['orderStat']
+        self.assertEqual(order_stat['totalBooksOrdered'], 17)
+        self.assertEqual(order_stat['ordersCompletedCount'], 4)
+
+    def test_backfill_order_daily_stats(self):
+        stats = list(OrderDailyStat.objects.values_list(
+            'date', 'user', 'publisher', 'order_window', 'status', 'orders_count', 'quantity', 'revenue',
+        ).order_by('user', 'publisher', 'status'))
+        OrderDailyStat.objects.all().delete()
+        call_command('backfill_order_daily_stats', stdout=StringIO())
+        self.assertEqual(
+            list(OrderDailyStat.objects.values_list(
+                'date', 'user', 'publisher', 'order_window', 'status', 'orders_count', 'quantity', 'revenue',
+            ).order_by('user', 'publisher', 'status')),
+            stats,
+        )
+        self.assertNotEqual(stats, [])
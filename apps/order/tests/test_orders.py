@@ -1,11 +1,21 @@
+import threading
+from unittest.mock import patch
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
-from utils.graphene.tests import GraphQLTestCase
+from config.celery import app as celery_app
+from utils.graphene.tests import GraphQLTestCase, TEST_CACHES
 
 from apps.user.models import User
-from apps.order.models import Order, OrderWindow
-from apps.book.models import Book
+from apps.order.models import Order, OrderWindow, Cart, CartItem, Checkout
+from apps.order.serializers import CreateOrderFromCartSerializer
+from apps.order.tasks import process_checkout
+from apps.book.models import Book, WishList
 
 from apps.user.factories import UserFactory
 from apps.book.factories import BookFactory, WishListFactory
@@ -30,6 +40,45 @@ class TestOrder(GraphQLTestCase):
         }
     '''
 
+    CREATE_ORDER_FROM_CART_WITH_KEY_MUTATION = '''
+        mutation Mutation($input: CreateOrderFromCartInputType) {
+            createOrderFromCart(data: $input) {
+                ok
+                errors
+                result {
+                  id
+                }
+            }
+        }
+    '''
+
+    CREATE_ORDER_FROM_CART_ASYNC_MUTATION = '''
+        mutation Mutation {
+            createOrderFromCart {
+                ok
+                errors
+                checkout {
+                  ticket
+                  status
+                  queuePosition
+                }
+            }
+        }
+    '''
+
+    CHECKOUT_STATUS_QUERY = '''
+        query MyQuery($ticket: UUID!) {
+          checkoutStatus(ticket: $ticket) {
+            status
+            queuePosition
+            errors
+            order {
+              id
+            }
+          }
+        }
+    '''
+
     UPDATE_ORDER_MUTATION = '''
         mutation Mutation($id: ID!, $input: OrderUpdateInputType!) {
           updateOrder(id: $id, data: $input) {
@@ -174,6 +223,115 @@ class TestOrder(GraphQLTestCase):
             self.book1.price * self.cart_item_1.quantity + self.book2.price * self.cart_item_2.quantity
         )
 
+    def test_create_order_from_cart_query_count(self):
+        OrderWindowFactory.create(
+            start_date=self.now_datetime.date() - timezone.timedelta(9),
+            end_date=self.now_datetime.date() + timezone.timedelta(10),
+            type=OrderWindow.OrderWindowType.SCHOOL,
+        )
+        other_user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN)
+        other_user_wish_list = WishListFactory.create(book=self.book1, created_by=other_user)
+        books = BookFactory.create_batch(20, publisher=PublisherFactory.create())
+        self.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.query_check(self.CREATE_ORDER_FROM_CART_MUTATION, okay=True)
+        Cart.upsert_items(self.user.pk, {book.pk: 2 for book in books})
+        with CaptureQueriesContext(connection) as bulk_queries:
+            self.query_check(self.CREATE_ORDER_FROM_CART_MUTATION, okay=True)
+        # Query count doesn't depend on the number of cart items
+        self.assertEqual(len(bulk_queries), len(queries))
+
+        order = Order.objects.filter(created_by=self.user).latest('id')
+        self.assertEqual(order.total_price, sum(book.price * 2 for book in books))
+        self.assertEqual(
+            sorted(order.book_order.values_list('book', 'publisher', 'total_price')),
+            sorted((book.pk, book.publisher_id, book.price * 2) for book in books),
+        )
+        self.assertFalse(WishList.objects.filter(created_by=self.user).exists())
+        # Wish lists of the other users are not changed
+        self.assertTrue(WishList.objects.filter(pk=other_user_wish_list.pk).exists())
+
+    def test_create_order_from_cart_idempotency_key(self):
+        OrderWindowFactory.create(
+            start_date=self.now_datetime.date() - timezone.timedelta(9),
+            end_date=self.now_datetime.date() + timezone.timedelta(10),
+            type=OrderWindow.OrderWindowType.SCHOOL,
+        )
+        self.force_login(self.user)
+
+        content = self.query_check(
+            self.CREATE_ORDER_FROM_CART_WITH_KEY_MUTATION, minput=dict(idempotencyKey='checkout-1'), okay=True,
+        )
+        order_id = content['data']['createOrderFromCart']['result']['id']
+        self.assertEqual(Order.objects.get(pk=order_id).idempotency_key, 'checkout-1')
+
+        # Retried request returns the same order, the cart is not used
+        cart_item = CartItemFactory.create(book=self.book1, created_by=self.user, quantity=1)
+        content = self.query_check(
+            self.CREATE_ORDER_FROM_CART_WITH_KEY_MUTATION, minput=dict(idempotencyKey='checkout-1'), okay=True,
+        )
+        self.assertEqual(content['data']['createOrderFromCart']['result']['id'], order_id)
+        self.assertTrue(CartItem.objects.filter(pk=cart_item.pk).exists())
+
+        content = self.query_check(
+            self.CREATE_ORDER_FROM_CART_WITH_KEY_MUTATION, minput=dict(idempotencyKey='checkout-2'), okay=True,
+        )
+        self.assertNotEqual(content['data']['createOrderFromCart']['result']['id'], order_id)
+        self.assertFalse(CartItem.objects.filter(created_by=self.user).exists())
+
+    @override_settings(ENABLE_ASYNC_CHECKOUT=True)
+    def test_async_checkout(self):
+        self.force_login(self.user)
+        # Cheap checks are done by the mutation
+        self.query_check(self.CREATE_ORDER_FROM_CART_ASYNC_MUTATION, okay=False)
+        order_window = OrderWindowFactory.create(
+            start_date=self.now_datetime.date() - timezone.timedelta(9),
+            end_date=self.now_datetime.date() + timezone.timedelta(10),
+            type=OrderWindow.OrderWindowType.SCHOOL,
+        )
+        with override_settings(CHECKOUT_QUEUE_MAX_PENDING=0):
+            self.query_check(self.CREATE_ORDER_FROM_CART_ASYNC_MUTATION, okay=False)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            content = self.query_check(self.CREATE_ORDER_FROM_CART_ASYNC_MUTATION, okay=True)
+        self.assertEqual(len(callbacks), 1)
+        checkout = content['data']['createOrderFromCart']['checkout']
+        self.assertEqual(checkout['status'], 'PENDING')
+        self.assertEqual(checkout['queuePosition'], 1)
+        self.assertFalse(Order.objects.exists())
+        # Checkout in progress is returned again
+        content = self.query_check(self.CREATE_ORDER_FROM_CART_ASYNC_MUTATION, okay=True)
+        self.assertEqual(content['data']['createOrderFromCart']['checkout']['ticket'], checkout['ticket'])
+
+        # Processed by the checkout queue
+        process_checkout(Checkout.objects.get(ticket=checkout['ticket']).pk)
+        content = self.query_check(self.CHECKOUT_STATUS_QUERY, variables={'ticket': checkout['ticket']})
+        result = content['data']['checkoutStatus']
+        self.assertEqual(result['status'], 'COMPLETED')
+        self.assertIsNone(result['queuePosition'])
+        self.assertEqual(result['order']['id'], str(Order.objects.get(created_by=self.user).pk))
+        self.assertFalse(CartItem.objects.filter(created_by=self.user).exists())
+        # Redelivered task doesn't create another order
+        process_checkout(Checkout.objects.get(ticket=checkout['ticket']).pk)
+        self.assertEqual(Order.objects.count(), 1)
+
+        # Failed checkout
+        CartItemFactory.create(book=self.book1, created_by=self.user, quantity=1)
+        content = self.query_check(self.CREATE_ORDER_FROM_CART_ASYNC_MUTATION, okay=True)
+        ticket = content['data']['createOrderFromCart']['checkout']['ticket']
+        order_window.delete()
+        process_checkout(Checkout.objects.get(ticket=ticket).pk)
+        result = self.query_check(self.CHECKOUT_STATUS_QUERY, variables={'ticket': ticket})['data']['checkoutStatus']
+        self.assertEqual(result['status'], 'FAILED')
+        self.assertEqual(result['errors'][0]['messages'], 'No active order window available right now.')
+        self.assertEqual(Order.objects.count(), 1)
+
+        # Only the user's checkouts
+        self.force_login(UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN))
+        content = self.query_check(self.CHECKOUT_STATUS_QUERY, variables={'ticket': ticket})
+        self.assertIsNone(content['data']['checkoutStatus'])
+
     def test_order_update(self):
         school_user1 = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN)
         school_user2 = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN)
@@ -390,3 +548,83 @@ class OrderWindowTest(GraphQLTestCase):
                 endDate=order_window.end_date.isoformat(),
             )
         )
+
+
+@override_settings(CACHES=TEST_CACHES, ENABLE_DATALOADER_SHARED_CACHE=False)
+@patch('apps.order.serializers.send_notification')
+class TestCheckoutConcurrency(TransactionTestCase):
+    """
+    Checkouts run in separate connections (threads), the transactions are committed
+    """
+    def setUp(self):
+        celery_app.conf.task_always_eager = True
+        self.user = UserFactory.create(user_type=User.UserType.SCHOOL_ADMIN)
+        publisher = PublisherFactory.create()
+        for book in BookFactory.create_batch(3, publisher=publisher):
+            CartItemFactory.create(book=book, created_by=self.user, quantity=1)
+        today = timezone.now().date()
+        OrderWindowFactory.create(
+            start_date=today - timezone.timedelta(1),
+            end_date=today + timezone.timedelta(1),
+            type=OrderWindow.OrderWindowType.SCHOOL,
+        )
+        self.request = RequestFactory().post('/graphql/')
+        self.request.user = self.user
+
+    def _checkout(self, idempotency_key=None):
+        try:
+            with transaction.atomic():
+                serializer = CreateOrderFromCartSerializer(
+                    data=dict(idempotency_key=idempotency_key),
+                    context={'request': self.request},
+                )
+                if not serializer.is_valid():
+                    return serializer.errors['non_field_errors'][0]
+                return serializer.save().pk
+        finally:
+            connection.close()
+
+    def _run_concurrently(self, func, count):
+        barrier = threading.Barrier(count)
+        results = []
+
+        def _run():
+            barrier.wait()
+            results.append(func())
+
+        threads = [threading.Thread(target=_run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_locked_cart_is_skipped(self, *_):
+        results = []
+        with transaction.atomic():
+            # Checkout in progress
+            list(Cart.objects.select_for_update().filter(created_by=self.user))
+            thread = threading.Thread(target=lambda: results.append(self._checkout('checkout-1')))
+            thread.start()
+            # Doesn't wait for the lock
+            thread.join(timeout=10)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(results, ['Your order is already being processed.'])
+        self.assertFalse(Order.objects.exists())
+
+    def test_concurrent_checkouts(self, send_notification):
+        results = self._run_concurrently(lambda: self._checkout('checkout-1'), count=5)
+        order = Order.objects.get()
+        self.assertEqual(order.book_order.count(), 3)
+        for result in results:
+            self.assertIn(result, [order.pk, 'Your order is already being processed.'])
+        self.assertIn(order.pk, results)
+        # Retried request
+        self.assertEqual(self._checkout('checkout-1'), order.pk)
+
+        # Without idempotency key, only one of the checkouts uses the cart
+        CartItemFactory.create(book=order.book_order.first().book, created_by=self.user, quantity=1)
+        results = self._run_concurrently(self._checkout, count=5)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(len([result for result in results if isinstance(result, int)]), 1)
+        self.assertEqual(send_notification.delay.call_count, 2)
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0008_publisherpackage_orders_export_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courierpackagelog',
+            index=models.Index(fields=['courier_package', 'id'], name='package_cou_courier_7519a8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='institutionpackagelog',
+            index=models.Index(fields=['institution_package', 'id'], name='package_ins_institu_935b6c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisherpackagelog',
+            index=models.Index(fields=['publisher_package', 'id'], name='package_pub_publish_f15461_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schoolpackagelog',
+            index=models.Index(fields=['school_package', 'id'], name='package_sch_school__7d05c2_idx'),
+        ),
+    ]
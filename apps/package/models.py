@@ -276,6 +276,12 @@ class SchoolPackageLog(BaseActivityLog):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            # Cursor pagination of the package logs (-id)
+            models.Index(fields=['school_package', 'id']),
+        ]
+
 
 class PublisherPackageLog(BaseActivityLog):
     publisher_package = models.ForeignKey(
@@ -283,6 +289,12 @@ class PublisherPackageLog(BaseActivityLog):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            # Cursor pagination of the package logs (-id)
+            models.Index(fields=['publisher_package', 'id']),
+        ]
+
 
 class CourierPackageLog(BaseActivityLog):
     courier_package = models.ForeignKey(
@@ -290,9 +302,21 @@ class CourierPackageLog(BaseActivityLog):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            # Cursor pagination of the package logs (-id)
+            models.Index(fields=['courier_package', 'id']),
+        ]
+
 
 class InstitutionPackageLog(BaseActivityLog):
     institution_package = models.ForeignKey(
         'package.InstitutionPackage', verbose_name=_('Institution package'), related_name='institution_package_logs',
         on_delete=models.CASCADE
     )
+
+    class Meta:
+        indexes = [
+            # Cursor pagination of the package logs (-id)
+            models.Index(fields=['institution_package', 'id']),
+        ]
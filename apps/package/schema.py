@@ -5,6 +5,7 @@ from graphene_django import DjangoObjectType
 from graphene_django_extras import DjangoObjectField, PageGraphqlPagination
 
 from utils.graphene.fields import DjangoPaginatedListObjectField, CustomDjangoListField
+from utils.graphene.pagination import CursorPageGraphqlPagination
 from utils.graphene.types import CustomDjangoListObjectType, FileFieldType
 
 from apps.package.models import (
@@ -113,7 +114,8 @@ class PublisherPackageType(DjangoObjectType):
     )
     logs = DjangoPaginatedListObjectField(
         PublisherPackageLogListType,
-        pagination=PageGraphqlPagination(
+        pagination=CursorPageGraphqlPagination(
+            ordering='-id',
             page_size_query_param='pageSize'
         )
     )
@@ -180,7 +182,8 @@ class SchoolPackageType(DjangoObjectType):
     )
     logs = DjangoPaginatedListObjectField(
         SchoolPackageLogListType,
-        pagination=PageGraphqlPagination(
+        pagination=CursorPageGraphqlPagination(
+            ordering='-id',
             page_size_query_param='pageSize'
         )
     )
@@ -246,7 +249,8 @@ class InstitutionPackageType(DjangoObjectType):
     )
     logs = DjangoPaginatedListObjectField(
         InstitutionPackageLogListType,
-        pagination=PageGraphqlPagination(
+        pagination=CursorPageGraphqlPagination(
+            ordering='-id',
             page_size_query_param='pageSize'
         )
     )
@@ -295,7 +299,8 @@ class CourierPackageType(DjangoObjectType):
 
     logs = DjangoPaginatedListObjectField(
         PublisherPackageLogListType,
-        pagination=PageGraphqlPagination(
+        pagination=CursorPageGraphqlPagination(
+            ordering='-id',
             page_size_query_param='pageSize'
         )
     )
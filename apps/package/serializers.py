@@ -12,6 +12,7 @@ from apps.package.models import (
     InstitutionPackageLog,
 )
 from apps.order.models import Order
+from apps.order.signals import orders_bulk_updated
 from config.serializers import CreatedUpdatedBaseSerializer
 
 
@@ -92,9 +93,11 @@ class SchoolPackageUpdateSerializer(UpdateLogMixin, serializers.ModelSerializer)
             SchoolPackage.Status.ISSUE.value: Order.Status.PENDING.value,
             SchoolPackage.Status.DELIVERED.value: Order.Status.COMPLETED.value,
         }
-        Order.objects.filter(
+        related_order_qs = Order.objects.filter(
             order_code__in=instance.related_orders.all().values_list('order_code', flat=True)
-        ).update(status=_order_status_map.get(status))
+        )
+        related_order_qs.update(status=_order_status_map.get(status))
+        orders_bulk_updated.send(sender=Order, order_qs=related_order_qs)
         return super().update(instance, validated_data)
 
 
@@ -137,9 +140,9 @@ class CourierPackageUpdateSerializer(UpdateLogMixin, serializers.ModelSerializer
         ).update(
             status=_school_packages_status_map.get(status),
         )
-        Order.objects.filter(school_related_orders__in=school_courier_package_ids).update(
-            status=_order_status_map.get(status)
-        )
+        school_order_qs = Order.objects.filter(school_related_orders__in=school_courier_package_ids)
+        school_order_qs.update(status=_order_status_map.get(status))
+        orders_bulk_updated.send(sender=Order, order_qs=school_order_qs)
 
         # Update institution packages and orders
         institution_courier_package_ids = instance.institution_courier_package.all().values_list('id', flat=True)
@@ -148,9 +151,9 @@ class CourierPackageUpdateSerializer(UpdateLogMixin, serializers.ModelSerializer
         ).update(
             status=_update_institution_package_status_map.get(status),
         )
-        Order.objects.filter(institution_related_orders__in=institution_courier_package_ids).update(
-            status=_order_status_map.get(status)
-        )
+        institution_order_qs = Order.objects.filter(institution_related_orders__in=institution_courier_package_ids)
+        institution_order_qs.update(status=_order_status_map.get(status))
+        orders_bulk_updated.send(sender=Order, order_qs=institution_order_qs)
         return super().update(instance, validated_data)
 
 
@@ -172,7 +175,9 @@ class InstitutionPackageUpdateSerializer(UpdateLogMixin, serializers.ModelSerial
             InstitutionPackage.Status.ISSUE.value: Order.Status.PENDING.value,
             InstitutionPackage.Status.DELIVERED.value: Order.Status.COMPLETED.value,
         }
-        Order.objects.filter(
+        related_order_qs = Order.objects.filter(
             order_code__in=instance.related_orders.all().values_list('order_code', flat=True)
-        ).update(status=_order_status_map.get(status))
+        )
+        related_order_qs.update(status=_order_status_map.get(status))
+        orders_bulk_updated.send(sender=Order, order_qs=related_order_qs)
         return super().update(instance, validated_data)
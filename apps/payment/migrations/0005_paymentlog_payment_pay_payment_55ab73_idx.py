@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0004_alter_payment_paid_by'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentlog',
+            index=models.Index(fields=['payment', 'id'], name='payment_pay_payment_55ab73_idx'),
+        ),
+    ]
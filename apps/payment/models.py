@@ -75,3 +75,7 @@ class PaymentLog(BaseActivityLog):
     class Meta:
         verbose_name = _('Payment log')
         verbose_name_plural = _('Payment log')
+        indexes = [
+            # Cursor pagination of the payment logs (-id)
+            models.Index(fields=['payment', 'id']),
+        ]
@@ -1,12 +1,15 @@
 import graphene
 from graphene_django import DjangoObjectType
-from graphene_django_extras import PageGraphqlPagination, DjangoObjectField
+from graphene_django_extras import DjangoObjectField
 
 from django.db.models import QuerySet, Sum, F
 
 from utils.graphene.types import CustomDjangoListObjectType
 from utils.graphene.fields import DjangoPaginatedListObjectField, CustomDjangoListField
+from utils.graphene.pagination import CursorPageGraphqlPagination
 from utils.graphene.enums import EnumDescription
+from utils.graphene.dataloaders import batch_load
+from utils.single_flight import run_single_flight, get_single_flight_key
 
 from apps.user.models import User
 
@@ -34,6 +37,25 @@ def get_payment_qs(info):
     return Payment.objects.none()
 
 
+def get_payment_summary(info):
+    user = info.context.user
+    # Same scope as get_payment_qs
+    scope = (user.user_type,) if user.user_type == User.UserType.MODERATOR else (user.user_type, user.pk)
+    return run_single_flight(
+        get_single_flight_key('payment-summary', *scope),
+        lambda: get_payment_qs(info).annotate(
+            **User.annotate_user_payment_statement()
+        ).aggregate(
+            Sum('payment_credit_sum'),
+            Sum('payment_debit_sum'),
+            Sum('total_verified_payment'),
+            Sum('total_verified_payment_count'),
+            Sum('total_unverified_payment'),
+            Sum('total_unverified_payment_count'),
+        ),
+    )
+
+
 class PaymentLogType(DjangoObjectType):
     files = CustomDjangoListField(ActivityFileType, required=False)
 
@@ -70,11 +92,16 @@ class PaymentType(DjangoObjectType):
     payment_type_display = EnumDescription(source='get_payment_type_display', required=True)
     payment_log = DjangoPaginatedListObjectField(
         PaymentLogListType,
-        pagination=PageGraphqlPagination(
+        pagination=CursorPageGraphqlPagination(
+            ordering='-id',
             page_size_query_param='pageSize'
         )
     )
 
+    resolve_created_by = batch_load('created_by')
+    resolve_modified_by = batch_load('modified_by')
+    resolve_paid_by = batch_load('paid_by')
+
 
 class PaymentSummaryType(graphene.ObjectType):
     payment_credit_sum = graphene.Float()
@@ -100,7 +127,8 @@ class Query(graphene.ObjectType):
     payment = DjangoObjectField(PaymentType)
     payments = DjangoPaginatedListObjectField(
         PaymentListType,
-        pagination=PageGraphqlPagination(
+        pagination=CursorPageGraphqlPagination(
+            ordering='-id',
             page_size_query_param='pageSize'
         )
     )
@@ -112,16 +140,7 @@ class Query(graphene.ObjectType):
 
     @staticmethod
     def resolve_payment_summary(root, info, **kwargs):
-        payment_summary = get_payment_qs(info).annotate(
-            **User.annotate_user_payment_statement()
-        ).aggregate(
-            Sum('payment_credit_sum'),
-            Sum('payment_debit_sum'),
-            Sum('total_verified_payment'),
-            Sum('total_verified_payment_count'),
-            Sum('total_unverified_payment'),
-            Sum('total_unverified_payment_count'),
-        )
+        payment_summary = get_payment_summary(info)
 
         total_order_pending_price = Order.objects.filter(
             status=Order.Status.PENDING.value,
@@ -3,21 +3,11 @@ from django.utils.functional import cached_property
 from django.db import models
 
 from utils.graphene.dataloaders import DataLoaderWithContext, WithContextMixin
-from apps.book.models import Book
+from utils.shared_cache import SharedCache, SharedCacheLoaderMixin
 
 from .models import User
 
 
-class WishListLoader(DataLoaderWithContext):
-    def batch_load_fn(self, keys):
-        book_qs = Book.objects.filter(id__in=keys).values_list('id', 'book_wish_list__id')
-        wishlist_ids = {
-            id: wish_list_id
-            for id, wish_list_id in book_qs
-        }
-        return Promise.resolve([wishlist_ids.get(key) for key in keys])
-
-
 class UserCanonicalNameLoader(DataLoaderWithContext):
     def batch_load_fn(self, keys):
         canonical_name_stat = models.functions.Coalesce(
@@ -42,11 +32,12 @@ class UserCanonicalNameLoader(DataLoaderWithContext):
         return Promise.resolve([names_map.get(key) for key in keys])
 
 
-class DataLoaders(WithContextMixin):
-    @cached_property
-    def wishlist_id(self):
-        return WishListLoader(context=self.context)
+class CachedUserCanonicalNameLoader(SharedCacheLoaderMixin, UserCanonicalNameLoader):
+    # Invalidated by apps.user.signals
+    shared_cache = SharedCache('user-canonical-name', ttl=60 * 60)
+
 
+class DataLoaders(WithContextMixin):
     @cached_property
     def canonical_name(self):
-        return UserCanonicalNameLoader(context=self.context)
+        return CachedUserCanonicalNameLoader(context=self.context)
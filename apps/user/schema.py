@@ -6,6 +6,8 @@ from config.permissions import UserPermissions
 from utils.graphene.types import CustomDjangoListObjectType, FileFieldType
 from utils.graphene.fields import DjangoPaginatedListObjectField
 from utils.graphene.enums import EnumDescription
+from utils.graphene.optimizer import OptimizerHint
+from utils.graphene.dataloaders import batch_load
 
 from apps.payment.schema import Query as PaymentQuery
 from apps.order.schema import OrderActivityLogQuery
@@ -23,6 +25,10 @@ class UserTypeMixin():
     user_type = graphene.Field(UserTypeEnum, required=True)
     user_type_display = EnumDescription(source='get_user_type_display', required=True)
 
+    optimizer_hints = dict(
+        canonical_name=OptimizerHint(only=()),
+    )
+
     @staticmethod
     def resolve_canonical_name(root, info):
         return info.context.dl.user.canonical_name.load(root.pk)
@@ -94,15 +100,21 @@ class ModeratorQueryUserType(UserTypeMixin, DjangoObjectType):
             'user_type',
             'phone_number',
             'image',
-            'institution',  # TODO: Add dataloader
-            'publisher',  # TODO: Add dataloader
-            'school',  # TODO: Add dataloader
-            'verified_by',  # TODO: Add dataloader
+            'institution',
+            'publisher',
+            'school',
+            'verified_by',
             'date_joined',
             'is_deactivated',
             'is_deactivated_by'
         )
 
+    resolve_institution = batch_load('institution')
+    resolve_publisher = batch_load('publisher')
+    resolve_school = batch_load('school')
+    resolve_verified_by = batch_load('verified_by')
+    resolve_is_deactivated_by = batch_load('is_deactivated_by')
+
 
 class ModeratorQueryUserListType(CustomDjangoListObjectType):
     class Meta:
@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.user.models import User
+from apps.user.dataloaders import CachedUserCanonicalNameLoader
+from apps.school.models import School
+from apps.publisher.models import Publisher
+from apps.institution.models import Institution
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+@receiver(post_save, sender=Institution)
+@receiver(post_delete, sender=Institution)
+def invalidate_user_canonical_name_cache(sender, update_fields=None, **kwargs):
+    # Login updates user row frequently, which doesn't affect the names
+    if sender == User and update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(CachedUserCanonicalNameLoader.shared_cache.invalidate)
@@ -1,3 +1,6 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from utils.graphene.tests import GraphQLTestCase
 
 from apps.user.models import User
@@ -62,3 +65,58 @@ class UserQueryTest(GraphQLTestCase):
                 (individual_user, individual_user.full_name),
             ]
         ])
+
+    def test_user_relations_query_count(self):
+        query = '''
+            query MyQuery($pageSize: Int) {
+              moderatorQuery {
+                users(ordering: "id", pageSize: $pageSize) {
+                  results {
+                    id
+                    publisher {
+                      id
+                    }
+                    school {
+                      id
+                    }
+                    institution {
+                      id
+                    }
+                    verifiedBy {
+                      id
+                    }
+                  }
+                }
+              }
+            }
+        '''
+        moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+        for _ in range(3):
+            UserFactory.create(
+                user_type=User.UserType.PUBLISHER, publisher=PublisherFactory.create(), verified_by=moderator,
+            )
+            UserFactory.create(
+                user_type=User.UserType.SCHOOL_ADMIN, school=SchoolFactory.create(), verified_by=moderator,
+            )
+            UserFactory.create(
+                user_type=User.UserType.INSTITUTIONAL_USER, institution=InstitutionFactory.create(),
+            )
+        self.force_login(moderator)
+
+        def _query(page_size):
+            with CaptureQueriesContext(connection) as queries:
+                content = self.query_check(query, variables={'pageSize': page_size})
+            return content['data']['moderatorQuery']['users']['results'], len(queries)
+
+        users, query_count = _query(4)
+        self.assertEqual(len(users), 4)
+        users, query_count_all = _query(10)
+        self.assertEqual(len(users), 10)
+        self.assertEqual(query_count, query_count_all)
+        users_map = {user.pk: user for user in User.objects.all()}
+        for user in users:
+            db_user = users_map[int(user['id'])]
+            for field in ['publisher', 'school', 'institution', 'verified_by']:
+                related_id = getattr(db_user, f'{field}_id')
+                camel_field = 'verifiedBy' if field == 'verified_by' else field
+                self.assertEqual(user[camel_field], related_id and dict(id=str(related_id)))
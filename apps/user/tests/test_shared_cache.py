@@ -0,0 +1,143 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from utils.graphene.tests import GraphQLTestCase
+from utils.shared_cache import SHARED_CACHES
+
+from apps.common.tests.test_single_flight import LocalRedis
+from apps.user.models import User
+from apps.user.dataloaders import CachedUserCanonicalNameLoader
+
+from apps.user.factories import UserFactory
+from apps.publisher.factories import PublisherFactory
+
+
+class LocalRedisWithCache(LocalRedis):
+    """
+    In-process stand-in for the redis commands used by the shared cache
+    """
+    def mget(self, keys):
+        with self.lock:
+            return [self._get(key) for key in keys]
+
+    def incr(self, key):
+        with self.lock:
+            value = int(self._get(key) or 0) + 1
+            self.data[key] = (str(value).encode(), None)
+            return value
+
+    def hincrby(self, key, field, value):
+        with self.lock:
+            fields = self.data.setdefault(key, ({}, None))[0]
+            fields[field.encode()] = fields.get(field.encode(), 0) + value
+
+    def hgetall(self, key):
+        with self.lock:
+            return dict(self.data.get(key, ({}, None))[0])
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+
+@override_settings(ENABLE_DATALOADER_SHARED_CACHE=True)
+class TestUserCanonicalNameSharedCache(GraphQLTestCase):
+    USERS_QUERY = '''
+        query MyQuery {
+          moderatorQuery {
+            users(ordering: "id") {
+              results {
+                id
+                canonicalName
+              }
+            }
+          }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.redis = LocalRedisWithCache()
+        redis_patcher = patch('utils.shared_cache.get_redis_client', return_value=self.redis)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+        self.shared_cache = CachedUserCanonicalNameLoader.shared_cache
+        self.shared_cache.local.clear()
+        self.shared_cache._version_checked_at = None
+        # Flush the counters on every lookup
+        stats_patcher = patch('utils.shared_cache.SHARED_CACHE_STATS_FLUSH_INTERVAL', -1)
+        stats_patcher.start()
+        self.addCleanup(stats_patcher.stop)
+
+        self.moderator = UserFactory.create(user_type=User.UserType.MODERATOR)
+        self.publisher = PublisherFactory.create(name='Publisher 1')
+        self.publisher_user = UserFactory.create(user_type=User.UserType.PUBLISHER, publisher=self.publisher)
+        self.force_login(self.moderator)
+
+    def _query(self):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.query_check(self.USERS_QUERY)
+        names = {
+            int(user['id']): user['canonicalName']
+            for user in content['data']['moderatorQuery']['users']['results']
+        }
+        name_queries = [query for query in queries.captured_queries if 'canonical_name' in query['sql']]
+        return names, name_queries
+
+    def test_shared_cache(self):
+        names, name_queries = self._query()
+        self.assertEqual(names[self.publisher_user.pk], 'Publisher 1')
+        self.assertEqual(len(name_queries), 1)
+        self.assertEqual(self.shared_cache.get_stats(), dict(local_hits=0, redis_hits=0, misses=2))
+
+        # Next request uses the cached names
+        names, name_queries = self._query()
+        self.assertEqual(names[self.publisher_user.pk], 'Publisher 1')
+        self.assertEqual(len(name_queries), 0)
+        self.assertEqual(self.shared_cache.get_stats(), dict(local_hits=2, redis_hits=0, misses=2))
+
+        # Other processes use redis
+        self.shared_cache.local.clear()
+        self._query()
+        self.assertEqual(self.shared_cache.get_stats(), dict(local_hits=2, redis_hits=2, misses=2))
+
+        # Source model change invalidates the cache
+        self.publisher.name = 'Publisher 2'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publisher.save()
+        names, name_queries = self._query()
+        self.assertEqual(names[self.publisher_user.pk], 'Publisher 2')
+        self.assertEqual(len(name_queries), 1)
+
+        # Last login update doesn't invalidate the cache
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.moderator.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+
+        stdout = StringIO()
+        call_command('shared_cache_stats', stdout=stdout)
+        self.assertIn('user-canonical-name: local hits 2, redis hits 2, misses 4', stdout.getvalue())
+
+    def test_redis_version_is_checked_by_other_processes(self):
+        self._query()
+        # Invalidated by other process
+        self.redis.incr(self.shared_cache.version_key)
+        _, name_queries = self._query()
+        self.assertEqual(len(name_queries), 0)
+        # Version is checked again after SHARED_CACHE_VERSION_LOCAL_TTL
+        with patch('utils.shared_cache.SHARED_CACHE_VERSION_LOCAL_TTL', -1):
+            _, name_queries = self._query()
+        self.assertEqual(len(name_queries), 1)
+        self.assertIn('user-canonical-name', SHARED_CACHES)
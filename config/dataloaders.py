@@ -1,11 +1,11 @@
 from django.utils.functional import cached_property
 
-from utils.graphene.dataloaders import WithContextMixin
+from utils.graphene.dataloaders import WithContextMixin, RelationDataLoaders
 
 from apps.user.dataloaders import DataLoaders as UserDataloader
 from apps.order.dataloaders import DataLoaders as OrderDataloader
 from apps.book.dataloaders import DataLoaders as BookDataloader
-from apps.notification.dataloaders import DataLoaders as NotificationDataloader
+from apps.common.dataloaders import DataLoaders as CommonDataloader
 
 
 class GlobalDataLoaders(WithContextMixin):
@@ -22,5 +22,9 @@ class GlobalDataLoaders(WithContextMixin):
         return BookDataloader(context=self.context)
 
     @cached_property
-    def notification(self):
-        return NotificationDataloader(context=self.context)
+    def common(self):
+        return CommonDataloader(context=self.context)
+
+    @cached_property
+    def relation(self):
+        return RelationDataLoaders(context=self.context)
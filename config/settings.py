@@ -58,6 +58,19 @@ env = environ.Env(
     DEFAULT_FROM_EMAIL=(str, 'Kitab Bazar <kitabbazar@togglecorp.com>'),
     USE_LOCAL_STORATE=(bool, True),
     ENABLE_INTROSEPTION_SCHEMA=(bool, False),
+    ENABLE_SINGLE_FLIGHT=(bool, True),
+    ENABLE_DATALOADER_SHARED_CACHE=(bool, True),
+    ENABLE_GRAPHENE_RESPONSE_CACHE=(bool, True),
+    GRAPHENE_RESPONSE_CACHE_TIMEOUT=(int, 300),
+    GRAPHENE_DOCUMENT_CACHE_SIZE=(int, 1000),
+    ENABLE_PERSISTED_QUERY_ALLOWLIST=(bool, True),
+    GRAPHENE_QUERY_COST_ANONYMOUS_BUDGET=(int, 5000),
+    GRAPHENE_QUERY_COST_BUDGET=(int, 20000),
+    GRAPHENE_QUERY_COST_MODERATOR_BUDGET=(int, 100000),
+    ESTIMATED_COUNT_THRESHOLD=(int, 10000),
+    ENABLE_ASYNC_CHECKOUT=(bool, False),
+    CHECKOUT_QUEUE_MAX_PENDING=(int, 5000),
+    ENABLE_ANALYTICS_FACTS_BACKGROUND_REBUILD=(bool, True),
     HTTP_PROTOCOL=(str, 'http')
 )
 
@@ -223,12 +236,30 @@ else:
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+REDIS_URL = env('REDIS_URL')
+# Share expensive computations between concurrent requests (utils/single_flight.py)
+ENABLE_SINGLE_FLIGHT = env('ENABLE_SINGLE_FLIGHT')
+# Cross-request cache for the selected dataloaders (utils/shared_cache.py)
+ENABLE_DATALOADER_SHARED_CACHE = env('ENABLE_DATALOADER_SHARED_CACHE')
+
 # Celery settings
 BROKER_URL = env("REDIS_URL")
 BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 3600}
 CELERY_TIMEZONE = env('TIME_ZONE')
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+# Drained by a separate worker, its concurrency limits the concurrent checkouts (scripts/run_prod.sh)
+CELERY_ROUTES = {
+    'order_checkout': {'queue': 'checkout'},
+}
+
+# Orders are created by the checkout queue, createOrderFromCart returns a ticket (checkoutStatus)
+ENABLE_ASYNC_CHECKOUT = env('ENABLE_ASYNC_CHECKOUT')
+# New checkouts are rejected when this many checkouts are waiting in the queue
+CHECKOUT_QUEUE_MAX_PENDING = env('CHECKOUT_QUEUE_MAX_PENDING')
+
+# Book order facts (apps/common/analytics.py) are rebuilt outside of the requests, warmed up on startup (config/wsgi.py)
+ENABLE_ANALYTICS_FACTS_BACKGROUND_REBUILD = env('ENABLE_ANALYTICS_FACTS_BACKGROUND_REBUILD')
 
 
 # CORS CONFIGS
@@ -280,6 +311,8 @@ GRAPHENE_DJANGO_EXTRAS = {
     'DEFAULT_PAGE_SIZE': 20,
     'MAX_PAGE_SIZE': 50
 }
+# Lists with estimated_count uses PostgreSQL planner estimate as totalCount above this
+ESTIMATED_COUNT_THRESHOLD = env('ESTIMATED_COUNT_THRESHOLD')
 
 ENABLE_INTROSEPTION_SCHEMA = env('ENABLE_INTROSEPTION_SCHEMA')
 
@@ -314,6 +347,37 @@ GRAPHENE_NODES_WHITELIST = (
     'publishers',
 )
 
+_BOOK_MODELS = ('book.Book', 'book.Category', 'book.Tag', 'book.Author', 'publisher.Publisher')
+_LOCATION_MODELS = ('common.Province', 'common.District', 'common.Municipality')
+# Responses of the anonymous queries using only these root fields are cached (utils/graphene/response_cache.py)
+# {root field: models used by the field (cached responses are invalidated when these change)}
+GRAPHENE_RESPONSE_CACHE_NODES = {
+    '__typename': (),
+    'books': _BOOK_MODELS,
+    'book': _BOOK_MODELS,
+    'categories': ('book.Category',),
+    'tags': ('book.Tag',),
+    'authors': ('book.Author',),
+    'provinces': _LOCATION_MODELS,
+    'districts': _LOCATION_MODELS,
+    'municipalities': _LOCATION_MODELS,
+    'publishers': ('publisher.Publisher',) + _LOCATION_MODELS,
+}
+ENABLE_GRAPHENE_RESPONSE_CACHE = env('ENABLE_GRAPHENE_RESPONSE_CACHE')
+GRAPHENE_RESPONSE_CACHE_TIMEOUT = env('GRAPHENE_RESPONSE_CACHE_TIMEOUT')
+# Parsed and validated documents kept per process (utils/graphene/backend.py), 0 disables the cache
+GRAPHENE_DOCUMENT_CACHE_SIZE = env('GRAPHENE_DOCUMENT_CACHE_SIZE')
+# Only the persisted queries are executed in production (apps/common/persisted_queries.py)
+ENABLE_PERSISTED_QUERY_ALLOWLIST = not DEBUG and env('ENABLE_PERSISTED_QUERY_ALLOWLIST')
+# Maximum estimated query cost per user type (utils/graphene/cost.py)
+GRAPHENE_QUERY_COST_BUDGETS = {
+    None: env('GRAPHENE_QUERY_COST_ANONYMOUS_BUDGET'),  # Anonymous users
+    'default': env('GRAPHENE_QUERY_COST_BUDGET'),
+    'moderator': env('GRAPHENE_QUERY_COST_MODERATOR_BUDGET'),
+}
+# Size of the lists which are not paginated
+GRAPHENE_QUERY_COST_LIST_SIZE = 10
+
 CLIENT_URL = env('CLIENT_URL')
 
 # Smtp settings
@@ -21,6 +21,9 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.translation import gettext_lazy as _
 from graphene_file_upload.django import FileUploadGraphQLView
 from utils.graphene.context import GQLContext
+from utils.graphene.backend import document_cache_backend
+from apps.common.persisted_queries import resolve_persisted_query
+from utils.graphene.response_cache import get_response_cache_key, get_cached_response, set_cached_response
 from django.conf.urls.static import static
 from django.conf.urls.i18n import i18n_patterns
 
@@ -32,6 +35,19 @@ class CustomGraphQLView(FileUploadGraphQLView):
     def get_context(self, request):
         return GQLContext(request)
 
+    def get_graphql_params(self, request, data):
+        """
+        Documents can be sent using the hash of the persisted query (apps/common/persisted_queries.py)
+        """
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        return resolve_persisted_query(request, data, query), variables, operation_name, id
+
+    def get_backend(self, request):
+        """
+        Parsed and validated documents are cached (utils/graphene/backend.py)
+        """
+        return document_cache_backend
+
     def parse_body(self, request):
         """
         Allow for variable batch
@@ -47,6 +63,41 @@ class CustomGraphQLView(FileUploadGraphQLView):
             self.batch = False
         return super().parse_body(request)
 
+    def execute_graphql_request(self, *args, **kwargs):
+        execution_result = super().execute_graphql_request(*args, **kwargs)
+        self.execution_has_errors = bool(execution_result and execution_result.errors)
+        self.execution_extensions = execution_result and execution_result.extensions
+        return execution_result
+
+    def json_encode(self, request, d, pretty=False):
+        """
+        Extensions of the execution result (eg: query cost) are added to the response
+        """
+        extensions = getattr(self, 'execution_extensions', None)
+        if extensions:
+            d = dict(d, extensions=extensions)
+        return super().json_encode(request, d, pretty=pretty)
+
+    def get_response(self, request, data, show_graphiql=False):
+        """
+        Responses of the public queries are cached (utils/graphene/response_cache.py)
+        """
+        cache_key = None
+        self.execution_extensions = None
+        if not show_graphiql and not self.batch and not request.GET.get('pretty'):
+            query, variables, operation_name, _ = self.get_graphql_params(request, data)
+            cache_key = get_response_cache_key(
+                request, self.get_backend(request), self.schema, query, variables, operation_name,
+            )
+        if cache_key is not None:
+            cached_response = get_cached_response(cache_key)
+            if cached_response is not None:
+                return cached_response, 200
+        result, status_code = super().get_response(request, data, show_graphiql=show_graphiql)
+        if cache_key is not None and status_code == 200 and not self.execution_has_errors:
+            set_cached_response(cache_key, result)
+        return result, status_code
+
 
 CustomGraphQLView.graphiql_template = "graphene_graphiql_explorer/graphiql.html"
 
@@ -60,6 +111,7 @@ urlpatterns += [
     # tinymce urls
     path('tinymce/', include('tinymce.urls')),
     path('user/', include('apps.user.urls')),
+    path('common/', include('apps.common.urls')),
 ]
 
 # Static and media file urls
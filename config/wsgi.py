@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Warm up the analytics facts (in background), so that first analytics requests don't wait for them
+from apps.common.analytics import book_order_facts  # noqa: E402
+
+book_order_facts.schedule_rebuild()
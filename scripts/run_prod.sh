@@ -3,5 +3,6 @@ python manage.py collectstatic --noinput &
 python manage.py migrate --noinput &
 # start server
 gunicorn config.wsgi:application --timeout=40 --bind 0.0.0.0:8020 &
-# celery
-celery -A config worker --loglevel=INFO
+# celery, checkout queue (ENABLE_ASYNC_CHECKOUT) concurrency limits the concurrent checkouts
+celery -A config worker -Q checkout --concurrency=${CHECKOUT_WORKER_CONCURRENCY:-2} --prefetch-multiplier=1 --loglevel=INFO &
+celery -A config worker -Q celery --loglevel=INFO
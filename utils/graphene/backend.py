@@ -0,0 +1,107 @@
+"""
+Document cache: Parsed and validated GraphQL documents are kept in a per-process LRU keyed by the hash of the
+document string, repeated documents skip parse and validation against the schema.
+
+Documents with validation errors are also cached (the errors are returned without executing), documents with
+syntax errors are not cached. Hits and misses are counted in redis (see shared_cache_stats command).
+Query cost is checked before the execution of the documents (utils/graphene/cost.py).
+"""
+import hashlib
+import logging
+from functools import partial
+
+import redis
+from django.conf import settings
+from graphql import GraphQLError
+from graphql.backend.base import GraphQLDocument
+from graphql.backend.core import GraphQLCoreBackend
+from graphql.execution import execute, ExecutionResult
+from graphql.language.base import parse, print_ast
+from graphql.validation import validate
+
+from utils.shared_cache import LRUCache, RedisCounters
+from utils.graphene.cost import get_query_cost, get_query_cost_budget
+
+logger = logging.getLogger(__name__)
+
+# Documents are only dropped when the LRU is full
+DOCUMENT_CACHE_TTL = float('inf')
+
+
+def execute_validated(schema, document_ast, validation_errors, *args, **kwargs):
+    """
+    Same as graphql.backend.core.execute_and_validate, using the validation errors of the cached document
+    Queries above the cost budget of the user are not executed (utils/graphene/cost.py).
+    """
+    if kwargs.pop('validate', True) and validation_errors:
+        return ExecutionResult(errors=validation_errors, invalid=True)
+    cost = get_query_cost(schema, document_ast, kwargs.get('operation_name'), kwargs.get('variable_values'))
+    budget = get_query_cost_budget(kwargs.get('context_value'))
+    extensions = dict(cost=dict(requestedQueryCost=cost, maximumAvailable=budget))
+    if cost > budget:
+        return ExecutionResult(
+            errors=[GraphQLError(f'Query cost {cost} exceeds the maximum cost {budget}')],
+            invalid=True,
+            extensions=extensions,
+        )
+    result = execute(schema, document_ast, *args, **kwargs)
+    result.extensions.update(extensions)
+    return result
+
+
+def get_document_hash(document_string):
+    return hashlib.sha256(document_string.encode()).hexdigest()
+
+
+class CachedGraphQLBackend(GraphQLCoreBackend):
+    STATS_FIELDS = ('hits', 'misses')
+
+    def __init__(self, max_size, executor=None):
+        super().__init__(executor=executor)
+        self.max_size = max_size
+        self.documents = LRUCache(max_size, DOCUMENT_CACHE_TTL)
+        self.stats = RedisCounters('graphql-document-cache-stats', self.STATS_FIELDS)
+
+    def _count(self, **stats):
+        try:
+            self.stats.count(**stats)
+        except redis.RedisError:
+            logger.warning('Document cache stats are not available', exc_info=True)
+
+    def _create_document(self, schema, document_string):
+        document_ast = parse(document_string)
+        return GraphQLDocument(
+            schema=schema,
+            document_string=document_string,
+            document_ast=document_ast,
+            execute=partial(
+                execute_validated, schema, document_ast, validate(schema, document_ast), **self.execute_params
+            ),
+        )
+
+    def document_from_string(self, schema, document_string):
+        if not isinstance(document_string, str):
+            document_string = print_ast(document_string)
+        if not self.max_size:
+            return self._create_document(schema, document_string)
+        key = (id(schema), get_document_hash(document_string))
+        document = self.documents.get_many([key]).get(key)
+        if document is not None:
+            self._count(hits=1)
+            return document
+        document = self._create_document(schema, document_string)
+        self.documents.set_many({key: document})
+        self._count(misses=1)
+        return document
+
+    def get_stats(self):
+        return self.stats.get()
+
+    def reset_stats(self):
+        self.stats.reset()
+
+    def clear(self):
+        self.documents.clear()
+
+
+document_cache_backend = CachedGraphQLBackend(settings.GRAPHENE_DOCUMENT_CACHE_SIZE)
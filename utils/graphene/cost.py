@@ -0,0 +1,137 @@
+"""
+Query cost: Estimated number of objects resolved by the query, checked before the execution against the budget of
+the user type (settings.GRAPHENE_QUERY_COST_BUDGETS) and reported in the response extensions.
+
+Each field with a selection (object or list of objects) costs the number of objects it resolves, which is the
+product of the sizes of the lists up to the field. Size of a paginated list is the requested pageSize (limited to
+the max_page_size of the field), other lists use settings.GRAPHENE_QUERY_COST_LIST_SIZE. Scalar fields are free.
+Example (page size 20):
+    orders { results { createdBy { id } bookOrders { results { id } } } }
+    orders: 1, results: 20, createdBy: 20, bookOrders: 20, results (of bookOrders): 400 => 461
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from graphene_django_extras.paginations.pagination import BaseDjangoGraphqlPagination
+from graphql import GraphQLError
+from graphql.language.ast import FragmentSpread, InlineFragment, FragmentDefinition
+from graphql.type import GraphQLList, GraphQLNonNull, GraphQLInt
+from graphql.type.definition import get_named_type
+from graphql.utils.get_operation_ast import get_operation_ast
+from graphql.utils.value_from_ast import value_from_ast
+
+from utils.graphene.optimizer import get_fields
+from utils.graphene.pagination import get_page_size
+
+
+@lru_cache(maxsize=None)
+def get_field_pagination(graphql_type, field_name):
+    """
+    Returns pagination of the graphene field (DjangoPaginatedListObjectField, ...) if it is paginated
+    """
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    if graphene_type is None:
+        return None
+    _, field = get_fields(graphene_type).get(field_name, (None, None))
+    pagination = getattr(field, 'pagination', None)
+    if isinstance(pagination, BaseDjangoGraphqlPagination) and hasattr(pagination, 'page_size'):
+        return pagination
+
+
+def is_list_type(graphql_type):
+    if isinstance(graphql_type, GraphQLNonNull):
+        graphql_type = graphql_type.of_type
+    return isinstance(graphql_type, GraphQLList)
+
+
+class QueryCost():
+    def __init__(self, schema, document_ast, variables=None):
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document_ast.definitions
+            if isinstance(definition, FragmentDefinition)
+        }
+
+    def _get_page_size(self, pagination, field_ast):
+        kwargs = {}
+        for argument in field_ast.arguments:
+            if argument.name.value == pagination.page_size_query_param:
+                page_size = value_from_ast(argument.value, GraphQLInt, self.variables)
+                if page_size is not None:
+                    kwargs[pagination.page_size_query_param] = page_size
+        try:
+            return get_page_size(pagination, kwargs)
+        except (ValueError, TypeError, GraphQLError):
+            # Invalid page sizes are handled by the resolvers
+            return pagination.page_size
+
+    def _iter_fields(self, graphql_type, selection_set, visited_fragments):
+        """
+        Yields (type, field ast) for the selection set, fragments are flattened
+        """
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpread):
+                name = selection.name.value
+                if name in visited_fragments or name not in self.fragments:
+                    continue
+                fragment = self.fragments[name]
+                yield from self._iter_fields(
+                    self.schema.get_type(fragment.type_condition.name.value),
+                    fragment.selection_set,
+                    visited_fragments | {name},
+                )
+            elif isinstance(selection, InlineFragment):
+                yield from self._iter_fields(
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition else graphql_type,
+                    selection.selection_set,
+                    visited_fragments,
+                )
+            else:
+                yield graphql_type, selection
+
+    def get_cost(self, graphql_type, selection_set, multiplier=1, list_size=None, visited_fragments=frozenset()):
+        cost = 0
+        for parent_type, field_ast in self._iter_fields(graphql_type, selection_set, visited_fragments):
+            if field_ast.selection_set is None:
+                continue
+            name = field_ast.name.value
+            field_def = getattr(parent_type, 'fields', {}).get(name)
+            if field_def is None:
+                continue
+            field_multiplier = multiplier
+            if is_list_type(field_def.type):
+                field_multiplier *= list_size or settings.GRAPHENE_QUERY_COST_LIST_SIZE
+            pagination = get_field_pagination(parent_type, name)
+            cost += field_multiplier + self.get_cost(
+                get_named_type(field_def.type),
+                field_ast.selection_set,
+                multiplier=field_multiplier,
+                # Size of the results list
+                list_size=pagination and self._get_page_size(pagination, field_ast),
+                visited_fragments=visited_fragments,
+            )
+        return cost
+
+
+def get_query_cost(schema, document_ast, operation_name=None, variables=None):
+    operation = get_operation_ast(document_ast, operation_name)
+    if operation is None:
+        return 0
+    root_type = {
+        'query': schema.get_query_type,
+        'mutation': schema.get_mutation_type,
+        'subscription': schema.get_subscription_type,
+    }[operation.operation]()
+    if root_type is None:
+        return 0
+    return QueryCost(schema, document_ast, variables).get_cost(root_type, operation.selection_set)
+
+
+def get_query_cost_budget(context):
+    user = getattr(context, 'user', None)
+    if user is None or not user.is_authenticated:
+        return settings.GRAPHENE_QUERY_COST_BUDGETS[None]
+    return settings.GRAPHENE_QUERY_COST_BUDGETS.get(user.user_type, settings.GRAPHENE_QUERY_COST_BUDGETS['default'])
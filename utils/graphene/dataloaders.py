@@ -1,4 +1,14 @@
+from collections import defaultdict
+
+from promise import Promise
 from promise.dataloader import DataLoader
+from django.db import models
+from django.utils.functional import cached_property
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+
+from utils.graphene.optimizer import OptimizerHint, get_model_relation
+from utils.graphene.pagination import ListCount, order_queryset, get_page_size, get_page_offset
 
 
 class WithContextMixin():
@@ -10,3 +20,176 @@ class WithContextMixin():
 class DataLoaderWithContext(WithContextMixin, DataLoader):
     # def batch_load_fn  TODO: Add logging for errors traceback (for graphene v3)
     pass
+
+
+class RelatedObjectLoader(DataLoaderWithContext):
+    """
+    Loads the objects of the forward FK/one-to-one relation using the FK values as keys
+    """
+    def __init__(self, *args, relation, **kwargs):
+        self.relation = relation
+        super().__init__(*args, **kwargs)
+
+    def batch_load_fn(self, keys):
+        field_name = self.relation.target_field.name
+        objects = self.relation.related_model._default_manager.in_bulk(keys, field_name=field_name)
+        return Promise.resolve([objects.get(key) for key in keys])
+
+
+class GenericRelatedObjectLoader(DataLoaderWithContext):
+    """
+    Loads the objects of the GenericForeignKey using (content type id, object id) as keys
+    One query per content type, shared by all the GenericForeignKey relations.
+    """
+    def batch_load_fn(self, keys):
+        object_ids_by_content_type = defaultdict(set)
+        for content_type_id, object_id in keys:
+            object_ids_by_content_type[content_type_id].add(object_id)
+        objects = {}
+        for content_type_id, object_ids in object_ids_by_content_type.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if model is None:
+                # Stale content type
+                continue
+            objects.update({
+                (content_type_id, pk): item
+                for pk, item in model._default_manager.in_bulk(object_ids).items()
+            })
+        return Promise.resolve([objects.get(key) for key in keys])
+
+
+class RelatedObjectsLoader(DataLoaderWithContext):
+    """
+    Loads the objects of the reverse FK/M2M relation using the pks of the source objects as keys
+    """
+    def __init__(self, *args, relation, **kwargs):
+        self.relation = relation
+        super().__init__(*args, **kwargs)
+
+    def batch_load_fn(self, keys):
+        if self.relation.concrete:
+            # Forward M2M
+            query_name = self.relation.related_query_name()
+        else:
+            query_name = self.relation.field.name
+        qs = self.relation.related_model._default_manager\
+            .filter(**{f'{query_name}__in': keys})\
+            .annotate(_dataloader_key=models.F(query_name))
+        _map = defaultdict(list)
+        for item in qs:
+            _map[item._dataloader_key].append(item)
+        return Promise.resolve([_map[key] for key in keys])
+
+
+class PaginatedRelatedObjectsLoader(DataLoaderWithContext):
+    """
+    Loads a page (PageGraphqlPagination) of the related objects for each parent, keys are the pks of the parents.
+    Ids of the objects are fetched for all the parents in one query and the objects of the pages in another one.
+    Loads (ListCount, results) for each key.
+    """
+    def __init__(self, *args, qs, key_field, pagination, pagination_kwargs, get_results_queryset, **kwargs):
+        self.qs = qs
+        self.key_field = key_field
+        self.pagination = pagination
+        self.pagination_kwargs = pagination_kwargs
+        self.get_results_queryset = get_results_queryset
+        super().__init__(*args, **kwargs)
+
+    def batch_load_fn(self, keys):
+        kwargs = dict(self.pagination_kwargs)
+        qs = order_queryset(
+            self.qs.filter(**{f'{self.key_field}__in': keys}),
+            kwargs.pop(self.pagination.ordering_param, None),
+        )
+        ids_map = defaultdict(list)
+        for key, pk in qs.values_list(self.key_field, 'pk'):
+            ids_map[key].append(pk)
+
+        page_size = get_page_size(self.pagination, kwargs)
+        pages = {}
+        for key in keys:
+            ids = ids_map[key]
+            count = ListCount(ids)
+            if page_size is None:
+                pages[key] = (count, None)
+                continue
+            offset = get_page_offset(self.pagination, page_size, count, dict(kwargs))
+            pages[key] = (count, ids[offset:offset + page_size])
+
+        page_ids = [pk for _, ids in pages.values() if ids for pk in ids]
+        objects = {}
+        if page_ids:
+            objects = {
+                item.pk: item
+                for item in self.get_results_queryset(self.qs.filter(pk__in=page_ids).order_by())
+            }
+        return Promise.resolve([
+            (count, ids and [objects[pk] for pk in ids if pk in objects])
+            for count, ids in (pages[key] for key in keys)
+        ])
+
+
+class RelationDataLoaders(WithContextMixin):
+    """
+    Loaders for the model relations, created when first used in the request
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loaders = {}
+
+    def get(self, model, field_name):
+        relation = get_model_relation(model, field_name)
+        if relation is None:
+            raise ValueError(f'{model._meta.label}.{field_name} is not a relation')
+        if isinstance(relation, GenericForeignKey):
+            return self.generic
+        key = (model._meta.label, field_name)
+        if key not in self.loaders:
+            loader_class = RelatedObjectLoader if relation.concrete and not relation.many_to_many else RelatedObjectsLoader
+            self.loaders[key] = loader_class(relation=relation, context=self.context)
+        return self.loaders[key]
+
+    @cached_property
+    def generic(self):
+        return GenericRelatedObjectLoader(context=self.context)
+
+
+def batch_load(field_name, model=None):
+    """
+    Returns resolver which batch loads the model relation (FK, one-to-one, reverse FK, M2M or GenericForeignKey)
+    Example:
+        class UserType(DjangoObjectType):
+            resolve_publisher = batch_load('publisher')
+    Objects already loaded using select_related/prefetch_related are used as it is.
+    For GenericForeignKey, model can be provided to only resolve the objects of that model.
+    """
+    def resolver(root, info, **kwargs):
+        relation = get_model_relation(type(root), field_name)
+        if isinstance(relation, GenericForeignKey):
+            content_type_id = getattr(root, root._meta.get_field(relation.ct_field).attname)
+            if model is not None and content_type_id != ContentType.objects.get_for_model(model).pk:
+                return None
+            if relation.is_cached(root):
+                return getattr(root, field_name)
+            key = (content_type_id, getattr(root, relation.fk_field))
+            return info.context.dl.relation.get(type(root), field_name).load(key)
+        if relation.concrete and not relation.many_to_many:
+            if relation.is_cached(root):
+                return getattr(root, field_name)
+            key = getattr(root, relation.attname)
+            if key is None:
+                return None
+            return info.context.dl.relation.get(type(root), field_name).load(key)
+        if relation.one_to_one:
+            if relation.is_cached(root):
+                return getattr(root, field_name, None)
+            return info.context.dl.relation.get(type(root), field_name).load(root.pk).then(
+                lambda objects: objects[0] if objects else None
+            )
+        if field_name in getattr(root, '_prefetched_objects_cache', {}):
+            return list(getattr(root, field_name).all())
+        return info.context.dl.relation.get(type(root), field_name).load(root.pk)
+
+    # Only the FK columns (forward relations) are used by the resolver
+    resolver.optimizer_hint = OptimizerHint(only=(field_name,))
+    return resolver
@@ -6,43 +6,73 @@ from graphene.types.structures import Structure
 from graphene.utils.str_converters import to_snake_case
 from graphene_django.filter.utils import get_filtering_args_from_filterset
 from graphene_django.utils import maybe_queryset, is_valid_django_model
-from graphene_django_extras import DjangoFilterPaginateListField
+from graphene_django_extras import DjangoFilterPaginateListField, PageGraphqlPagination
 from graphene_django_extras.base_types import DjangoListObjectBase
 from graphene_django_extras.fields import DjangoListField
 from graphene_django_extras.filters.filter import get_filterset_class
 from graphene_django_extras.paginations.pagination import BaseDjangoGraphqlPagination
-from graphene_django_extras.settings import graphql_api_settings
 from graphene_django_extras.utils import get_extra_filters
 from graphene_django.rest_framework.serializer_converter import get_graphene_type_from_serializer_field
 from django.core.files.storage import get_storage_class
 from rest_framework import serializers
 
 
-from utils.graphene.pagination import OrderingOnlyArgumentPagination, NoOrderingPageGraphqlPagination
+from utils.graphene.pagination import (
+    OrderingOnlyArgumentPagination,
+    NoOrderingPageGraphqlPagination,
+    CursorPageGraphqlPagination,
+    CursorPage,
+    ListCount,
+    paginate_queryset,
+    get_page_size,
+)
+from utils.graphene.optimizer import optimize_queryset, get_selections
+from utils.graphene.dataloaders import PaginatedRelatedObjectsLoader
 
 StorageClass = get_storage_class()
 
 
 class CustomDjangoListObjectBase(DjangoListObjectBase):
-    def __init__(self, results, count, page, pageSize, results_field_name="results"):
+    def __init__(
+        self, results, count, page, pageSize, results_field_name="results", next_cursor=None, previous_cursor=None,
+    ):
         self.results = results
-        self.count = count
+        # ListCount is evaluated only when count is used
+        self._count = count
         self.results_field_name = results_field_name
         self.page = page
         self.pageSize = pageSize
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def count(self):
+        if isinstance(self._count, ListCount):
+            return self._count.value
+        return self._count
+
+    @property
+    def count_is_estimated(self):
+        if isinstance(self._count, ListCount):
+            return self._count.is_estimated
+        return False
 
     def to_dict(self):
         return {
             self.results_field_name: [e.to_dict() for e in self.results],
             "count": self.count,
+            "countIsEstimated": self.count_is_estimated,
             "page": self.page,
-            "pageSize": self.pageSize
+            "pageSize": self.pageSize,
+            "nextCursor": self.next_cursor,
+            "previousCursor": self.previous_cursor,
         }
 
 
 class CustomDjangoListField(DjangoListField):
     """
     Removes the compulsion of using `get_queryset` in the DjangoListField
+    Also used for the results of the paginated list types, related objects are fetched using the query optimizer.
     """
     @staticmethod
     def list_resolver(
@@ -56,6 +86,7 @@ class CustomDjangoListField(DjangoListField):
             if hasattr(django_object_type, 'get_queryset'):
                 # Pass queryset to the DjangoObjectType get_queryset method
                 queryset = maybe_queryset(django_object_type.get_queryset(queryset, info))
+            queryset = optimize_queryset(queryset, django_object_type, info)
         return queryset
 
     def get_resolver(self, parent_resolver):
@@ -116,24 +147,21 @@ class CustomPaginatedListObjectField(DjangoFilterPaginateListField):
         if hasattr(qs, 'all'):
             qs = qs.all()
         qs = filterset_class(data=filter_kwargs, queryset=qs, request=info.context).qs
-        count = qs.count()
+        count = ListCount(qs)
 
         if getattr(self, "pagination", None):
             ordering = kwargs.pop(self.pagination.ordering_param, None) or self.pagination.ordering
             ordering = ','.join([to_snake_case(each) for each in ordering.strip(',').replace(' ', '').split(',')])
             'pageSize' in kwargs and kwargs['pageSize'] is None and kwargs.pop('pageSize')
             kwargs[self.pagination.ordering_param] = ordering
-            qs = self.pagination.paginate_queryset(qs, **kwargs)
+            qs = paginate_queryset(self.pagination, qs, count, **kwargs)
 
         return CustomDjangoListObjectBase(
             count=count,
             results=maybe_queryset(qs),
             results_field_name=self.type._meta.results_field_name,
             page=kwargs.get('page', 1) if hasattr(self.pagination, 'page') else None,
-            pageSize=kwargs.get(  # TODO: Need to add cutoff to send max page size instead of requested
-                'pageSize',
-                graphql_api_settings.DEFAULT_PAGE_SIZE
-            ) if hasattr(self.pagination, 'page') else None
+            pageSize=get_page_size(self.pagination, kwargs) if hasattr(self.pagination, 'page') else None
         )
 
     def get_resolver(self, parent_resolver):
@@ -155,6 +183,8 @@ class DjangoPaginatedListObjectField(DjangoFilterPaginateListField):
         fields=None,
         extra_filter_meta=None,
         filterset_class=None,
+        estimated_count=False,
+        batch_key=None,
         *args,
         **kwargs,
     ):
@@ -162,6 +192,9 @@ class DjangoPaginatedListObjectField(DjangoFilterPaginateListField):
         If pagination is None, then we will only allow Ordering fields.
             - The page size will respect the settings.
             - Client will not be able to add pagination params
+        If estimated_count is True, planner estimate is used as totalCount for the large lists.
+        batch_key: FK of the list model to the parent type's model. If provided, the lists (PageGraphqlPagination)
+            of all the parents are loaded together using PaginatedRelatedObjectsLoader.
         '''
         _fields = _type._meta.filter_fields
         _model = _type._meta.model
@@ -196,6 +229,8 @@ class DjangoPaginatedListObjectField(DjangoFilterPaginateListField):
 
         # accessor will be used with m2m or reverse_fk fields
         self.accessor = kwargs.pop('accessor', None)
+        self.estimated_count = estimated_count
+        self.batch_key = batch_key
         super(DjangoFilterPaginateListField, self).__init__(
             _type, *args, **kwargs
         )
@@ -204,6 +239,11 @@ class DjangoPaginatedListObjectField(DjangoFilterPaginateListField):
             self, manager, filterset_class, filtering_args, root, info, **kwargs
     ):
         filter_kwargs = {k: v for k, v in kwargs.items() if k in filtering_args}
+        if (
+            self.batch_key and root is not None and
+            isinstance(self.pagination, PageGraphqlPagination)
+        ):
+            return self.batch_list_resolver(manager, filterset_class, filter_kwargs, root, info, **kwargs)
         if self.accessor:
             qs = getattr(root, self.accessor)
             if hasattr(qs, 'all'):
@@ -215,8 +255,8 @@ class DjangoPaginatedListObjectField(DjangoFilterPaginateListField):
             if root and is_valid_django_model(root._meta.model):
                 extra_filters = get_extra_filters(root, manager.model)
                 qs = qs.filter(**extra_filters)
-        # TODO: Duplicate count (self.pagination.paginate_queryset also calls count)
-        count = qs.count()
+        # Counted only if totalCount is selected
+        count = ListCount(qs, estimate=self.estimated_count)
 
         if getattr(self, "pagination", None):
             ordering = kwargs.pop(self.pagination.ordering_param, None) or self.pagination.ordering
@@ -227,19 +267,66 @@ class DjangoPaginatedListObjectField(DjangoFilterPaginateListField):
                 ordering = ','.join([to_snake_case(each) for each in ordering.strip(',').replace(' ', '').split(',')])
                 kwargs[self.pagination.ordering_param] = ordering
             'pageSize' in kwargs and kwargs['pageSize'] is None and kwargs.pop('pageSize')
-            qs = self.pagination.paginate_queryset(qs, **kwargs)
+            if isinstance(self.pagination, CursorPageGraphqlPagination):
+                qs = self.get_results_queryset(qs, info)
+            qs = paginate_queryset(self.pagination, qs, count, **kwargs)
 
+        cursor_page = qs if isinstance(qs, CursorPage) else CursorPage(results=maybe_queryset(qs))
         return CustomDjangoListObjectBase(
             count=count,
-            results=maybe_queryset(qs),
+            results=cursor_page.results,
             results_field_name=self.type._meta.results_field_name,
             page=kwargs.get('page', 1) if hasattr(self.pagination, 'page_query_param') else None,
-            pageSize=kwargs.get(  # TODO: Need to add cutoff to send max page size instead of requested
-                'pageSize',
-                graphql_api_settings.DEFAULT_PAGE_SIZE
-            ) if hasattr(self.pagination, 'page_size_query_param') else None
+            pageSize=(
+                get_page_size(self.pagination, kwargs)
+                if hasattr(self.pagination, 'page_size_query_param') else None
+            ),
+            next_cursor=cursor_page.next_cursor,
+            previous_cursor=cursor_page.previous_cursor,
         )
 
+    def batch_list_resolver(self, manager, filterset_class, filter_kwargs, root, info, **kwargs):
+        # Arguments are same for all the parents of the field in the query
+        loader_key = (self, tuple(id(field_ast) for field_ast in info.field_asts))
+        loader = info.context.one_to_many_dataloaders.get(loader_key)
+        if loader is None:
+            ordering = kwargs.pop(self.pagination.ordering_param, None) or self.pagination.ordering
+            if type(self.pagination) is not NoOrderingPageGraphqlPagination:
+                kwargs[self.pagination.ordering_param] = ','.join([
+                    to_snake_case(each) for each in ordering.strip(',').replace(' ', '').split(',')
+                ])
+            'pageSize' in kwargs and kwargs['pageSize'] is None and kwargs.pop('pageSize')
+            loader = info.context.one_to_many_dataloaders[loader_key] = PaginatedRelatedObjectsLoader(
+                qs=filterset_class(data=filter_kwargs, queryset=manager.all(), request=info.context).qs,
+                key_field=self.batch_key,
+                pagination=self.pagination,
+                pagination_kwargs=kwargs,
+                get_results_queryset=partial(self.get_results_queryset, info=info),
+                context=info.context,
+            )
+
+        def _get_list_object(page):
+            count, results = page
+            return CustomDjangoListObjectBase(
+                count=count,
+                results=results,
+                results_field_name=self.type._meta.results_field_name,
+                page=kwargs.get('page', 1),
+                pageSize=get_page_size(self.pagination, kwargs),
+            )
+        return loader.load(root.pk).then(_get_list_object)
+
+    def get_results_queryset(self, qs, info):
+        """
+        Cursor pagination evaluates the page, so the results queryset is prepared here instead of the results field
+        """
+        results_asts = get_selections(info.field_asts, info.fragments).get(self.type._meta.results_field_name)
+        if not results_asts:
+            return qs
+        base_type = self.type._meta.baseType
+        qs = maybe_queryset(base_type.get_queryset(qs, info))
+        return optimize_queryset(qs, base_type, info, field_asts=results_asts)
+
 
 def get_filtering_args_from_non_model_filterset(filterset_class):
     from graphene_django.forms.converter import convert_form_field
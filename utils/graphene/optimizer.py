@@ -0,0 +1,274 @@
+"""
+Query optimizer: Uses the GraphQL selection to apply select_related/prefetch_related to the list querysets,
+so that the number of queries for a page doesn't depend on the page size.
+Only the columns required by the selection are fetched (only()).
+
+Relations exposed using the default resolvers are handled automatically.
+Fields with custom resolvers can define OptimizerHint in the DjangoObjectType.optimizer_hints.
+Example:
+    class OrderType(DjangoObjectType):
+        optimizer_hints = dict(
+            activity_log=OptimizerHint(relation='activity_logs'),
+            total_quantity=OptimizerHint(only=()),
+        )
+"""
+from functools import partial
+from typing import NamedTuple, Tuple
+
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from django.db.models.query import ModelIterable
+from graphene.types.dynamic import Dynamic
+from graphene.types.field import source_resolver
+from graphene.types.structures import Structure
+from graphene.utils.str_converters import to_camel_case
+from graphene_django import DjangoObjectType
+from graphene_django_extras import DjangoFilterPaginateListField
+from graphql.language.ast import FragmentSpread, InlineFragment
+from modeltranslation.translator import translator, NotRegistered
+
+
+class OptimizerHint(NamedTuple):
+    # Model relation used by the resolver, nested selection is optimized using the relation
+    relation: str = None
+    # Lookups (relative to the type's model) used by the resolver
+    select_related: Tuple[str, ...] = ()
+    prefetch_related: Tuple[str, ...] = ()
+    # Model fields used by the resolver, None if unknown (disables column projection for the type)
+    only: Tuple[str, ...] = None
+
+
+def get_selections(field_asts, fragments):
+    """
+    Returns {field name: [field ast, ...]} for the selection sets of the field asts, fragments are flattened
+    """
+    selections = {}
+
+    def _collect(selection_set):
+        if selection_set is None:
+            return
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpread):
+                _collect(fragments[selection.name.value].selection_set)
+            elif isinstance(selection, InlineFragment):
+                _collect(selection.selection_set)
+            else:
+                selections.setdefault(selection.name.value, []).append(selection)
+
+    for field_ast in field_asts:
+        _collect(field_ast.selection_set)
+    return selections
+
+
+def get_object_type(graphene_type):
+    while isinstance(graphene_type, Structure):
+        graphene_type = graphene_type.of_type
+    return graphene_type
+
+
+def get_fields(object_type):
+    """
+    Returns {schema field name: (field name, field)}, Dynamic fields (model relations) are resolved
+    """
+    fields = {}
+    for name, field in getattr(object_type._meta, 'fields', {}).items():
+        if isinstance(field, Dynamic):
+            field = field.get_type()
+            if field is None:
+                continue
+        fields[getattr(field, 'name', None) or to_camel_case(name)] = (name, field)
+    return fields
+
+
+def has_custom_resolver(object_type, name):
+    resolver = getattr(object_type, f'resolve_{name}', None)
+    # DjangoObjectType.resolve_id uses pk
+    return resolver is not None and resolver is not getattr(DjangoObjectType, f'resolve_{name}', None)
+
+
+def get_field_source(field):
+    """
+    Returns model attribute used by the field defined using source (eg: EnumDescription(source='get_X_display'))
+    """
+    resolver = getattr(field, 'resolver', None)
+    if isinstance(resolver, partial) and resolver.func is source_resolver:
+        source = resolver.args[0]
+        if source.startswith('get_') and source.endswith('_display'):
+            return source[len('get_'):-len('_display')]
+        return source
+
+
+def get_model_columns(model, names=None):
+    """
+    Returns concrete fields of the model for the names (all if not provided), translated fields are
+    expanded to their language fields and GenericForeignKey to its content type and object id fields.
+    """
+    if names is None:
+        return {field.name for field in model._meta.concrete_fields}
+    try:
+        translation_fields = translator.get_options_for_model(model).fields
+    except NotRegistered:
+        translation_fields = {}
+    columns = set()
+    for name in names:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if isinstance(field, GenericForeignKey):
+            columns.update((field.ct_field, field.fk_field))
+            continue
+        if not field.concrete:
+            continue
+        columns.add(field.name)
+        columns.update(
+            translation_field.name
+            for translation_field in translation_fields.get(field.name, [])
+        )
+    return columns
+
+
+def get_model_relation(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Reverse relations without related_name are accessed using <model>_set
+        field = next(
+            (field for field in model._meta.related_objects if field.get_accessor_name() == name),
+            None,
+        )
+    if field is not None and field.is_relation:
+        return field
+
+
+def iter_select_related(model, select_related, prefix=''):
+    """
+    Yields (path, model) for the select_related structure of the query ({relation: {nested relation: {}}})
+    """
+    for name, nested in (select_related or {}).items():
+        related_model = model._meta.get_field(name).related_model
+        yield f'{prefix}{name}', related_model
+        yield from iter_select_related(related_model, nested, prefix=f'{prefix}{name}__')
+
+
+class QueryOptimizer():
+    def __init__(self, info):
+        self.info = info
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.only = set()
+        self.is_projected = False
+
+    def _add_lookups(self, lookups, prefix, in_prefetch):
+        if in_prefetch:
+            self.prefetch_related.update(f'{prefix}{lookup}' for lookup in lookups)
+        else:
+            self.select_related.update(f'{prefix}{lookup}' for lookup in lookups)
+
+    def collect(self, object_type, model, field_asts, prefix='', in_prefetch=False, annotations=()):
+        """
+        Collects the lookups and the columns required for the selection of the field_asts (of object_type)
+        Relations nested inside prefetched relations are also prefetched (one query per level).
+        Columns are projected only for the joined (select_related) models, if a selected field can't be mapped
+        to the columns all the columns of the model are loaded.
+        """
+        fields = get_fields(object_type)
+        hints = getattr(object_type, 'optimizer_hints', {})
+        columns = {model._meta.pk.name}
+        is_projectable = True
+        for selection_name, selection_asts in get_selections(field_asts, self.info.fragments).items():
+            if selection_name not in fields:
+                continue
+            name, field = fields[selection_name]
+            # Hint defined by the resolver (eg: batch_load)
+            hint = hints.get(name) or getattr(getattr(object_type, f'resolve_{name}', None), 'optimizer_hint', None)
+            if hint is not None:
+                self._add_lookups(hint.select_related, prefix, in_prefetch)
+                self.prefetch_related.update(f'{prefix}{lookup}' for lookup in hint.prefetch_related)
+                relation_name = hint.relation
+                if hint.only is not None:
+                    columns.update(get_model_columns(model, hint.only))
+                elif relation_name is None:
+                    is_projectable = False
+            elif has_custom_resolver(object_type, name) or isinstance(field, DjangoFilterPaginateListField):
+                # Custom resolvers and paginated fields fetch the data on their own
+                is_projectable = False
+                continue
+            else:
+                relation_name = name
+            relation = relation_name and get_model_relation(model, relation_name)
+            if not relation:
+                if hint is not None or name in annotations:
+                    continue
+                model_columns = get_model_columns(model, [get_field_source(field) or name])
+                if model_columns:
+                    columns.update(model_columns)
+                else:
+                    # Model properties, methods, ...
+                    is_projectable = False
+                continue
+            related_type = get_object_type(field.type)
+            is_single = relation.many_to_one or relation.one_to_one
+            if is_single and relation.concrete:
+                columns.add(relation_name)
+            if (
+                hint is None and not is_single and
+                'get_queryset' in vars(related_type)
+            ):
+                # Queryset is modified by the type, prefetched objects would not be used
+                continue
+            nested_in_prefetch = in_prefetch or not is_single
+            self._add_lookups([relation_name], prefix, nested_in_prefetch)
+            if getattr(getattr(related_type, '_meta', None), 'model', None) is not None:
+                self.collect(
+                    related_type, relation.related_model, selection_asts,
+                    prefix=f'{prefix}{relation_name}__', in_prefetch=nested_in_prefetch,
+                )
+            elif not nested_in_prefetch:
+                self.only.update(
+                    f'{prefix}{relation_name}__{column}'
+                    for column in get_model_columns(relation.related_model)
+                )
+
+        if in_prefetch:
+            return
+        if is_projectable:
+            self.is_projected = True
+        else:
+            columns = get_model_columns(model)
+        self.only.update(f'{prefix}{column}' for column in columns)
+
+    def optimize(self, queryset, object_type, field_asts):
+        self.collect(object_type, queryset.model, field_asts, annotations=queryset.query.annotations)
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(self.prefetch_related))
+        if (
+            self.is_projected and
+            # Skipped if the columns are already defined by the resolver
+            queryset.query.deferred_loading == (frozenset(), True) and
+            queryset.query.select_related is not True
+        ):
+            # Relations joined by the resolver are loaded with all the columns
+            for path, related_model in iter_select_related(queryset.model, queryset.query.select_related):
+                self.only.add(path)
+                if path not in self.select_related:
+                    self.only.update(f'{path}__{column}' for column in get_model_columns(related_model))
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def optimize_queryset(queryset, object_type, info, field_asts=None):
+    """
+    Applies select_related/prefetch_related/only to the queryset using the selection of field_asts (info.field_asts)
+    """
+    if (
+        not isinstance(queryset, QuerySet) or
+        # values()/values_list() querysets
+        not issubclass(queryset._iterable_class, ModelIterable) or
+        getattr(getattr(object_type, '_meta', None), 'model', None) is None
+    ):
+        return queryset
+    return QueryOptimizer(info).optimize(queryset, object_type, field_asts or info.field_asts)
@@ -1,7 +1,25 @@
+import json
+import base64
+import datetime
+import operator
+import functools
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import QuerySet, Q, F
+from django.db.models.constants import LOOKUP_SEP
 from graphene import String
+from graphql import GraphQLError
 from graphene_django_extras.paginations.pagination import BaseDjangoGraphqlPagination
+from graphene_django_extras.paginations.utils import _get_count, _nonzero_int
 from graphene_django_extras import PageGraphqlPagination
 
+# Ordering key values are annotated using this prefix to generate the cursors
+CURSOR_KEY_PREFIX = '_cursor_key_'
+
 
 class NoOrderingPageGraphqlPagination(PageGraphqlPagination):
     """
@@ -61,3 +79,273 @@ class OrderingOnlyArgumentPagination(BaseDjangoGraphqlPagination):
             else:
                 qs = qs.order_by(order)
         return qs
+
+
+def get_estimated_count(qs):
+    """
+    Returns the number of rows estimated by the PostgreSQL query planner (no rows are scanned)
+    """
+    sql, params = qs.order_by().query.sql_with_params()
+    with connections[qs.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return plan[0]['Plan']['Plan Rows']
+
+
+class ListCount():
+    """
+    Total count of the list, evaluated only when it is used (eg: totalCount is selected) and only once.
+    With estimate, PostgreSQL planner estimate is used if it is above settings.ESTIMATED_COUNT_THRESHOLD.
+    """
+    def __init__(self, qs, estimate=False):
+        self.qs = qs
+        self.estimate = estimate
+        self._value = None
+        self._is_estimated = False
+
+    def _evaluate(self):
+        if self._value is not None:
+            return
+        if self.estimate and isinstance(self.qs, QuerySet):
+            estimated_count = get_estimated_count(self.qs)
+            if estimated_count > settings.ESTIMATED_COUNT_THRESHOLD:
+                self._value = estimated_count
+                self._is_estimated = True
+                return
+        self._value = _get_count(self.qs)
+
+    @property
+    def value(self):
+        self._evaluate()
+        return self._value
+
+    @property
+    def is_estimated(self):
+        self._evaluate()
+        return self._is_estimated
+
+
+def order_queryset(qs, order):
+    if order:
+        if "," in order:
+            order = order.strip(",").replace(" ", "").split(",")
+            if order.__len__() > 0:
+                qs = qs.order_by(*order)
+        else:
+            qs = qs.order_by(order)
+    return qs
+
+
+def get_page_size(pagination, kwargs):
+    """
+    Returns requested page size, limited to the max_page_size of the pagination
+    """
+    if pagination.page_size_query_param:
+        page_size = kwargs.get(pagination.page_size_query_param, pagination.page_size)
+        if page_size is not None and page_size < 1:
+            raise GraphQLError(f'{pagination.page_size_query_param} should be a positive number')
+        return _nonzero_int(page_size, strict=True, cutoff=pagination.max_page_size)
+    return pagination.page_size
+
+
+def get_page_offset(pagination, page_size, count, kwargs):
+    page = kwargs.pop(pagination.page_query_param, 1)
+    assert page != 0, ValueError(
+        "Page value for PageGraphqlPagination must be a non-zero value"
+    )
+    if page < 0:
+        return max(0, int(count.value + page_size * page))
+    return page_size * (page - 1)
+
+
+class CursorPage(NamedTuple):
+    results: list
+    next_cursor: str = None
+    previous_cursor: str = None
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder truncates microseconds
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(
+        json.dumps(values, cls=CursorJSONEncoder).encode()
+    ).decode()
+
+
+def decode_cursor(cursor, keys):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise GraphQLError('Invalid cursor')
+    return values
+
+
+def is_nullable_key(model, name):
+    if name == 'pk':
+        return False
+    field = None
+    for part in name.split(LOOKUP_SEP):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            # Annotations
+            return True
+        if field.is_relation:
+            if not field.concrete or field.many_to_many:
+                return True
+            model = field.related_model
+    return field.null
+
+
+def get_ordering_keys(qs):
+    """
+    Returns [(name, descending), ...] using the queryset ordering, pk is added to make the ordering unique
+    """
+    ordering = qs.query.order_by or (qs.query.default_ordering and qs.query.get_meta().ordering) or ()
+    keys = []
+    for field in ordering:
+        if not isinstance(field, str) or field == '?':
+            raise GraphQLError('Cursor pagination is not supported for this ordering')
+        name = field.lstrip('-')
+        if name == qs.model._meta.pk.name:
+            name = 'pk'
+        keys.append((name, field.startswith('-')))
+        if name == 'pk':
+            return keys
+    # Same direction as the last key so that a single (key..., id) index can be used
+    keys.append(('pk', keys[-1][1] if keys else False))
+    return keys
+
+
+def get_keyset_filter(model, keys, values):
+    """
+    Returns filter for the rows after values in the ordering of keys
+    PostgreSQL orders NULLs as the largest values (ASC NULLS LAST, DESC NULLS FIRST).
+    """
+    clauses = []
+    same = Q()
+    for (name, descending), value in zip(keys, values):
+        nullable = is_nullable_key(model, name)
+        if value is None:
+            after = Q(**{f'{name}__isnull': False}) if descending else None
+            same_value = Q(**{f'{name}__isnull': True})
+        else:
+            after = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            if nullable and not descending:
+                after |= Q(**{f'{name}__isnull': True})
+            same_value = Q(**{name: value})
+        if after is not None:
+            clauses.append(same & after)
+        same &= same_value
+    keyset_filter = functools.reduce(operator.or_, clauses, Q(pk__in=[]))
+    (first_key, descending), first_value = keys[0], values[0]
+    if first_value is not None and not is_nullable_key(model, first_key):
+        # Redundant range on the first key so that the index is used to skip the previous rows
+        keyset_filter &= Q(**{f'{first_key}__{"lte" if descending else "gte"}': first_value})
+    return keyset_filter
+
+
+class CursorPageGraphqlPagination(PageGraphqlPagination):
+    """
+    PageGraphqlPagination with keyset (cursor) mode, which is used when after/before cursor is provided.
+    Rows after/before the cursor are filtered using the ordering keys (ordering + pk) instead of using OFFSET, so the
+    deep pages cost the same as the first page if the ordering keys are indexed.
+    Ordering keys should not be modified after creation (eg: created_at, id).
+    """
+    __name__ = "CursorPagePaginator"
+
+    def __init__(self, *args, after_query_param='after', before_query_param='before', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.after_query_param = after_query_param
+        self.before_query_param = before_query_param
+
+    def to_graphql_fields(self):
+        fields = super().to_graphql_fields()
+        fields.update({
+            self.after_query_param: String(
+                description="Returns the rows after the cursor (nextCursor of the previous page)",
+            ),
+            self.before_query_param: String(
+                description="Returns the rows before the cursor (previousCursor of the next page)",
+            ),
+        })
+        return fields
+
+    def paginate_queryset(self, qs, count, **kwargs):
+        after = kwargs.pop(self.after_query_param, None)
+        before = kwargs.pop(self.before_query_param, None)
+        if after and before:
+            raise GraphQLError('Only one of after or before cursor is allowed')
+        page_size = get_page_size(self, kwargs)
+        if page_size is None:
+            return None
+
+        qs = order_queryset(qs, kwargs.pop(self.ordering_param, None) or self.ordering)
+        keys = get_ordering_keys(qs)
+        qs = qs.order_by(
+            *[f'-{name}' if descending else name for name, descending in keys]
+        ).annotate(**{
+            f'{CURSOR_KEY_PREFIX}{index}': F(name)
+            for index, (name, _) in enumerate(keys)
+        })
+
+        def _get_cursor(row):
+            return encode_cursor([
+                getattr(row, f'{CURSOR_KEY_PREFIX}{index}')
+                for index in range(len(keys))
+            ])
+
+        if before:
+            reversed_keys = [(name, not descending) for name, descending in keys]
+            rows = list(
+                qs.filter(get_keyset_filter(qs.model, reversed_keys, decode_cursor(before, keys)))
+                .reverse()[:page_size + 1]
+            )
+            has_previous = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            return CursorPage(
+                results=rows,
+                next_cursor=rows and _get_cursor(rows[-1]) or None,
+                previous_cursor=has_previous and _get_cursor(rows[0]) or None,
+            )
+
+        if after:
+            offset = 0
+            qs = qs.filter(get_keyset_filter(qs.model, keys, decode_cursor(after, keys)))
+        else:
+            offset = get_page_offset(self, page_size, count, kwargs)
+        rows = list(qs[offset:offset + page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        return CursorPage(
+            results=rows,
+            next_cursor=has_next and _get_cursor(rows[-1]) or None,
+            previous_cursor=(after or offset > 0) and rows and _get_cursor(rows[0]) or None,
+        )
+
+
+def paginate_queryset(pagination, qs, count, **kwargs):
+    """
+    Same as pagination.paginate_queryset, but count (ListCount) is only used for PageGraphqlPagination negative pages.
+    PageGraphqlPagination.paginate_queryset always counts the queryset.
+    CursorPageGraphqlPagination returns CursorPage.
+    """
+    if isinstance(pagination, CursorPageGraphqlPagination):
+        return pagination.paginate_queryset(qs, count, **kwargs)
+    if not isinstance(pagination, PageGraphqlPagination):
+        return pagination.paginate_queryset(qs, **kwargs)
+
+    page_size = get_page_size(pagination, kwargs)
+    if page_size is None:
+        return None
+    offset = get_page_offset(pagination, page_size, count, kwargs)
+    qs = order_queryset(qs, kwargs.pop(pagination.ordering_param, None) or pagination.ordering)
+    return qs[offset:offset + page_size]
@@ -0,0 +1,162 @@
+"""
+Response cache: Full responses of the anonymous queries which only use the settings.GRAPHENE_RESPONSE_CACHE_NODES
+root fields, graphene execution is skipped for the cached responses.
+
+Key is generated using the normalized document, variables, operation name, active language and the versions of
+the models used by the root fields. Versions are incremented when the models change (apps/common/signals.py).
+Changes without signals (QuerySet.update, bulk_create) are only reflected after GRAPHENE_RESPONSE_CACHE_TIMEOUT.
+Versions and responses are kept in redis, so that changes made by any process (workers, celery, admin) are seen
+by all the processes.
+"""
+import json
+import hashlib
+import logging
+
+import redis
+from django.conf import settings
+from django.utils import translation
+from graphql.error import GraphQLSyntaxError
+from graphql.language.ast import OperationDefinition, FragmentDefinition, FragmentSpread, InlineFragment
+from graphql.language.printer import print_ast
+
+from utils.single_flight import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_VERSION_KEY_PREFIX = 'graphql-response-cache-version'
+RESPONSE_CACHE_KEY_PREFIX = 'graphql-response-cache'
+
+
+def get_version_key(model_label):
+    return f'{RESPONSE_CACHE_VERSION_KEY_PREFIX}-{model_label}'
+
+
+def is_response_cache_model(model):
+    return any(
+        model._meta.label in labels
+        for labels in settings.GRAPHENE_RESPONSE_CACHE_NODES.values()
+    )
+
+
+def get_root_fields(document_ast, operation_name=None):
+    """
+    Returns root field names of the query operation, None for the other operations
+    """
+    operations = [
+        definition for definition in document_ast.definitions
+        if isinstance(definition, OperationDefinition)
+    ]
+    operation = next(
+        (
+            operation for operation in operations
+            if operation_name is None or (operation.name and operation.name.value == operation_name)
+        ),
+        None,
+    )
+    if operation is None or operation.operation != 'query' or (operation_name is None and len(operations) > 1):
+        return None
+    fragments = {
+        definition.name.value: definition
+        for definition in document_ast.definitions
+        if isinstance(definition, FragmentDefinition)
+    }
+    root_fields = set()
+    collected_fragments = set()
+
+    def _collect(selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpread):
+                name = selection.name.value
+                if name not in fragments:
+                    return False
+                if name in collected_fragments:
+                    continue
+                collected_fragments.add(name)
+                if not _collect(fragments[name].selection_set):
+                    return False
+            elif isinstance(selection, InlineFragment):
+                if not _collect(selection.selection_set):
+                    return False
+            else:
+                root_fields.add(selection.name.value)
+        return True
+
+    if not _collect(operation.selection_set):
+        return None
+    return root_fields
+
+
+def get_normalized_document(document):
+    """
+    Printed document AST, kept on the document (reused by the document cache, utils/graphene/backend.py)
+    """
+    if not hasattr(document, 'normalized_document'):
+        document.normalized_document = print_ast(document.document_ast)
+    return document.normalized_document
+
+
+def get_response_cache_key(request, backend, schema, query, variables, operation_name):
+    """
+    Returns cache key if the response of the request can be cached
+    """
+    if not settings.ENABLE_GRAPHENE_RESPONSE_CACHE or not query or request.user.is_authenticated:
+        return None
+    try:
+        document = backend.document_from_string(schema, query)
+    except GraphQLSyntaxError:
+        return None
+    root_fields = get_root_fields(document.document_ast, operation_name)
+    if not root_fields or not root_fields <= settings.GRAPHENE_RESPONSE_CACHE_NODES.keys():
+        return None
+    model_labels = sorted({
+        label
+        for field in root_fields
+        for label in settings.GRAPHENE_RESPONSE_CACHE_NODES[field]
+    })
+    try:
+        versions = get_redis_client().mget([get_version_key(label) for label in model_labels])
+    except redis.RedisError:
+        logger.warning('Response cache is not available', exc_info=True)
+        return None
+    normalized = json.dumps(
+        [
+            get_normalized_document(document),
+            variables,
+            operation_name,
+            translation.get_language(),
+            [int(version or 0) for version in versions],
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return f'{RESPONSE_CACHE_KEY_PREFIX}-{hashlib.sha1(normalized.encode()).hexdigest()}'
+
+
+def get_cached_response(key):
+    try:
+        response = get_redis_client().get(key)
+    except redis.RedisError:
+        logger.warning('Response cache is not available', exc_info=True)
+        return None
+    return response.decode() if response is not None else None
+
+
+def set_cached_response(key, response):
+    try:
+        get_redis_client().set(key, response, ex=settings.GRAPHENE_RESPONSE_CACHE_TIMEOUT)
+    except redis.RedisError:
+        logger.warning('Response cache is not available', exc_info=True)
+
+
+def invalidate_response_cache(*models):
+    """
+    Increments the versions of the models, cached responses using the models are not used after this.
+    """
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        for model in models:
+            pipe.incr(get_version_key(model._meta.label))
+        pipe.execute()
+    except redis.RedisError:
+        # Cached responses are used until GRAPHENE_RESPONSE_CACHE_TIMEOUT
+        logger.warning('Response cache is not available', exc_info=True)
@@ -51,6 +51,11 @@ class CommonSetupClassMixin:
     CACHES=TEST_CACHES,
     AUTH_PASSWORD_VALIDATORS=TEST_AUTH_PASSWORD_VALIDATORS,
     CELERY_TASK_ALWAYS_EAGER=True,
+    ENABLE_SINGLE_FLIGHT=False,
+    ENABLE_DATALOADER_SHARED_CACHE=False,
+    ENABLE_GRAPHENE_RESPONSE_CACHE=False,
+    ENABLE_PERSISTED_QUERY_ALLOWLIST=False,
+    ENABLE_ANALYTICS_FACTS_BACKGROUND_REBUILD=False,
 )
 class GraphQLTestCase(CommonSetupClassMixin, BaseGraphQLTestCase):
     """
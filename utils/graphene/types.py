@@ -4,7 +4,7 @@ from typing import Union
 from collections import OrderedDict
 
 from django.db.models import QuerySet
-from graphene import ObjectType, Field, Int
+from graphene import ObjectType, Field, Int, Boolean, String
 
 # we will use graphene_django registry over the one from graphene_django_extras
 # since it adds information regarding nullability in the schema definition
@@ -73,6 +73,14 @@ class CustomListObjectType(ObjectType):
                         description="Total count of matches elements",
                     ),
                 ),
+                (
+                    "count_is_estimated",
+                    Field(
+                        Boolean,
+                        name="totalCountIsEstimated",
+                        description="Total count is estimated using the database statistics",
+                    ),
+                ),
                 (
                     "page",
                     Field(
@@ -88,7 +96,23 @@ class CustomListObjectType(ObjectType):
                         name="pageSize",
                         description="Page Size",
                     ),
-                )
+                ),
+                (
+                    "next_cursor",
+                    Field(
+                        String,
+                        name="nextCursor",
+                        description="Cursor for the next page (cursor pagination), null if this is the last page",
+                    ),
+                ),
+                (
+                    "previous_cursor",
+                    Field(
+                        String,
+                        name="previousCursor",
+                        description="Cursor for the previous page (cursor pagination), null if this is the first page",
+                    ),
+                ),
             ]
         )
 
@@ -178,6 +202,14 @@ class CustomDjangoListObjectType(DjangoListObjectType):
                         description="Total count of matches elements",
                     ),
                 ),
+                (
+                    "count_is_estimated",
+                    Field(
+                        Boolean,
+                        name="totalCountIsEstimated",
+                        description="Total count is estimated using the database statistics",
+                    ),
+                ),
                 (
                     "page",
                     Field(
@@ -193,7 +225,23 @@ class CustomDjangoListObjectType(DjangoListObjectType):
                         name="pageSize",
                         description="Page Size",
                     ),
-                )
+                ),
+                (
+                    "next_cursor",
+                    Field(
+                        String,
+                        name="nextCursor",
+                        description="Cursor for the next page (cursor pagination), null if this is the last page",
+                    ),
+                ),
+                (
+                    "previous_cursor",
+                    Field(
+                        String,
+                        name="previousCursor",
+                        description="Cursor for the previous page (cursor pagination), null if this is the first page",
+                    ),
+                ),
             ]
         )
 
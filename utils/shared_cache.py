@@ -0,0 +1,220 @@
+"""
+Shared cache: Cross-request cache tier for the dataloaders.
+
+Values are looked up in the per-process LRU, then in redis and the missing keys are loaded by the dataloader.
+Each cache has a version in redis, invalidation (eg: post_save/post_delete of the source models) increments the
+version so that all the cached values of the cache are dropped. Other processes see the new version after
+SHARED_CACHE_VERSION_LOCAL_TTL seconds.
+Hits and misses are counted in redis (see shared_cache_stats command).
+"""
+import time
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+
+import redis
+from promise import Promise
+from django.conf import settings
+
+from utils.single_flight import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Redis version is re-checked after this
+SHARED_CACHE_VERSION_LOCAL_TTL = 5
+# Counters are sent to redis after this
+SHARED_CACHE_STATS_FLUSH_INTERVAL = 10
+
+SHARED_CACHES = {}
+
+
+class LRUCache():
+    """
+    Thread-safe per-process LRU with TTL
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = {}
+        with self.lock:
+            for key in keys:
+                value, expire_at = self.data.get(key, (None, None))
+                if expire_at is None:
+                    continue
+                if expire_at < now:
+                    self.data.pop(key)
+                    continue
+                self.data.move_to_end(key)
+                values[key] = value
+        return values
+
+    def set_many(self, values):
+        expire_at = time.monotonic() + self.ttl
+        with self.lock:
+            for key, value in values.items():
+                self.data[key] = (value, expire_at)
+                self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class RedisCounters():
+    """
+    Per-process counters, added to the redis hash every SHARED_CACHE_STATS_FLUSH_INTERVAL seconds
+    """
+    def __init__(self, key, fields):
+        self.key = key
+        self.fields = fields
+        self.lock = threading.Lock()
+        self._pending = dict.fromkeys(fields, 0)
+        self._flushed_at = time.monotonic()
+
+    def count(self, client=None, **values):
+        with self.lock:
+            for field, value in values.items():
+                self._pending[field] += value
+            if time.monotonic() - self._flushed_at < SHARED_CACHE_STATS_FLUSH_INTERVAL:
+                return
+            pending, self._pending = self._pending, dict.fromkeys(self.fields, 0)
+            self._flushed_at = time.monotonic()
+        pipe = (client or get_redis_client()).pipeline(transaction=False)
+        for field, value in pending.items():
+            pipe.hincrby(self.key, field, value)
+        pipe.execute()
+
+    def get(self):
+        values = get_redis_client().hgetall(self.key)
+        return {
+            field: int(values.get(field.encode(), 0))
+            for field in self.fields
+        }
+
+    def reset(self):
+        get_redis_client().delete(self.key)
+
+
+class SharedCache():
+    STATS_FIELDS = ('local_hits', 'redis_hits', 'misses')
+
+    def __init__(self, name, ttl=300, local_ttl=30, local_max_size=10000):
+        assert name not in SHARED_CACHES, f'Shared cache {name} is already defined'
+        SHARED_CACHES[name] = self
+        self.name = name
+        self.ttl = ttl
+        self.local = LRUCache(local_max_size, min(local_ttl, ttl))
+        self._version = None
+        self._version_checked_at = None
+        self.stats = RedisCounters(f'shared-cache-stats-{self.name}', self.STATS_FIELDS)
+
+    @property
+    def version_key(self):
+        return f'shared-cache-version-{self.name}'
+
+    def _get_redis_key(self, version, key):
+        return f'shared-cache-{self.name}-{version}-{key}'
+
+    def _get_version(self, client):
+        now = time.monotonic()
+        if self._version_checked_at is None or now - self._version_checked_at > SHARED_CACHE_VERSION_LOCAL_TTL:
+            version = int(client.get(self.version_key) or 0)
+            if version != self._version:
+                self.local.clear()
+            self._version = version
+            self._version_checked_at = now
+        return self._version
+
+    def get_many(self, keys):
+        """
+        Returns {key: value} for the cached keys
+        """
+        try:
+            client = get_redis_client()
+            version = self._get_version(client)
+            values = {
+                key: value
+                for (_, key), value in self.local.get_many([(version, key) for key in keys]).items()
+            }
+            local_hits = len(values)
+            missing_keys = [key for key in keys if key not in values]
+            if missing_keys:
+                redis_values = {
+                    key: pickle.loads(value)
+                    for key, value in zip(
+                        missing_keys,
+                        client.mget([self._get_redis_key(version, key) for key in missing_keys]),
+                    )
+                    if value is not None
+                }
+                self.local.set_many({(version, key): value for key, value in redis_values.items()})
+                values.update(redis_values)
+            self.stats.count(
+                client,
+                local_hits=local_hits,
+                redis_hits=len(values) - local_hits,
+                misses=len(keys) - len(values),
+            )
+            return values
+        except redis.RedisError:
+            logger.warning('Shared cache is not available', exc_info=True)
+            return {}
+
+    def set_many(self, values):
+        try:
+            client = get_redis_client()
+            version = self._get_version(client)
+            pipe = client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.set(self._get_redis_key(version, key), pickle.dumps(value), px=self.ttl * 1000)
+            pipe.execute()
+            self.local.set_many({(version, key): value for key, value in values.items()})
+        except redis.RedisError:
+            logger.warning('Shared cache is not available', exc_info=True)
+
+    def invalidate(self):
+        self.local.clear()
+        try:
+            self._version = get_redis_client().incr(self.version_key)
+            self._version_checked_at = time.monotonic()
+        except redis.RedisError:
+            logger.warning('Shared cache is not available', exc_info=True)
+
+    def get_stats(self):
+        return self.stats.get()
+
+    def reset_stats(self):
+        self.stats.reset()
+
+
+class SharedCacheLoaderMixin():
+    """
+    DataLoader mixin: Cached values are used across the requests, only the missing keys are loaded.
+    Values should be pickleable and keys are converted to str for redis.
+    Example:
+        class CachedUserNameLoader(SharedCacheLoaderMixin, UserNameLoader):
+            shared_cache = SharedCache('user-name', ttl=3600)
+    """
+    shared_cache: SharedCache = None
+
+    def batch_load_fn(self, keys):
+        if not settings.ENABLE_DATALOADER_SHARED_CACHE:
+            return super().batch_load_fn(keys)
+        cached_values = self.shared_cache.get_many(keys)
+        missing_keys = [key for key in keys if key not in cached_values]
+        if not missing_keys:
+            return Promise.resolve([cached_values[key] for key in keys])
+
+        def _merge(values):
+            loaded_values = dict(zip(missing_keys, values))
+            self.shared_cache.set_many(loaded_values)
+            return [cached_values[key] if key in cached_values else loaded_values[key] for key in keys]
+        return super().batch_load_fn(missing_keys).then(_merge)
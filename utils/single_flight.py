@@ -0,0 +1,136 @@
+"""
+Single-flight: Identical concurrent computations (across processes) share one execution.
+
+The first caller acquires a redis lock and computes, the result is stored in a short-lived slot of the
+lock holder (keyed by the lock token) which is used by the callers that waited for that lock holder.
+Callers arriving when no computation is running always compute, previous results are never reused.
+"""
+import time
+import uuid
+import json
+import pickle
+import hashlib
+import logging
+import functools
+
+import redis
+from django.conf import settings
+from django.db.models import QuerySet
+
+logger = logging.getLogger(__name__)
+
+# Maximum computation time, lock is released after this
+SINGLE_FLIGHT_LOCK_TIMEOUT = 60
+# Maximum time a caller waits for the running computation before computing itself,
+# kept well below the worker timeout (gunicorn --timeout=40 in scripts/run_prod.sh)
+SINGLE_FLIGHT_WAIT_TIMEOUT = 10
+# Result is kept only for the callers waiting for the computation, other callers don't use it
+SINGLE_FLIGHT_RESULT_TIMEOUT = 5
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+# Release lock only if it is still owned by the caller
+RELEASE_LOCK_SCRIPT = '''
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+'''
+
+_redis_client = None
+
+
+def get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def _call_redis(method, *args, **kwargs):
+    try:
+        return method(*args, **kwargs)
+    except redis.RedisError:
+        logger.warning('Single flight is not available', exc_info=True)
+
+
+def get_single_flight_key(name, *args, **kwargs):
+    normalized = json.dumps([name, args, kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def get_single_flight_result_key(key, token):
+    if isinstance(token, bytes):
+        token = token.decode()
+    return f'single-flight-result-{key}-{token}'
+
+
+def run_single_flight(
+    key, func,
+    lock_timeout=SINGLE_FLIGHT_LOCK_TIMEOUT,
+    wait_timeout=SINGLE_FLIGHT_WAIT_TIMEOUT,
+    result_timeout=SINGLE_FLIGHT_RESULT_TIMEOUT,
+):
+    """
+    Returns func() making sure only one computation is running for the key at a time.
+    Callers waiting for the lock uses the result of the running computation, for at most wait_timeout seconds.
+    """
+    if not settings.ENABLE_SINGLE_FLIGHT:
+        return func()
+    client = get_redis_client()
+    lock_key = f'single-flight-lock-{key}'
+    token = uuid.uuid4().hex
+    try:
+        deadline = time.monotonic() + wait_timeout
+        # Token of the computation this caller is waiting for
+        holder_token = None
+        while time.monotonic() < deadline:
+            if holder_token is not None:
+                result = client.get(get_single_flight_result_key(key, holder_token))
+                if result is not None:
+                    return pickle.loads(result)
+            if client.set(lock_key, token, nx=True, px=lock_timeout * 1000):
+                break
+            holder_token = client.get(lock_key) or holder_token
+            time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        else:
+            # Running computation is taking too long, compute without waiting any more
+            return func()
+    except redis.RedisError:
+        logger.warning('Single flight is not available', exc_info=True)
+        return func()
+
+    # Lock acquired
+    try:
+        result = func()
+        # Written before releasing the lock, so that it is available for the waiting callers
+        _call_redis(
+            client.set, get_single_flight_result_key(key, token), pickle.dumps(result), px=result_timeout * 1000,
+        )
+        return result
+    finally:
+        _call_redis(client.eval, RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+
+def single_flight(scope=None, **options):
+    """
+    Resolver decorator: Identical resolutions (field, arguments and scope) share one execution.
+    scope(info) should return the permission scope, as root is not part of the key it should also define root.
+    QuerySets are evaluated so that the result can be shared.
+    """
+    def decorator(resolver):
+        @functools.wraps(resolver)
+        def wrapper(root, info, **kwargs):
+            def _resolve():
+                result = resolver(root, info, **kwargs)
+                if isinstance(result, QuerySet):
+                    return list(result)
+                return result
+
+            key = get_single_flight_key(
+                f'{info.parent_type.name}.{info.field_name}',
+                scope(info) if scope else None,
+                **kwargs,
+            )
+            return run_single_flight(key, _resolve, **options)
+        return wrapper
+    return decorator